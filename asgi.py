@@ -0,0 +1,5 @@
+from src.asgi import app
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("asgi:app")
@@ -0,0 +1,25 @@
+# Конфигурация gunicorn: gunicorn -c gunicorn.conf.py src.main:app
+#
+# С предзагрузкой (PRELOAD=1, по умолчанию) приложение импортируется в
+# мастер-процессе, неизменяемые данные загружаются до fork и делятся
+# воркерами copy-on-write, кэш результатов в общей памяти один на все воркеры.
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = os.environ.get('PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    main = sys.modules.get('src.main')
+    if main is not None:
+        main.preload()
+    # Объекты мастера переносятся в постоянное поколение: сборщик мусора
+    # воркеров не обходит их и не копирует страницы памяти
+    gc.freeze()
@@ -0,0 +1,335 @@
+# ASGI-вариант API расчета и выгрузок: тело запроса читается асинхронно,
+# поэтому медленная загрузка не занимает поток; расчет и отрисовка выполняются
+# в пуле процессов, готовые файлы отдаются порциями, потоки живого пересчета
+# (SSE) обслуживаются циклом событий без потока на соединение. Остальные маршруты
+# обслуживает WSGI-приложение src.main.
+#
+#     uvicorn asgi:app --workers 2
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import logging
+import os
+import re
+
+from src import main
+from src.utils.artifacts import artifact_key
+from src.utils.encoding import accepts_gzip, encode_result, negotiate, parse_fields
+from src.utils.live import POLL_INTERVAL, new_session, post_edit, session_events
+from src.utils.singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 20 * 1024 * 1024  # Предельный размер тела запроса
+SEND_CHUNK = 64 * 1024  # Порция при отдаче файла
+PROCESSES = int(os.environ.get('ASGI_PROCESSES', os.cpu_count() or 1))
+
+EXPORT_PATHS = {'/export/excel': 'excel', '/export/pdf': 'pdf', '/export/bundle': 'bundle'}
+DRAWING_PATH = re.compile(r'/drawing/(\w+)\.(\w+)')
+LIVE_PATH = re.compile(r'/live/(\w+)')
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# Функции процессов-исполнителей: калькулятор и кэш выгрузок из src.main
+
+def _calculate(data: Dict) -> Dict:
+    return main.calculate_result(data, main.get_calculator())
+
+
+def _export(kind: str, data: Dict) -> Dict:
+    return main.cached_export(kind, data)
+
+
+def _drawing(args: Dict, view: str, image_format: str) -> Dict:
+    return main.cached_drawing(args, view, image_format)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Одинаковые одновременные запросы ждут один расчет в пуле
+_flights = AsyncSingleFlight()
+
+
+def executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PROCESSES)
+    return _executor
+
+
+async def offload(function, *args):
+    """Выполнить расчет в пуле процессов, не блокируя цикл событий"""
+    return await asyncio.get_running_loop().run_in_executor(executor(), function, *args)
+
+
+async def cached_calculation(data: Dict) -> Dict:
+    """Результат /calculate как в main.cached_calculation: таблица стандартных
+    размеров, общий кэш воркеров, иначе один расчет в пуле на одинаковые запросы
+    """
+    result = main.size_table.lookup(data)
+    if result is not None:
+        return result
+    key = main.calculate_key(data)
+    cached = main.result_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    async def compute() -> Dict:
+        result = await offload(_calculate, data)
+        main.result_cache.put(key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+        return result
+    return await _flights.do(key, compute)
+
+
+async def read_body(receive) -> bytes:
+    """Тело запроса по мере поступления"""
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HttpError(499, "Клиент закрыл соединение")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise HttpError(413, "Слишком большой запрос")
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def read_json(receive) -> Dict:
+    body = await read_body(receive)
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HttpError(400, "Тело запроса должно быть JSON")
+
+
+async def send_response(send, status: int, headers: List[Tuple[str, str]], body: bytes = b'') -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload: Dict, status: int = 200, headers: List[Tuple[str, str]] = ()) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send_response(send, status, [('content-type', 'application/json'),
+                                       ('content-length', str(len(body)))] + list(headers), body)
+
+
+async def send_artifact(send, scope: Dict, render: Callable[[], Awaitable[Dict]], mimetype: str,
+                        filename: Optional[str] = None) -> None:
+    """Файл из кэша выгрузок с ETag; чтение файла - в потоке, отправка порциями
+
+    Вытеснение в другом процессе может удалить файл до открытия: тогда
+    render() вызывается еще раз и выгрузка отрисовывается заново.
+    """
+    artifact = await render()
+    etag = f'"{artifact["key"]}"'
+    headers = [('etag', etag)]
+    if filename:
+        headers.append(('content-disposition', f'attachment; filename={filename}'))
+    else:
+        headers.append(('cache-control', f'public, max-age={main.EXPORT_MAX_AGE}'))
+    if scope['method'] in ('GET', 'HEAD') and etag_matches(_header(scope, 'if-none-match'), etag):
+        await send_response(send, 304, headers)
+        return
+
+    loop = asyncio.get_running_loop()
+    try:
+        file = open(artifact['path'], 'rb')
+    except FileNotFoundError:
+        artifact = await render()
+        file = open(artifact['path'], 'rb')
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in
+                        headers + [('content-type', mimetype), ('content-length', str(size))]]
+        })
+        while True:
+            chunk = await loop.run_in_executor(None, file.read, SEND_CHUNK)
+            more = len(chunk) == SEND_CHUNK
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+            if not more:
+                break
+
+
+async def send_calculation(scope: Dict, send) -> None:
+    """GET /calculate: канонический URL, сильный ETag и 304 без расчета, как в WSGI-приложении"""
+    data = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+    fields = parse_fields(data.pop('fields', None))
+    query = main.canonical_query(data, fields)
+    cache_control = f'public, max-age={main.CALCULATE_MAX_AGE}'
+    if scope['query_string'].decode('latin-1') != query:
+        await send_response(send, 301, [('location', f"{scope['path']}?{query}"), ('cache-control', cache_control),
+                                        ('content-length', '0')])
+        return
+
+    accept, accept_encoding = _header(scope, 'accept'), _header(scope, 'accept-encoding')
+    etag = f'"{main.calculate_etag(query, negotiate(accept), accepts_gzip(accept_encoding))}"'
+    headers = [('etag', etag), ('cache-control', cache_control), ('vary', 'Accept, Accept-Encoding')]
+    if etag_matches(_header(scope, 'if-none-match'), etag):
+        await send_response(send, 304, headers)
+        return
+
+    result = await cached_calculation(data)
+    body, encoding_headers = encode_result(result, fields, accept, accept_encoding)
+    headers += [(name.lower(), value) for name, value in encoding_headers.items() if name != 'Vary']
+    await send_response(send, 200, headers + [('content-length', str(len(body)))],
+                        body if scope['method'] == 'GET' else b'')
+
+
+async def send_events(scope: Dict, receive, send) -> None:
+    """Поток Server-Sent Events живого пересчета без отдельного потока на соединение
+
+    Пересчет сеанса выполняется в пуле потоков: калькулятор сеанса остается
+    в этом процессе, а цикл событий не ждет расчета.
+    """
+    session = new_session()
+    args = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+    if args:
+        post_edit(main.live_edits, session, args)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')]
+    })
+    disconnected = asyncio.Event()
+
+    async def watch() -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch())
+    loop = asyncio.get_running_loop()
+    events = session_events(session, main.live_edits, main.live_result)
+    try:
+        step = next(events)
+        while not disconnected.is_set():
+            if step is None:
+                await asyncio.sleep(POLL_INTERVAL)
+                advance = partial(next, events)
+            elif callable(step):
+                try:
+                    advance = partial(events.send, await loop.run_in_executor(None, step))
+                except Exception as e:
+                    advance = partial(events.throw, e)
+            else:
+                await send({'type': 'http.response.body', 'body': step.encode('utf-8'), 'more_body': True})
+                advance = partial(next, events)
+            try:
+                step = advance()
+            except StopIteration:
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+    finally:
+        watcher.cancel()
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Слабое сравнение If-None-Match: список меток через запятую или *"""
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def _header(scope: Dict, name: str) -> str:
+    for key, value in scope['headers']:
+        if key.decode('latin-1').lower() == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def handle(scope: Dict, receive, send_message) -> None:
+    method, path = scope['method'], scope['path']
+    started = False
+
+    async def send(message: Dict) -> None:
+        # Ответ с ошибкой можно отправить, только пока ответ не начат
+        nonlocal started
+        started = started or message['type'] == 'http.response.start'
+        await send_message(message)
+
+    try:
+        if path == '/calculate' and method == 'POST':
+            data = await read_json(receive)
+            fields = parse_fields(dict(parse_qsl(scope['query_string'].decode('latin-1'))).get('fields'))
+            # Стандартный размер и повторный расчет не обращаются к пулу
+            result = await cached_calculation(data)
+            body, headers = encode_result(result, fields, _header(scope, 'accept'), _header(scope, 'accept-encoding'))
+            await send_response(send, 200, [(name.lower(), value) for name, value in headers.items()]
+                                + [('content-length', str(len(body)))], body)
+        elif path == '/calculate' and method in ('GET', 'HEAD'):
+            await send_calculation(scope, send)
+        elif path in EXPORT_PATHS and method == 'POST':
+            kind = EXPORT_PATHS[path]
+            data = await read_json(receive)
+            suffix, _, filename = main.EXPORTS[kind]
+            render = partial(_flights.do, artifact_key(kind, data, 0), partial(offload, _export, kind, data))
+            await send_artifact(send, scope, render, main.EXPORT_MIMETYPES[suffix], filename)
+        elif DRAWING_PATH.fullmatch(path) and method in ('GET', 'HEAD'):
+            view, image_format = DRAWING_PATH.fullmatch(path).groups()
+            args = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+            # Ключ как у кэша чертежей: px=800 и отсутствие px - один запрос
+            key = artifact_key('drawing', dict(main.drawing_key(args, view), format=image_format), 0)
+            render = partial(_flights.do, key, partial(offload, _drawing, args, view, image_format))
+            await send_artifact(send, scope, render, main.EXPORT_MIMETYPES[image_format])
+        elif path == '/live/events' and method == 'GET':
+            await send_events(scope, receive, send)
+        elif LIVE_PATH.fullmatch(path) and method == 'POST':
+            data = await read_json(receive)
+            revision = post_edit(main.live_edits, LIVE_PATH.fullmatch(path).group(1), data)
+            await send_json(send, {'success': True, 'revision': revision})
+        else:
+            await send_json(send, {'success': False, 'error': "Маршрут не найден"}, 404)
+    except HttpError as e:
+        if e.status != 499 and not started:
+            await send_json(send, {'success': False, 'error': str(e)}, e.status)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке {path}: {str(e)}")
+        if started:
+            # Ответ уже идет (поток событий, отдача файла): второй ответ не начинается
+            return
+        # Ошибки отдаются как в WSGI-приложении: success=False, у выгрузок и
+        # чертежей - с тем же кодом ответа; ошибка GET /calculate не должна
+        # попасть в кэш прокси
+        status = main.export_status(e) if path in EXPORT_PATHS or DRAWING_PATH.fullmatch(path) else 200
+        await send_json(send, {'success': False, 'error': str(e)}, status, [('cache-control', 'no-store')])
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Процессы пула запускаются до приема соединений: при fork на первом
+            # запросе воркеры унаследовали бы его сокет, и клиент не дождался бы
+            # закрытия соединения
+            await offload(os.getpid)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope: Dict, receive, send) -> None:
+    if scope['type'] == 'http':
+        await handle(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await lifespan(receive, send)
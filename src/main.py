@@ -1,257 +1,818 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from src.utils.calculator import PoolCalculator
+from flask import Flask, Response, render_template, request, jsonify, send_file, abort, redirect
+from werkzeug.exceptions import HTTPException
+from src.utils.calculator import PoolCalculator, build_calculator
+from src.utils.simulation import simulate_costs, simulate_portfolio
+from src.utils.whatif import what_if
+from src.utils.comparison import FINISHES, compare_finishes
+from src.utils.reinforcement import STOCK_LENGTHS, plan_reinforcement
+from src.utils.procurement import consolidate_orders, read_projects
+from src.utils.dispatch import plan_logistics
+from src.utils.schedule import schedule_projects
+from src.utils.operation import load_climate, simulate_operation
+from src.utils.bulk import estimate_rows, file_format, read_rows, write_results
+from src.utils.columnar import export_lines
+from src.utils.artifacts import ArtifactCache, artifact_key
+from src.utils.singleflight import SingleFlight
+from src.utils.sharedcache import SharedCache
+from src.utils.sizetable import SizeTable
+from src.utils.live import new_session, post_edit, stream
+from src.utils.encoding import accepts_gzip, encode_result, negotiate, parse_fields
+from src.utils.report import render_bundle, templates
+from src.utils.drawing import DEFAULT_WIDTH, FONT_SIZE, drawing_params, png_font, render_drawing
 import pandas as pd
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib import colors
+from datetime import datetime
 import io
 import json
 import logging
 import os
+import re
+import tempfile
+import threading
+from urllib.parse import urlencode
 
 app = Flask(__name__, 
     template_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Калькулятор на поток: повторные запросы пересчитывают только узлы графа,
+# зависящие от изменившихся параметров
+_local = threading.local()
+
+def get_calculator() -> PoolCalculator:
+    if not hasattr(_local, 'calculator'):
+        _local.calculator = PoolCalculator()
+    return _local.calculator
+
+# Кэш выгрузок: повторный экспорт той же сметы отдается готовым файлом.
+# Версию шаблона нужно увеличить при изменении render_excel/render_pdf
+TEMPLATE_VERSIONS = {'excel': 1, 'pdf': 1, 'bundle': 2, 'drawing': 1}
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+    'svg': 'image/svg+xml',
+    'png': 'image/png'
+}
+EXPORT_MAX_AGE = 86400  # Выгрузка по ключу не меняется, кэшируется браузером на сутки
+export_cache = ArtifactCache(
+    os.environ.get('EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pool_exports')),
+    int(os.environ.get('EXPORT_CACHE_MB', 256)) * 1024 * 1024
+)
+
+_climate = None
+
+def get_climate():
+    global _climate
+    if _climate is None and os.environ.get('CLIMATE_CSV'):
+        _climate = load_climate(os.environ['CLIMATE_CSV'])
+    return _climate
+
+# Одинаковые одновременные расчеты (например, значения формы по умолчанию) выполняются один раз
+calculations = SingleFlight()
+# Результаты /calculate в общей памяти: при запуске с предзагрузкой (gunicorn.conf.py)
+# область создается в мастер-процессе и общая для всех воркеров
+result_cache = SharedCache(int(os.environ.get('SHARED_CACHE_MB', 16)))
+# Готовые сметы стандартных размеров (сетка 100 мм); при изменении каталога
+# или норм расчета таблица собирается заново в фоне
+size_table = SizeTable(
+    os.environ.get('SIZE_TABLE_DIR', os.path.join(tempfile.gettempdir(), 'pool_sizes')),
+    auto_build=os.environ.get('SIZE_TABLE_BUILD', '1') == '1'
+)
+# Правки форм сеансов живого пересчета: поток событий сеанса может обслуживаться
+# другим воркером, чем запрос с правкой
+live_edits = SharedCache(int(os.environ.get('LIVE_SESSIONS_MB', 1)), slot_bytes=1024)
+# Поток событий занимает поток воркера gthread на все соединение: их число
+# ограничено, чтобы остальным запросам оставались свободные потоки. Без
+# ограничения поток событий отдает ASGI-приложение src.asgi
+live_slots = threading.BoundedSemaphore(int(os.environ.get('LIVE_WSGI_SESSIONS', 2)))
+
+def canonical_params(data) -> dict:
+    """Канонические параметры расчета: 7500 и "7500" - один и тот же запрос"""
+    return {
+        'length': float(data['length']),
+        'width': float(data['width']),
+        'shallow_depth': float(data['shallow_depth']),
+        'deep_depth': float(data['deep_depth']),
+        'steps_count': int(data['steps_count']),
+        'pool_type': data['pool_type'],
+        'finish_type': None if data['pool_type'] == 'liner' else data.get('finish_type', 'ceramic')
+    }
+
+def calculate_key(data) -> str:
+    """Ключ расчета по каноническим параметрам"""
+    return artifact_key('calculate', canonical_params(data), 1)
+
+# GET /calculate кэшируется браузером и обратным прокси: результат определяется
+# параметрами и версией каталога (отпечаток исходного кода расчета и каталога)
+CATALOG_VERSION = size_table.fingerprint
+CALCULATE_MAX_AGE = int(os.environ.get('CALCULATE_MAX_AGE', 3600))
+
+def canonical_query(data, fields) -> str:
+    """Канонический запрос GET /calculate: постоянный порядок параметров и запись чисел"""
+    items = []
+    for name, value in canonical_params(data).items():
+        if value is None:
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        items.append((name, value))
+    if fields:
+        items.append(('fields', ','.join('.'.join(path) for path in fields)))
+    return urlencode(items, safe=',')
+
+def calculate_etag(query: str, media: str, gzip_accepted: bool) -> str:
+    """Сильный ETag представления: параметры, версия каталога, формат и сжатие"""
+    return artifact_key('calculate', {'query': query, 'catalog': CATALOG_VERSION,
+                                      'media': media, 'gzip': gzip_accepted}, 1)
+
+# Входы /calculate; остальные входы калькулятора - по умолчанию
+CALCULATE_INPUTS = ('length', 'width', 'shallow_depth', 'deep_depth', 'steps_count', 'finish_type')
+
+def calculate_result(data, calculator: PoolCalculator) -> dict:
+    """Результат расчета /calculate: размеры, площади, объемы, материалы, работы"""
+    # Все входы задаются заново: формат плитки и грунт, оставленные на
+    # калькуляторе потока маршрутами /tiles и /logistics, сбрасываются к умолчаниям
+    calculator.set_params({name: data[name] for name in CALCULATE_INPUTS if name in data})
+    
+    # Площади и объемы
+    calculator.calculate_areas()
+    calculator.calculate_volumes()
+    
+    # Материалы в зависимости от типа бассейна
+    pool_type = data['pool_type']
+    finish_type = data.get('finish_type', 'ceramic')
+    
+    if pool_type == 'liner':
+        materials = calculator.calculate_materials_liner()
+    else:
+        materials = calculator.calculate_materials_ceramic(finish_type)
+        
+    # Работы
+    works = calculator.calculate_works()
+    
+    # Формируем результат
+    result = {
+        'dimensions': {
+            'internal': {
+                'length': calculator.dimensions.length,
+                'width': calculator.dimensions.width,
+                'shallow_depth': calculator.dimensions.shallow_depth,
+                'deep_depth': calculator.dimensions.deep_depth
+            },
+            'external': {
+                'length': calculator.dimensions.outer_length,
+                'width': calculator.dimensions.outer_width
+            },
+            'pit': {
+                'length': calculator.dimensions.pit_length,
+                'width': calculator.dimensions.pit_width
+            }
+        },
+        'areas': {
+            'bottom': calculator.areas.bottom,
+            'walls': calculator.areas.walls,
+            'steps': calculator.areas.steps,
+            'total': calculator.areas.total,
+            'outer': calculator.areas.outer,
+            'pit': calculator.areas.pit
+        },
+        'volumes': {
+            'pit': calculator.volumes.pit,
+            'concrete_200': calculator.volumes.concrete_200,
+            'concrete_300': calculator.volumes.concrete_300
+        },
+        'materials': materials,
+        'works': works
+    }
+    return result
+
+def preload() -> None:
+    """Загрузка неизменяемых данных в мастер-процессе gunicorn до fork
+
+    Воркеры получают их copy-on-write вместо собственных копий: модули,
+    отложенно импортируемые при первом запросе, шрифты и стили PDF, шрифты
+    чертежей, таблица стандартных размеров, словари каталога.
+    """
+    for module in ('openpyxl', 'PIL.Image', 'PIL.ImageDraw'):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    templates()
+    size_table.load()
+    png_font(FONT_SIZE * 2)  # PNG рисуется с двукратным увеличением
+    calculate_result({'length': 7500, 'width': 4000, 'shallow_depth': 1200, 'deep_depth': 1800,
+                      'steps_count': 4, 'pool_type': 'ceramic'}, PoolCalculator())
+    logger.info("Предзагрузка выполнена")
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def cached_calculation(data) -> dict:
+    """Результат /calculate без лишних расчетов
+
+    Стандартный размер - из таблицы, иначе готовый результат из общего кэша
+    воркеров или расчет калькулятором потока; одновременные одинаковые
+    запросы получают результат одного расчета.
+    """
+    result = size_table.lookup(data)
+    if result is not None:
+        return result
+    key = calculate_key(data)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    def compute() -> dict:
+        result = calculate_result(data, get_calculator())
+        result_cache.put(key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+        return result
+    return calculations.do(key, compute)
+
 @app.route('/calculate', methods=['POST'])
 def calculate():
     try:
         data = request.json
+        fields = parse_fields(request.args.get('fields'))
         
-        # Создаем калькулятор и выполняем расчеты
-        calculator = PoolCalculator()
+        result = cached_calculation(data)
         
-        # Размеры
-        calculator.calculate_dimensions(
-            length_mm=float(data['length']),
-            width_mm=float(data['width']),
-            shallow_depth_mm=float(data['shallow_depth']),
-            deep_depth_mm=float(data['deep_depth']),
-            steps_count=int(data['steps_count'])
-        )
+        # JSON или MessagePack по Accept, gzip по Accept-Encoding, только разделы из fields=
+        body, headers = encode_result(result, fields, request.headers.get('Accept'),
+                                      request.headers.get('Accept-Encoding'))
+        return Response(body, headers=headers)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при расчете: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/calculate', methods=['GET'])
+def calculate_query():
+    """Расчет по параметрам запроса с условным GET: повтор отдается кэшем браузера или прокси"""
+    try:
+        data = request.args.to_dict()
+        fields = parse_fields(data.pop('fields', None))
+        query = canonical_query(data, fields)
+        cache_control = f'public, max-age={CALCULATE_MAX_AGE}'
+        # Один URL на расчет: прокси не хранит копии для 7500 и 7500.0
+        if request.query_string.decode('latin-1') != query:
+            response = redirect(f'{request.path}?{query}', 301)
+            response.headers['Cache-Control'] = cache_control
+            return response
+
+        media = negotiate(request.headers.get('Accept'))
+        etag = calculate_etag(query, media, accepts_gzip(request.headers.get('Accept-Encoding')))
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control, 'Vary': 'Accept, Accept-Encoding'}
+        # ETag известен до расчета: на повторный запрос 304 без расчета
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+
+        body, encoding_headers = encode_result(cached_calculation(data), fields, request.headers.get('Accept'),
+                                               request.headers.get('Accept-Encoding'))
+        return Response(body, headers=dict(encoding_headers, **headers))
+        
+    except Exception as e:
+        logger.error(f"Ошибка при расчете: {str(e)}")
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+def live_result(params, calculator: PoolCalculator) -> dict:
+    """Результат сеанса живого пересчета: из таблицы стандартных размеров или калькулятором сеанса"""
+    result = size_table.lookup(params)
+    return result if result is not None else calculate_result(params, calculator)
+
+@app.route('/live/events')
+def live_events():
+    """Поток Server-Sent Events живого пересчета; параметры запроса - начальное состояние формы"""
+    if not live_slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': "Слишком много сеансов живого пересчета"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    try:
+        session = new_session()
+        if request.args:
+            post_edit(live_edits, session, request.args.to_dict())
+    except Exception as e:
+        live_slots.release()
+        logger.error(f"Ошибка при открытии сеанса: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+    response = Response(stream(session, live_edits, live_result), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Место освобождается при закрытии соединения, даже если поток не начался
+    response.call_on_close(live_slots.release)
+    return response
+
+@app.route('/live/<session>', methods=['POST'])
+def live_edit(session):
+    try:
+        revision = post_edit(live_edits, session, request.json)
+        return jsonify({'success': True, 'revision': revision})
+    except Exception as e:
+        logger.error(f"Ошибка при правке сеанса: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/compare', methods=['POST'])
+def compare():
+    try:
+        data = request.json
+        
+        # Все варианты отделки из одного расчета геометрии и базовых материалов
+        result = compare_finishes(data, data.get('finishes', list(FINISHES)), get_calculator())
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при сравнении вариантов отделки: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/reinforcement', methods=['POST'])
+def reinforcement():
+    try:
+        data = request.json
+        
+        calculator = build_calculator(data, get_calculator())
+        
+        # Длины хлыстов по умолчанию берутся из узла графа калькулятора
+        if 'stock_lengths' in data or data.get('exact'):
+            result = plan_reinforcement(
+                calculator.dimensions,
+                stock_lengths=[float(length) for length in data.get('stock_lengths', STOCK_LENGTHS)],
+                exact=bool(data.get('exact', False))
+            )
+        else:
+            result = calculator.calculate_reinforcement()
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при расчете арматуры: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/tiles', methods=['POST'])
+def tiles():
+    try:
+        data = request.json
+        
+        # Раскладка по формату из запроса ('tile') или по умолчанию для отделки
+        calculator = build_calculator(data, get_calculator())
+        result = calculator.calculate_tile_layout(data.get('finish_type', 'ceramic'))
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при раскладке плитки: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/rolls', methods=['POST'])
+def rolls():
+    try:
+        data = request.json
+        
+        # Раскрой лайнера, геотекстиля и стеклосетки по ширине рулонов из каталога
+        calculator = build_calculator(data, get_calculator())
+        result = calculator.calculate_roll_plans()
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при раскрое рулонов: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/formwork', methods=['POST'])
+def formwork():
+    try:
+        data = request.json
         
-        # Площади и объемы
-        calculator.calculate_areas()
-        calculator.calculate_volumes()
+        # Раскладка щитов опалубки по заливкам с оборачиваемостью листов
+        calculator = build_calculator(data, get_calculator())
+        result = calculator.calculate_formwork()
         
-        # Материалы в зависимости от типа бассейна
-        pool_type = data['pool_type']
-        finish_type = data.get('finish_type', 'ceramic')
+        return jsonify({'success': True, 'data': result})
         
-        if pool_type == 'liner':
-            materials = calculator.calculate_materials_liner()
+    except Exception as e:
+        logger.error(f"Ошибка при расчете опалубки: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/procurement', methods=['POST'])
+def procurement():
+    try:
+        # Проекты списком в JSON или построчно в JSON Lines (читается потоком)
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            projects = read_projects(request.stream)
         else:
-            materials = calculator.calculate_materials_ceramic(finish_type)
-            
-        # Работы
-        works = calculator.calculate_works()
-        
-        # Формируем результат
-        result = {
-            'dimensions': {
-                'internal': {
-                    'length': calculator.dimensions.length,
-                    'width': calculator.dimensions.width,
-                    'shallow_depth': calculator.dimensions.shallow_depth,
-                    'deep_depth': calculator.dimensions.deep_depth
-                },
-                'external': {
-                    'length': calculator.dimensions.outer_length,
-                    'width': calculator.dimensions.outer_width
-                },
-                'pit': {
-                    'length': calculator.dimensions.pit_length,
-                    'width': calculator.dimensions.pit_width
-                }
-            },
-            'areas': {
-                'bottom': calculator.areas.bottom,
-                'walls': calculator.areas.walls,
-                'steps': calculator.areas.steps,
-                'total': calculator.areas.total,
-                'outer': calculator.areas.outer,
-                'pit': calculator.areas.pit
-            },
-            'volumes': {
-                'pit': calculator.volumes.pit,
-                'concrete_200': calculator.volumes.concrete_200,
-                'concrete_300': calculator.volumes.concrete_300
-            },
-            'materials': materials,
-            'works': works
-        }
+            projects = request.json.get('projects', [])
+        
+        # Сводный заказ с округлением до упаковок, паллет и машин
+        result = consolidate_orders(projects, get_calculator())
         
         return jsonify({'success': True, 'data': result})
         
     except Exception as e:
-        logger.error(f"Ошибка при расчете: {str(e)}")
+        logger.error(f"Ошибка при расчете сводного заказа: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/export/excel', methods=['POST'])
-def export_excel():
+@app.route('/logistics', methods=['POST'])
+def logistics():
     try:
         data = request.json
         
-        # Создаем Excel файл
-        output = io.BytesIO()
-        writer = pd.ExcelWriter(output, engine='xlsxwriter')
-        
-        # Размеры
-        dimensions_df = pd.DataFrame([
-            ['Внутренние размеры', f"{data['dimensions']['internal']['length']:.2f}x{data['dimensions']['internal']['width']:.2f}"],
-            ['Глубина (мелкая часть)', f"{data['dimensions']['internal']['shallow_depth']:.2f}"],
-            ['Глубина (глубокая часть)', f"{data['dimensions']['internal']['deep_depth']:.2f}"],
-            ['Наружные размеры', f"{data['dimensions']['external']['length']:.2f}x{data['dimensions']['external']['width']:.2f}"],
-            ['Размеры котлована', f"{data['dimensions']['pit']['length']:.2f}x{data['dimensions']['pit']['width']:.2f}"]
-        ], columns=['Параметр', 'Значение'])
-        dimensions_df.to_excel(writer, sheet_name='Размеры', index=False)
-        
-        # Площади
-        areas_df = pd.DataFrame([
-            ['Площадь дна', data['areas']['bottom'], 'м²'],
-            ['Площадь стен', data['areas']['walls'], 'м²'],
-            ['Площадь ступеней', data['areas']['steps'], 'м²'],
-            ['Общая площадь', data['areas']['total'], 'м²'],
-            ['Наружная площадь', data['areas']['outer'], 'м²'],
-            ['Площадь котлована', data['areas']['pit'], 'м²']
-        ], columns=['Параметр', 'Значение', 'Единица'])
-        areas_df.to_excel(writer, sheet_name='Площади', index=False)
-        
-        # Объемы
-        volumes_df = pd.DataFrame([
-            ['Объем котлована', data['volumes']['pit'], 'м³'],
-            ['Объем бетона М200', data['volumes']['concrete_200'], 'м³'],
-            ['Объем бетона М300', data['volumes']['concrete_300'], 'м³']
-        ], columns=['Параметр', 'Значение', 'Единица'])
-        volumes_df.to_excel(writer, sheet_name='Объемы', index=False)
-        
-        # Материалы
-        materials = [[k, v] for k, v in data['materials'].items()]
-        materials_df = pd.DataFrame(materials, columns=['Материал', 'Количество'])
-        materials_df.to_excel(writer, sheet_name='Материалы', index=False)
-        
-        # Работы
-        works_df = pd.DataFrame(data['works'])
-        works_df.to_excel(writer, sheet_name='Работы', index=False)
-        
-        writer.close()
+        # Соседние объекты на одну смену и парк техники
+        result = plan_logistics(data.get('sites', []), data.get('fleet'), get_calculator())
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при планировании логистики: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/schedule', methods=['POST'])
+def schedule():
+    try:
+        data = request.json
+        
+        # Активные проекты и количество бригад по специальностям
+        result = schedule_projects(data.get('projects', []), data.get('crews'), get_calculator())
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при составлении графика: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/operation', methods=['POST'])
+def operation():
+    try:
+        data = request.json
+        
+        # Климат из CSV по пути CLIMATE_CSV, без него - типовой год
+        climate = get_climate()
+        designs = data['designs'] if 'designs' in data else [data]
+        results = simulate_operation(designs, data.get('operation'), climate)
+        
+        return jsonify({'success': True, 'data': results if 'designs' in data else results[0]})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при расчете эксплуатации: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/simulate', methods=['POST'])
+def simulate():
+    try:
+        data = request.json
+        
+        # Настройки моделирования: распределения запасов и цен, число испытаний
+        config = data.get('simulation', {})
+        
+        # Портфель смет или одна смета
+        if 'designs' in data:
+            result = simulate_portfolio(data['designs'], config, data.get('processes'))
+        else:
+            result = simulate_costs(data, config)
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при моделировании стоимости: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/whatif', methods=['POST'])
+def whatif():
+    try:
+        data = request.json
+        
+        # Базовый проект и изменения к нему
+        result = what_if(
+            data['base'],
+            data.get('changes', {}),
+            with_sensitivities=data.get('sensitivities', True)
+        )
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"Ошибка при расчете изменений: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/import', methods=['POST'])
+def import_specs():
+    try:
+        # Таблица параметров (.xlsx или .csv) читается и рассчитывается потоком
+        upload = request.files['file']
+        source_format = file_format(upload.filename)
+        output = tempfile.TemporaryFile()
+        rows = read_rows(upload.stream, source_format)
+        write_results(estimate_rows(rows, get_calculator()), output, source_format)
         output.seek(0)
         
+        mimetypes = {
+            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'csv': 'text/csv'
+        }
         return send_file(
             output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            mimetype=mimetypes[source_format],
             as_attachment=True,
-            download_name='pool_calculation.xlsx'
+            download_name=f'pool_import.{source_format}'
         )
         
     except Exception as e:
-        logger.error(f"Ошибка при экспорте в Excel: {str(e)}")
+        logger.error(f"Ошибка при импорте таблицы: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/export/pdf', methods=['POST'])
-def export_pdf():
+@app.route('/export/parquet', methods=['POST'])
+def export_parquet():
     try:
         data = request.json
         
-        # Создаем PDF
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        # Заголовок
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, height - 50, "Расчет бассейна")
-        
-        # Размеры
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, height - 100, "Размеры:")
-        p.setFont("Helvetica", 12)
-        y = height - 120
-        p.drawString(70, y, f"Внутренние: {data['dimensions']['internal']['length']:.2f}x{data['dimensions']['internal']['width']:.2f} м")
-        y -= 20
-        p.drawString(70, y, f"Глубина: {data['dimensions']['internal']['shallow_depth']:.2f}-{data['dimensions']['internal']['deep_depth']:.2f} м")
-        y -= 20
-        p.drawString(70, y, f"Наружные: {data['dimensions']['external']['length']:.2f}x{data['dimensions']['external']['width']:.2f} м")
-        y -= 20
-        p.drawString(70, y, f"Котлован: {data['dimensions']['pit']['length']:.2f}x{data['dimensions']['pit']['width']:.2f} м")
+        # Позиции всех смет портфеля: строка на проект x материал/работу
+        output = io.BytesIO()
+        export_lines(data['designs'], output, 'parquet', get_calculator())
+        output.seek(0)
         
-        # Площади
-        y -= 40
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Площади:")
-        p.setFont("Helvetica", 12)
-        y -= 20
-        p.drawString(70, y, f"Дно: {data['areas']['bottom']:.2f} м²")
-        y -= 20
-        p.drawString(70, y, f"Стены: {data['areas']['walls']:.2f} м²")
-        y -= 20
-        p.drawString(70, y, f"Ступени: {data['areas']['steps']:.2f} м²")
-        y -= 20
-        p.drawString(70, y, f"Общая: {data['areas']['total']:.2f} м²")
+        return send_file(
+            output,
+            mimetype='application/vnd.apache.parquet',
+            as_attachment=True,
+            download_name='pool_estimates.parquet'
+        )
         
-        # Объемы
-        y -= 40
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Объемы:")
-        p.setFont("Helvetica", 12)
-        y -= 20
-        p.drawString(70, y, f"Котлован: {data['volumes']['pit']:.2f} м³")
-        y -= 20
-        p.drawString(70, y, f"Бетон М200: {data['volumes']['concrete_200']:.2f} м³")
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте в Parquet: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), export_status(e)
+
+def render_excel(data) -> bytes:
+    """Смета в Excel"""
+    # Создаем Excel файл
+    output = io.BytesIO()
+    writer = pd.ExcelWriter(output, engine='xlsxwriter')
+    
+    # Размеры
+    dimensions_df = pd.DataFrame([
+        ['Внутренние размеры', f"{data['dimensions']['internal']['length']:.2f}x{data['dimensions']['internal']['width']:.2f}"],
+        ['Глубина (мелкая часть)', f"{data['dimensions']['internal']['shallow_depth']:.2f}"],
+        ['Глубина (глубокая часть)', f"{data['dimensions']['internal']['deep_depth']:.2f}"],
+        ['Наружные размеры', f"{data['dimensions']['external']['length']:.2f}x{data['dimensions']['external']['width']:.2f}"],
+        ['Размеры котлована', f"{data['dimensions']['pit']['length']:.2f}x{data['dimensions']['pit']['width']:.2f}"]
+    ], columns=['Параметр', 'Значение'])
+    dimensions_df.to_excel(writer, sheet_name='Размеры', index=False)
+    
+    # Площади
+    areas_df = pd.DataFrame([
+        ['Площадь дна', data['areas']['bottom'], 'м²'],
+        ['Площадь стен', data['areas']['walls'], 'м²'],
+        ['Площадь ступеней', data['areas']['steps'], 'м²'],
+        ['Общая площадь', data['areas']['total'], 'м²'],
+        ['Наружная площадь', data['areas']['outer'], 'м²'],
+        ['Площадь котлована', data['areas']['pit'], 'м²']
+    ], columns=['Параметр', 'Значение', 'Единица'])
+    areas_df.to_excel(writer, sheet_name='Площади', index=False)
+    
+    # Объемы
+    volumes_df = pd.DataFrame([
+        ['Объем котлована', data['volumes']['pit'], 'м³'],
+        ['Объем бетона М200', data['volumes']['concrete_200'], 'м³'],
+        ['Объем бетона М300', data['volumes']['concrete_300'], 'м³']
+    ], columns=['Параметр', 'Значение', 'Единица'])
+    volumes_df.to_excel(writer, sheet_name='Объемы', index=False)
+    
+    # Материалы
+    materials = [[k, v] for k, v in data['materials'].items()]
+    materials_df = pd.DataFrame(materials, columns=['Материал', 'Количество'])
+    materials_df.to_excel(writer, sheet_name='Материалы', index=False)
+    
+    # Работы
+    works_df = pd.DataFrame(data['works'])
+    works_df.to_excel(writer, sheet_name='Работы', index=False)
+    
+    writer.close()
+    return output.getvalue()
+
+def render_pdf(data) -> bytes:
+    """Смета в PDF"""
+    # Создаем PDF
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    
+    # Заголовок
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, "Расчет бассейна")
+    
+    # Размеры
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, height - 100, "Размеры:")
+    p.setFont("Helvetica", 12)
+    y = height - 120
+    p.drawString(70, y, f"Внутренние: {data['dimensions']['internal']['length']:.2f}x{data['dimensions']['internal']['width']:.2f} м")
+    y -= 20
+    p.drawString(70, y, f"Глубина: {data['dimensions']['internal']['shallow_depth']:.2f}-{data['dimensions']['internal']['deep_depth']:.2f} м")
+    y -= 20
+    p.drawString(70, y, f"Наружные: {data['dimensions']['external']['length']:.2f}x{data['dimensions']['external']['width']:.2f} м")
+    y -= 20
+    p.drawString(70, y, f"Котлован: {data['dimensions']['pit']['length']:.2f}x{data['dimensions']['pit']['width']:.2f} м")
+    
+    # Площади
+    y -= 40
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Площади:")
+    p.setFont("Helvetica", 12)
+    y -= 20
+    p.drawString(70, y, f"Дно: {data['areas']['bottom']:.2f} м²")
+    y -= 20
+    p.drawString(70, y, f"Стены: {data['areas']['walls']:.2f} м²")
+    y -= 20
+    p.drawString(70, y, f"Ступени: {data['areas']['steps']:.2f} м²")
+    y -= 20
+    p.drawString(70, y, f"Общая: {data['areas']['total']:.2f} м²")
+    
+    # Объемы
+    y -= 40
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Объемы:")
+    p.setFont("Helvetica", 12)
+    y -= 20
+    p.drawString(70, y, f"Котлован: {data['volumes']['pit']:.2f} м³")
+    y -= 20
+    p.drawString(70, y, f"Бетон М200: {data['volumes']['concrete_200']:.2f} м³")
+    y -= 20
+    p.drawString(70, y, f"Бетон М300: {data['volumes']['concrete_300']:.2f} м³")
+    
+    # Материалы
+    y -= 40
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Материалы:")
+    p.setFont("Helvetica", 12)
+    y -= 20
+    for material, quantity in data['materials'].items():
+        p.drawString(70, y, f"{material}: {quantity:.2f}")
         y -= 20
-        p.drawString(70, y, f"Бетон М300: {data['volumes']['concrete_300']:.2f} м³")
+        if y < 50:  # Если место на странице заканчивается
+            p.showPage()
+            y = height - 50
+            p.setFont("Helvetica", 12)
+    
+    # Работы
+    if y < 100:  # Если осталось мало места, начинаем новую страницу
+        p.showPage()
+        y = height - 50
         
-        # Материалы
-        y -= 40
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Материалы:")
-        p.setFont("Helvetica", 12)
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Работы:")
+    p.setFont("Helvetica", 12)
+    y -= 20
+    for work in data['works']:
+        p.drawString(70, y, f"{work['name']}: {work['quantity']} {work['unit']}")
         y -= 20
-        for material, quantity in data['materials'].items():
-            p.drawString(70, y, f"{material}: {quantity:.2f}")
-            y -= 20
-            if y < 50:  # Если место на странице заканчивается
-                p.showPage()
-                y = height - 50
-                p.setFont("Helvetica", 12)
-        
-        # Работы
-        if y < 100:  # Если осталось мало места, начинаем новую страницу
+        if y < 50:
             p.showPage()
             y = height - 50
-            
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Работы:")
-        p.setFont("Helvetica", 12)
-        y -= 20
-        for work in data['works']:
-            p.drawString(70, y, f"{work['name']}: {work['quantity']} {work['unit']}")
-            y -= 20
-            if y < 50:
-                p.showPage()
-                y = height - 50
-                p.setFont("Helvetica", 12)
+            p.setFont("Helvetica", 12)
+    
+    p.save()
+    return buffer.getvalue()
+
+def render_bundle_pdf(data) -> bytes:
+    """Комплект смет вариантов в PDF"""
+    output = io.BytesIO()
+    render_bundle(data['designs'], output, get_calculator())
+    return output.getvalue()
+
+# Выгрузки: вид -> (расширение, отрисовка, имя файла)
+EXPORTS = {
+    'excel': ('xlsx', render_excel, 'pool_calculation.xlsx'),
+    'pdf': ('pdf', render_pdf, 'pool_calculation.pdf'),
+    'bundle': ('pdf', render_bundle_pdf, 'pool_variants.pdf')
+}
+
+def export_status(e: Exception) -> int:
+    """Код ответа при ошибке выгрузки или чертежа: неверные входные данные - 400"""
+    if isinstance(e, HTTPException):
+        return e.code
+    return 400 if isinstance(e, (ValueError, KeyError, TypeError)) else 500
+
+def cached_export(kind: str, data) -> dict:
+    """Файл выгрузки из кэша или после отрисовки: {'key', 'path', 'hit'}"""
+    suffix, render, _ = EXPORTS[kind]
+    key = data
+    if kind == 'bundle':
+        # Дата печатается в комплекте, поэтому входит в ключ кэша
+        key = {'designs': data['designs'], 'date': datetime.now().strftime('%Y-%m-%d')}
+    # После смены цен или норм выгрузка строится заново
+    key = {'data': key, 'catalog': CATALOG_VERSION}
+    return export_cache.get_or_render(kind, suffix, key, TEMPLATE_VERSIONS[kind], lambda: render(data))
+
+def drawing_key(args: dict, view: str) -> dict:
+    """Ключ чертежа: проверенные параметры, вид и ширина; одинаковые по смыслу запросы совпадают"""
+    try:
+        width = int(args.get('px', DEFAULT_WIDTH))
+    except ValueError:
+        raise ValueError(f"Некорректная ширина чертежа: {args.get('px')}")
+    return {'params': drawing_params(args), 'view': view, 'width': width}
+
+def cached_drawing(args: dict, view: str, image_format: str) -> dict:
+    """Чертеж из кэша или после отрисовки по параметрам строки запроса"""
+    key = drawing_key(args, view)
+    return export_cache.get_or_render('drawing', image_format, key, TEMPLATE_VERSIONS['drawing'],
+                                      lambda: render_drawing(key['params'], view, image_format, key['width']))
+
+def send_cached(cached, **kwargs):
+    """send_file для файла из кэша выгрузок
+
+    Вытеснение в другом процессе может удалить файл между cached() и
+    открытием: тогда выгрузка отрисовывается еще раз.
+    """
+    artifact = cached()
+    try:
+        return send_file(artifact['path'], etag=artifact['key'], **kwargs)
+    except FileNotFoundError:
+        artifact = cached()
+        return send_file(artifact['path'], etag=artifact['key'], **kwargs)
+
+@app.route('/export/excel', methods=['POST'])
+def export_excel():
+    try:
+        data = request.json
         
-        p.save()
-        buffer.seek(0)
+        # Повторная выгрузка той же сметы отдается из кэша
+        return send_cached(
+            lambda: cached_export('excel', data),
+            mimetype=EXPORT_MIMETYPES['xlsx'],
+            as_attachment=True,
+            download_name=EXPORTS['excel'][2]
+        )
         
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте в Excel: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), export_status(e)
+
+@app.route('/export/pdf', methods=['POST'])
+def export_pdf():
+    try:
+        data = request.json
+        
+        # Повторная выгрузка той же сметы отдается из кэша
+        return send_cached(
+            lambda: cached_export('pdf', data),
+            mimetype=EXPORT_MIMETYPES['pdf'],
             as_attachment=True,
-            download_name='pool_calculation.pdf'
+            download_name=EXPORTS['pdf'][2]
         )
         
     except Exception as e:
         logger.error(f"Ошибка при экспорте в PDF: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)})
+        return jsonify({'success': False, 'error': str(e)}), export_status(e)
+
+@app.route('/export/bundle', methods=['POST'])
+def export_bundle():
+    try:
+        data = request.json
+        
+        # Комплект вариантов для клиента: сводная таблица и сметы в одном PDF
+        return send_cached(
+            lambda: cached_export('bundle', data),
+            mimetype=EXPORT_MIMETYPES['pdf'],
+            as_attachment=True,
+            download_name=EXPORTS['bundle'][2]
+        )
+        
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте комплекта смет: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), export_status(e)
+
+@app.route('/drawing/<view>.<image_format>')
+def drawing(view, image_format):
+    try:
+        # План или разрез по параметрам в строке запроса:
+        # /drawing/plan.svg?length=7500&width=4000&shallow_depth=1200&deep_depth=1800&steps_count=4
+        args = request.args.to_dict()
+        return send_cached(lambda: cached_drawing(args, view, image_format),
+                           mimetype=EXPORT_MIMETYPES[image_format], max_age=EXPORT_MAX_AGE)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при построении чертежа: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), export_status(e)
+
+@app.route('/export/artifacts/<key>.<suffix>')
+def export_artifact(key, suffix):
+    # Готовая выгрузка по ключу: статический файл с условным GET по ETag
+    if suffix not in EXPORT_MIMETYPES or not re.fullmatch(r'[0-9a-f]{64}', key):
+        abort(404)
+    path = export_cache.get(key, suffix)
+    if path is None:
+        abort(404)
+    try:
+        return send_file(path, mimetype=EXPORT_MIMETYPES[suffix], etag=key, max_age=EXPORT_MAX_AGE)
+    except FileNotFoundError:
+        # Файл удален вытеснением после проверки
+        abort(404)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -10,6 +10,7 @@ from ui.widgets.works_table import WorksTable
 from ui.widgets.preview import PoolPreview
 from utils.project import Project
 from utils.calculator import PoolCalculator
+from utils.catalog import price_materials, price_works
 import os
 
 class MainWindow(QMainWindow):
@@ -21,6 +22,10 @@ class MainWindow(QMainWindow):
         # Текущий проект
         self.current_project = Project()
         
+        # Калькулятор живет все время работы окна: при правке параметра
+        # пересчитываются только зависящие от него величины
+        self.calculator = PoolCalculator()
+        
         # Создаем центральный виджет
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -301,8 +306,16 @@ class MainWindow(QMainWindow):
             params = self.pool_designer.get_parameters()
             
             # Рассчитываем материалы и работы
-            materials = PoolCalculator.calculate_materials(params)
-            works = PoolCalculator.calculate_works(params)
+            self.calculator.set_inputs(
+                length_mm=params['length'],
+                width_mm=params['width'],
+                shallow_depth_mm=params['depth'],
+                deep_depth_mm=params['depth'],
+                steps_count=len(params['stairs'])
+            )
+            pool_type = 'liner' if params['finish_type'] == "Лайнер" else 'ceramic'
+            materials = price_materials(self.calculator.calculate_materials(pool_type))
+            works = price_works(self.calculator.calculate_works())
             
             # Обновляем таблицы
             self.materials_table.set_materials(materials)
@@ -0,0 +1,122 @@
+from typing import Callable, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = 256 * 1024 * 1024  # Размер кэша по умолчанию
+EVICT_INTERVAL = 60.0  # Каталог пересчитывается не реже: его пополняют и другие процессы, с
+
+
+def canonical_json(data) -> bytes:
+    """Каноническое представление: сортированные ключи, без пробелов"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def artifact_key(kind: str, data, version: int) -> str:
+    """Ключ артефакта: хеш канонической сметы, вида выгрузки и версии шаблона"""
+    digest = hashlib.sha256()
+    digest.update(f'{kind}:{version}:'.encode('utf-8'))
+    digest.update(canonical_json(data))
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Кэш готовых выгрузок на диске с адресацией по содержимому
+
+    Файл называется ключом, поэтому один и тот же ключ всегда дает тот же
+    файл и кэш можно делить между процессами. При превышении max_bytes
+    удаляются давно не использованные файлы (по времени изменения, которое
+    обновляется при каждом обращении). Каталог обходится, только когда
+    оценка размера превысила max_bytes или прошло EVICT_INTERVAL.
+    """
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._size: Optional[int] = None  # Оценка размера после последнего обхода
+        self._scanned = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    def get(self, key: str, suffix: str) -> Optional[str]:
+        """Путь к готовому файлу или None"""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, suffix: str, content: bytes) -> str:
+        """Сохранить файл атомарно (через временный файл) и проверить размер кэша"""
+        path = self.path(key, suffix)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        with self._lock:
+            if self._size is not None:
+                self._size += len(content)
+            due = (self._size is None or self._size > self.max_bytes
+                   or time.monotonic() - self._scanned > EVICT_INTERVAL)
+        if due:
+            # Только что записанный файл возвращается вызывающему и не вытесняется,
+            # даже если он один больше max_bytes
+            self.evict(protect=path)
+        return path
+
+    def get_or_render(self, kind: str, suffix: str, data, version: int,
+                      render: Callable[[], bytes]) -> Dict[str, str]:
+        """Файл выгрузки из кэша или после отрисовки: {'key', 'path', 'hit'}"""
+        key = artifact_key(kind, data, version)
+        path = self.get(key, suffix)
+        if path is not None:
+            return {'key': key, 'path': path, 'hit': True}
+        # Одновременные запросы той же выгрузки ждут одну отрисовку
+        path = self._flight.do((key, suffix), lambda: self.get(key, suffix) or self.put(key, suffix, render()))
+        return {'key': key, 'path': path, 'hit': False}
+
+    def evict(self, protect: Optional[str] = None) -> int:
+        """Удалить самые старые файлы сверх max_bytes, кроме protect, вернуть число удаленных"""
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == protect:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._size = total
+            self._scanned = time.monotonic()
+        if removed:
+            logger.debug(f"Кэш выгрузок: удалено {removed} файлов")
+        return removed
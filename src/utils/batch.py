@@ -0,0 +1,228 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+from .bulk import RESULT_FIELDS, RESULT_HEADER, estimate_row, read_rows
+from .calculator import PoolCalculator
+from .columnar import LineWriter, estimate_chunk_lines
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200  # Проектов в одной задаче для процесса
+FORMATS = ('csv', 'jsonl', 'parquet', 'arrow')
+
+# Калькулятор процесса-исполнителя: создается при первой задаче
+_calculator: Optional[PoolCalculator] = None
+
+
+def estimate_chunk(chunk: List[Tuple[int, Dict]]) -> List[Dict]:
+    """Сметы порции проектов в процессе-исполнителе"""
+    global _calculator
+    if _calculator is None:
+        _calculator = PoolCalculator()
+    return [estimate_row(number, row, _calculator) for number, row in chunk]
+
+
+def read_designs(file: IO, input_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Проекты из CSV или JSON Lines потоком: (номер строки, параметры)"""
+    if input_format == 'csv':
+        yield from read_rows(file, 'csv')
+    elif input_format == 'jsonl':
+        for number, line in enumerate(file, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Строка {number}: некорректный JSON ({e.msg})")
+                    yield number, {}
+    else:
+        raise ValueError(f"Неподдерживаемый формат ввода: {input_format}")
+
+
+def run_batch(designs: Iterable[Tuple[int, Dict]], processes: Optional[int] = None,
+              chunk_size: int = CHUNK_SIZE, worker: Callable = estimate_chunk) -> Iterator:
+    """Сметы порциями в пуле процессов с сохранением порядка
+
+    worker - расчет порции в процессе: estimate_chunk (итоги смет) или
+    estimate_chunk_lines (позиции в виде массивов для LineWriter).
+
+    В работе не больше двух порций на процесс, поэтому входной поток читается
+    по мере расчета и память не растет с размером файла.
+    """
+    processes = processes or os.cpu_count() or 1
+    designs = iter(designs)
+    chunks = iter(lambda: list(islice(designs, chunk_size)), [])
+    if processes < 2:
+        for chunk in chunks:
+            yield worker(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(worker, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _CsvWriter:
+    """Итоги смет в CSV"""
+    def __init__(self, file: IO):
+        self.writer = csv.writer(file)
+        self.writer.writerow(RESULT_HEADER)
+
+    def write(self, results: List[Dict]) -> None:
+        self.writer.writerows([result.get(field) for field in RESULT_FIELDS] for result in results)
+
+    def close(self) -> None:
+        pass
+
+
+class _JsonlWriter:
+    """Сметы с позициями материалов и работ в JSON Lines"""
+    def __init__(self, file: IO):
+        self.file = file
+
+    def write(self, results: List[Dict]) -> None:
+        for result in results:
+            self.file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def close(self) -> None:
+        pass
+
+
+class _ParquetWriter:
+    """Итоги смет в Parquet: группа строк на порцию (нужен pyarrow)"""
+    def __init__(self, file: IO):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для вывода в Parquet установите pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([
+            ('row', pa.int64()), ('name', pa.string()),
+            ('length', pa.float64()), ('width', pa.float64()),
+            ('shallow_depth', pa.float64()), ('deep_depth', pa.float64()),
+            ('steps_count', pa.int64()), ('pool_type', pa.string()), ('finish_type', pa.string()),
+            ('concrete_300', pa.float64()), ('pit', pa.float64()),
+            ('materials_total', pa.float64()), ('works_total', pa.float64()),
+            ('total', pa.float64()), ('error', pa.string())
+        ])
+        self.writer = pq.ParquetWriter(file, self.schema)
+
+    def write(self, results: List[Dict]) -> None:
+        columns = {}
+        for field in self.schema:
+            values = [result.get(field.name) for result in results]
+            if field.type == self.pa.string():
+                values = [None if value is None else str(value) for value in values]
+            elif field.name != 'row' and any(result['error'] for result in results):
+                # В строках с ошибкой параметры остаются как в исходном файле
+                values = [None if result['error'] else value for result, value in zip(results, values)]
+            columns[field.name] = values
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+WRITERS: Dict[str, Callable] = {'csv': _CsvWriter, 'jsonl': _JsonlWriter, 'parquet': _ParquetWriter}
+
+
+def _format(path: str) -> str:
+    """Формат по расширению файла"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in FORMATS:
+        raise ValueError(f"Не удалось определить формат файла {path}, укажите его явно")
+    return extension
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Пакетный расчет смет по файлу проектов")
+    parser.add_argument('source', help="Файл проектов (.csv, .jsonl) или - для stdin")
+    parser.add_argument('target', help="Файл результатов (.csv, .jsonl, .parquet) или - для stdout")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="Формат ввода (для stdin по умолчанию jsonl)")
+    parser.add_argument('--output-format', choices=FORMATS, help="Формат вывода (для stdout по умолчанию jsonl)")
+    parser.add_argument('--processes', type=int, default=None, help="Число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Проектов в одной задаче")
+    parser.add_argument('--lines', action='store_true',
+                        help="Строка на каждую позицию сметы (только Parquet и Arrow)")
+    parser.add_argument('--quiet', action='store_true', help="Не выводить прогресс")
+    args = parser.parse_args(argv)
+
+    try:
+        input_format = args.input_format or ('jsonl' if args.source == '-' else _format(args.source))
+        output_format = args.output_format or ('jsonl' if args.target == '-' else _format(args.target))
+    except ValueError as e:
+        parser.error(str(e))
+    if output_format in ('parquet', 'arrow') and args.target == '-':
+        parser.error("Parquet и Arrow нельзя вывести в stdout")
+    if output_format == 'arrow' and not args.lines or args.lines and output_format not in ('parquet', 'arrow'):
+        parser.error("Позиции выгружаются только в Parquet или Arrow (--lines)")
+
+    if args.source == '-':
+        source = sys.stdin
+    elif input_format == 'csv':
+        source = open(args.source, 'rb')
+    else:
+        source = open(args.source, encoding='utf-8')
+    if args.target == '-':
+        target = sys.stdout
+    elif output_format in ('parquet', 'arrow'):
+        target = open(args.target, 'wb')
+    else:
+        target = open(args.target, 'w', newline='', encoding='utf-8')
+
+    started = time.perf_counter()
+    done = 0
+    errors = 0
+    try:
+        designs = read_designs(source, input_format)
+        if args.lines:
+            writer = LineWriter(target, output_format)
+            chunks = run_batch(designs, args.processes, args.chunk_size, estimate_chunk_lines)
+        else:
+            writer = WRITERS[output_format](target)
+            chunks = run_batch(designs, args.processes, args.chunk_size)
+        for chunk in chunks:
+            if args.lines:
+                writer.add(chunk)
+                done += len(chunk['names']) + chunk['errors']
+                errors += chunk['errors']
+            else:
+                writer.write(chunk)
+                done += len(chunk)
+                errors += sum(1 for result in chunk if result['error'])
+            if not args.quiet:
+                elapsed = time.perf_counter() - started
+                print(f"\rРассчитано: {done}, с ошибками: {errors}, {done / elapsed:.0f} проектов/с",
+                      end='', file=sys.stderr, flush=True)
+        writer.close()
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        print(f"\rРассчитано: {done}, с ошибками: {errors} за {elapsed:.1f} с "
+              f"({done / elapsed if elapsed else 0:.0f} проектов/с)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
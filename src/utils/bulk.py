@@ -0,0 +1,235 @@
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import codecs
+import csv
+import io
+import logging
+import math
+import os
+
+from .calculator import PoolCalculator, build_calculator
+from .catalog import price_materials, price_works
+
+logger = logging.getLogger(__name__)
+
+# Заголовки колонок: ключ параметра -> допустимые названия (без учета регистра)
+COLUMNS = {
+    'id': ('id', 'код проекта', 'номер проекта'),
+    'name': ('name', 'название', 'объект'),
+    'length': ('length', 'длина'),
+    'width': ('width', 'ширина'),
+    'shallow_depth': ('shallow_depth', 'глубина мелкой части', 'мелкая часть'),
+    'deep_depth': ('deep_depth', 'глубина глубокой части', 'глубокая часть'),
+    'steps_count': ('steps_count', 'ступени', 'количество ступеней'),
+    'pool_type': ('pool_type', 'тип бассейна'),
+    'finish_type': ('finish_type', 'отделка'),
+}
+REQUIRED = ('length', 'width', 'shallow_depth', 'deep_depth')
+MIN_SIZE = 1  # Наименьший размер, мм: меньшие округляются до нуля при раскладке
+
+# Значения типа бассейна и отделки, как их пишут в таблицах
+POOL_TYPES = {'liner': 'liner', 'лайнер': 'liner', 'ceramic': 'ceramic', 'керамогранит': 'ceramic',
+              'плитка': 'ceramic', 'бетон': 'ceramic'}
+FINISH_TYPES = {'ceramic': 'ceramic', 'керамогранит': 'ceramic', 'mosaic': 'mosaic', 'мозаика': 'mosaic'}
+
+# Колонки результата
+RESULT_HEADER = ['Строка', 'Название', 'Длина', 'Ширина', 'Глубина мелкой части', 'Глубина глубокой части',
+                 'Ступени', 'Тип бассейна', 'Отделка', 'Бетон М300, м³', 'Котлован, м³',
+                 'Материалы, руб', 'Работы, руб', 'Итого, руб', 'Ошибка']
+
+
+def _header_map(header: Iterable) -> Dict[str, int]:
+    """Номера колонок по ключам параметров"""
+    names = {}
+    for index, title in enumerate(header):
+        title = str(title or '').strip().lower()
+        for key, aliases in COLUMNS.items():
+            if title in aliases and key not in names:
+                names[key] = index
+    missing = [key for key in REQUIRED if key not in names]
+    if missing:
+        raise ValueError(f"Нет колонок: {', '.join(missing)}")
+    return names
+
+
+def read_rows(file: IO, file_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Строки таблицы потоком: (номер строки, {ключ: значение})
+
+    .xlsx читается openpyxl в режиме read_only (первый лист), CSV - построчно.
+    """
+    if file_format == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            yield from _map_rows(rows)
+        finally:
+            workbook.close()
+    elif file_format == 'csv':
+        # Загрузка Werkzeug (SpooledTemporaryFile) не годится для TextIOWrapper:
+        # у нее нет readable/seekable, поэтому строки декодируются по одной
+        lines = iter(codecs.iterdecode(file, 'utf-8-sig') if isinstance(file.read(0), bytes) else file)
+        sample = next(lines, '')
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t') if sample.strip() else csv.excel
+        yield from _map_rows(csv.reader(_prepend(sample, lines), dialect))
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+
+
+def _prepend(first: str, lines: Iterable[str]) -> Iterator[str]:
+    """Вернуть прочитанную строку обратно в поток"""
+    yield first
+    yield from lines
+
+
+def _map_rows(rows: Iterator) -> Iterator[Tuple[int, Dict]]:
+    """Сопоставление значений строк с колонками по заголовку"""
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("Файл пуст")
+    names = _header_map(header)
+    for number, row in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in row):
+            continue
+        yield number, {key: row[index] if index < len(row) else None for key, index in names.items()}
+
+
+def parse_row(row: Dict) -> Dict:
+    """Проверка строки и параметры в формате запроса /calculate (мм)"""
+    params = {}
+    for key in REQUIRED:
+        try:
+            value = float(str(row.get(key)).replace(',', '.').strip())
+        except ValueError:
+            raise ValueError(f"Некорректное значение {key}: {row.get(key)}")
+        if not math.isfinite(value):
+            raise ValueError(f"Некорректное значение {key}: {row.get(key)}")
+        if value < MIN_SIZE:
+            raise ValueError(f"Значение {key} должно быть не меньше {MIN_SIZE} мм")
+        params[key] = value
+    if params['shallow_depth'] > params['deep_depth']:
+        raise ValueError("Мелкая часть глубже глубокой")
+
+    steps = row.get('steps_count')
+    try:
+        params['steps_count'] = int(float(steps)) if steps not in (None, '') else 0
+    except (OverflowError, ValueError):
+        raise ValueError(f"Некорректное количество ступеней: {steps}")
+    if params['steps_count'] < 0:
+        raise ValueError("Количество ступеней не может быть отрицательным")
+
+    pool_type = str(row.get('pool_type') or 'ceramic').strip().lower()
+    finish_type = str(row.get('finish_type') or 'ceramic').strip().lower()
+    if pool_type not in POOL_TYPES:
+        raise ValueError(f"Неизвестный тип бассейна: {row.get('pool_type')}")
+    if finish_type not in FINISH_TYPES:
+        raise ValueError(f"Неизвестный тип отделки: {row.get('finish_type')}")
+    params['pool_type'] = POOL_TYPES[pool_type]
+    params['finish_type'] = FINISH_TYPES[finish_type]
+    return params
+
+
+def estimate_row(number: int, row: Dict, calculator: PoolCalculator) -> Dict:
+    """Смета одной строки: параметры, итоги и позиции либо текст ошибки"""
+    result = {'row': number, 'id': row.get('id'), 'name': row.get('name') or ''}
+    try:
+        params = parse_row(row)
+        calculator = build_calculator(params, calculator)
+        materials = price_materials(calculator.calculate_materials(params['pool_type'],
+                                                                  params['finish_type']))
+        works = price_works(calculator.calculate_works())
+    except (ArithmeticError, ValueError) as e:
+        result.update({key: row.get(key) for key in COLUMNS if key not in result})
+        result['error'] = str(e)
+        return result
+    result.update({key: params[key] for key in COLUMNS if key not in result})
+    result.update({
+        'concrete_300': calculator.volumes.concrete_300,
+        'pit': calculator.volumes.pit,
+        'materials_total': sum(line['total'] for line in materials),
+        'works_total': sum(line['total'] for line in works),
+        'materials': materials,
+        'works': works,
+        'error': None
+    })
+    result['total'] = result['materials_total'] + result['works_total']
+    return result
+
+
+# Поля сметы в порядке колонок RESULT_HEADER
+RESULT_FIELDS = ['row', 'name', 'length', 'width', 'shallow_depth', 'deep_depth', 'steps_count',
+                 'pool_type', 'finish_type', 'concrete_300', 'pit', 'materials_total', 'works_total',
+                 'total', 'error']
+
+
+def estimate_rows(rows: Iterable[Tuple[int, Dict]],
+                  calculator: Optional[PoolCalculator] = None) -> Iterator[List]:
+    """Расчет строк потоком одним калькулятором: строки результата по RESULT_HEADER"""
+    calculator = calculator or PoolCalculator()
+    for number, row in rows:
+        result = estimate_row(number, row, calculator)
+        yield [result.get(field) for field in RESULT_FIELDS]
+
+
+def write_results(results: Iterable[List], file: IO, file_format: str) -> Dict[str, int]:
+    """Запись результатов потоком: write_only-книга openpyxl или CSV"""
+    counts = {'rows': 0, 'errors': 0}
+
+    def counted(rows: Iterable[List]) -> Iterator[List]:
+        for row in rows:
+            counts['rows'] += 1
+            if row[-1]:
+                counts['errors'] += 1
+            yield row
+
+    if file_format == 'xlsx':
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Расчет')
+        sheet.append(RESULT_HEADER)
+        for row in counted(results):
+            sheet.append(row)
+        workbook.save(file)
+    elif file_format == 'csv':
+        binary = isinstance(file, (io.BufferedIOBase, io.RawIOBase))
+        if binary:
+            file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        writer = csv.writer(file)
+        writer.writerow(RESULT_HEADER)
+        writer.writerows(counted(results))
+        file.flush()
+        if binary:
+            # Бинарный файл остается открытым для вызывающего кода
+            file.detach()
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+    logger.debug(f"Импорт: {counts['rows']} строк, с ошибками {counts['errors']}")
+    return counts
+
+
+def file_format(filename: str) -> str:
+    """Формат файла по расширению"""
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension not in ('xlsx', 'csv'):
+        raise ValueError("Поддерживаются файлы .xlsx и .csv")
+    return extension
+
+
+def import_file(source: str, target: str) -> Dict[str, int]:
+    """Расчет всех строк файла параметров с записью результатов в новый файл"""
+    with open(source, 'rb') as input_file, open(target, 'wb') as output_file:
+        rows = read_rows(input_file, file_format(source))
+        return write_results(estimate_rows(rows), output_file, file_format(target))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Расчет смет по таблице параметров бассейнов")
+    parser.add_argument('source', help="Файл параметров (.xlsx или .csv)")
+    parser.add_argument('target', help="Файл результатов (.xlsx или .csv)")
+    args = parser.parse_args()
+    counts = import_file(args.source, args.target)
+    print(f"Рассчитано строк: {counts['rows']}, с ошибками: {counts['errors']}")
+
+
+if __name__ == '__main__':
+    main()
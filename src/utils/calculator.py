@@ -3,6 +3,13 @@ from typing import Dict, List, Optional
 import logging
 import math
 
+from .catalog import roll_formats
+from .formwork import plan_formwork
+from .logistics import plan_site
+from .reinforcement import plan_reinforcement
+from .rolls import plan_rolls
+from .tiling import TILE_FORMATS, TileFormat, layout_tiles
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -54,28 +61,212 @@ class PoolVolumes:
     pit: float  # Объем котлована
     concrete_200: float  # Объем бетона М200 (подбетонка)
     concrete_300: float  # Объем бетона М300 (стены и дно)
+
+# Коэффициенты запаса на подрезку и нахлесты
+WASTE_FACTORS = {
+    'coping_stone': 1.1,  # +10% на подрезку
+    'coverflex': 1.1,  # +10% на потери
+    'litoband': 1.2,  # +20% на нахлесты
+}
+    
+# Входные параметры графа расчета
+INPUTS = ('length_mm', 'width_mm', 'shallow_depth_mm', 'deep_depth_mm', 'steps_count',
+          'finish_type', 'tile_format', 'waste_factors', 'soil_type')
+
+# Граф зависимостей: узел -> входы и узлы, от которых он зависит
+DEPENDENCIES = {
+    'dimensions': ('length_mm', 'width_mm', 'shallow_depth_mm', 'deep_depth_mm', 'steps_count'),
+    'areas': ('dimensions',),
+    'volumes': ('dimensions', 'areas'),
+    'reinforcement': ('dimensions',),
+    'formwork': ('dimensions',),
+    'materials_base': ('dimensions', 'areas', 'volumes', 'reinforcement', 'formwork', 'waste_factors'),
+    'roll_plans': ('dimensions',),
+    'materials_liner': ('materials_base', 'areas', 'roll_plans', 'waste_factors'),
+    'tile_layout': ('dimensions', 'finish_type', 'tile_format'),
+    'materials_ceramic': ('materials_base', 'dimensions', 'areas', 'finish_type', 'tile_layout',
+                          'roll_plans', 'waste_factors'),
+    'logistics': ('volumes', 'soil_type'),
+    'works': ('dimensions', 'areas', 'volumes', 'logistics'),
+}
+
+# Обратные связи: вход или узел -> зависящие от него узлы
+DEPENDENTS: Dict[str, List[str]] = {}
+for _node, _deps in DEPENDENCIES.items():
+    for _dep in _deps:
+        DEPENDENTS.setdefault(_dep, []).append(_node)
     
 class PoolCalculator:
+    """Калькулятор бассейна в виде графа зависимостей
+
+    Каждый узел (размеры, площади, объемы, материалы, работы) вычисляется
+    лениво и запоминается. Изменение входа через set_inputs сбрасывает
+    только зависящие от него узлы, остальные берутся из кэша.
+    """
     def __init__(self):
-        self.dimensions: Optional[PoolDimensions] = None
-        self.areas: Optional[PoolAreas] = None
-        self.volumes: Optional[PoolVolumes] = None
+        self._inputs: Dict[str, object] = {
+            'finish_type': 'ceramic',
+            'tile_format': None,  # None - формат по умолчанию для типа отделки
+            'waste_factors': dict(WASTE_FACTORS),
+            'soil_type': 'loam'  # Грунт для коэффициента разрыхления при вывозе
+        }
+        self._cache: Dict[str, object] = {}
+        
+    def set_inputs(self, **values) -> None:
+        """Изменить входы графа и сбросить зависящие от них узлы"""
+        for name, value in values.items():
+            if name not in INPUTS:
+                raise ValueError(f"Неизвестный параметр расчета: {name}")
+            if name in self._inputs and self._inputs[name] == value:
+                continue
+            self._inputs[name] = value
+            self._invalidate(name)
+            
+    def set_params(self, params: Dict) -> None:
+        """Изменить входы по параметрам запроса (мм)"""
+        values = {
+            'length_mm': float(params['length']),
+            'width_mm': float(params['width']),
+            'shallow_depth_mm': float(params['shallow_depth']),
+            'deep_depth_mm': float(params['deep_depth']),
+            'steps_count': int(params['steps_count'])
+        }
+        if 'finish_type' in params:
+            values['finish_type'] = params['finish_type']
+        # Формат плитки: {'width', 'height', 'joint', 'per_box'}, мм; без него - по умолчанию
+        values['soil_type'] = params.get('soil_type', 'loam')
+        values['waste_factors'] = dict(WASTE_FACTORS)
+        values['tile_format'] = None
+        if params.get('tile'):
+            values['tile_format'] = TileFormat(**{key: int(value) for key, value in params['tile'].items()})
+        self.set_inputs(**values)
+            
+    def _invalidate(self, name: str) -> None:
+        """Пометить устаревшими все узлы ниже по графу"""
+        for node in DEPENDENTS.get(name, ()):
+            if node in self._cache:
+                del self._cache[node]
+                self._invalidate(node)
+                
+    def _input(self, name: str):
+        """Значение входа графа"""
+        if name not in self._inputs:
+            raise ValueError("Сначала необходимо рассчитать размеры")
+        return self._inputs[name]
+        
+    def _get(self, node: str):
+        """Значение узла: из кэша или с пересчетом"""
+        if node not in self._cache:
+            self._cache[node] = getattr(self, f'_compute_{node}')()
+        return self._cache[node]
+        
+    def _has_dimensions(self) -> bool:
+        return all(name in self._inputs for name in DEPENDENCIES['dimensions'])
+        
+    @property
+    def dimensions(self) -> Optional[PoolDimensions]:
+        return self._get('dimensions') if self._has_dimensions() else None
+        
+    @property
+    def areas(self) -> Optional[PoolAreas]:
+        return self._get('areas') if self._has_dimensions() else None
+        
+    @property
+    def volumes(self) -> Optional[PoolVolumes]:
+        return self._get('volumes') if self._has_dimensions() else None
+        
+    @property
+    def waste_factors(self) -> Dict[str, float]:
+        return self._inputs['waste_factors']
+        
+    @waste_factors.setter
+    def waste_factors(self, value: Dict[str, float]) -> None:
+        # Коэффициенты заменяются целиком: изменения внутри словаря граф не отслеживает
+        self.set_inputs(waste_factors=dict(value))
         
     def calculate_dimensions(self, length_mm: float, width_mm: float, 
                            shallow_depth_mm: float, deep_depth_mm: float,
                            steps_count: int) -> None:
         """Расчет размеров бассейна"""
-        # Переводим миллиметры в метры
-        self.dimensions = PoolDimensions(
-            length=length_mm / 1000,
-            width=width_mm / 1000,
-            shallow_depth=shallow_depth_mm / 1000,
-            deep_depth=deep_depth_mm / 1000,
+        self.set_inputs(
+            length_mm=length_mm,
+            width_mm=width_mm,
+            shallow_depth_mm=shallow_depth_mm,
+            deep_depth_mm=deep_depth_mm,
             steps_count=steps_count
         )
-        logger.debug(f"Размеры рассчитаны: {self.dimensions}")
+        self._get('dimensions')
         
     def calculate_areas(self) -> None:
+        """Расчет площадей бассейна"""
+        if not self._has_dimensions():
+            raise ValueError("Сначала необходимо рассчитать размеры")
+        self._get('areas')
+        
+    def calculate_volumes(self) -> None:
+        """Расчет объемов бассейна"""
+        if not self._has_dimensions():
+            raise ValueError("Сначала необходимо рассчитать размеры и площади")
+        self._get('volumes')
+        
+    def calculate_reinforcement(self) -> Dict:
+        """Ведомость стержней и раскрой арматуры"""
+        return self._get('reinforcement')
+        
+    def calculate_tile_layout(self, finish_type: str) -> Dict:
+        """Раскладка плитки или листов мозаики по поверхностям чаши"""
+        self.set_inputs(finish_type=finish_type)
+        return self._get('tile_layout')
+        
+    def calculate_roll_plans(self) -> Dict[str, Dict]:
+        """Раскрой рулонных материалов (лайнер, геотекстиль, стеклосетка)"""
+        return self._get('roll_plans')
+        
+    def calculate_formwork(self) -> Dict:
+        """Раскладка щитов опалубки и брус по заливкам"""
+        return self._get('formwork')
+        
+    def calculate_logistics(self) -> Dict:
+        """Рейсы самосвалов на вывоз грунта и доставки бетона миксерами"""
+        return self._get('logistics')
+        
+    def calculate_materials_base(self) -> Dict[str, float]:
+        """Базовые материалы для обоих типов бассейнов"""
+        return dict(self._get('materials_base'))
+        
+    def calculate_materials_liner(self) -> Dict[str, float]:
+        """Расчет материалов для бассейна с отделкой лайнером"""
+        return dict(self._get('materials_liner'))
+        
+    def calculate_materials_ceramic(self, finish_type: str) -> Dict[str, float]:
+        """Расчет материалов для бассейна с отделкой керамогранитом/мозаикой"""
+        self.set_inputs(finish_type=finish_type)
+        return dict(self._get('materials_ceramic'))
+
+    def calculate_materials(self, pool_type: str, finish_type: str = 'ceramic') -> Dict[str, float]:
+        """Расчет материалов в зависимости от типа бассейна"""
+        if pool_type == 'liner':
+            return self.calculate_materials_liner()
+        return self.calculate_materials_ceramic(finish_type)
+        
+    def calculate_works(self) -> List[Dict[str, any]]:
+        """Расчет работ"""
+        return [dict(work) for work in self._get('works')]
+        
+    def _compute_dimensions(self) -> PoolDimensions:
+        """Расчет размеров бассейна"""
+        # Переводим миллиметры в метры
+        dimensions = PoolDimensions(
+            length=self._input('length_mm') / 1000,
+            width=self._input('width_mm') / 1000,
+            shallow_depth=self._input('shallow_depth_mm') / 1000,
+            deep_depth=self._input('deep_depth_mm') / 1000,
+            steps_count=self._input('steps_count')
+        )
+        logger.debug(f"Размеры рассчитаны: {dimensions}")
+        return dimensions
+        
+    def _compute_areas(self) -> PoolAreas:
         """Расчет площадей бассейна"""
         if not self.dimensions:
             raise ValueError("Сначала необходимо рассчитать размеры")
@@ -105,16 +296,17 @@ class PoolCalculator:
         # Площадь котлована
         pit = self.dimensions.pit_length * self.dimensions.pit_width
         
-        self.areas = PoolAreas(
+        areas = PoolAreas(
             bottom=bottom,
             walls=walls,
             steps=steps,
             outer=outer,
             pit=pit
         )
-        logger.debug(f"Площади рассчитаны: {self.areas}")
+        logger.debug(f"Площади рассчитаны: {areas}")
+        return areas
         
-    def calculate_volumes(self) -> None:
+    def _compute_volumes(self) -> PoolVolumes:
         """Расчет объемов бассейна"""
         if not self.dimensions or not self.areas:
             raise ValueError("Сначала необходимо рассчитать размеры и площади")
@@ -133,31 +325,49 @@ class PoolCalculator:
         # Объем бетона М300 (стены и дно 25см)
         concrete_300 = (self.areas.walls + self.areas.bottom) * 0.25
         
-        self.volumes = PoolVolumes(
+        volumes = PoolVolumes(
             pit=pit,
             concrete_200=concrete_200,
             concrete_300=concrete_300
         )
-        logger.debug(f"Объемы рассчитаны: {self.volumes}")
+        logger.debug(f"Объемы рассчитаны: {volumes}")
+        return volumes
         
-    def calculate_materials_base(self) -> Dict[str, float]:
+    def _compute_tile_layout(self) -> Dict:
+        """Раскладка плитки по поверхностям чаши"""
+        finish_type = self._input('finish_type')
+        tile = self._input('tile_format') or TILE_FORMATS['ceramic' if finish_type == 'ceramic' else 'mosaic']
+        return layout_tiles(self.dimensions, tile)
+        
+    def _compute_roll_plans(self) -> Dict[str, Dict]:
+        """Раскрой рулонных материалов по поверхностям чаши"""
+        return {material: plan_rolls(self.dimensions, material) for material in roll_formats}
+        
+    def _compute_formwork(self) -> Dict:
+        """Опалубка по граням чаши"""
+        return plan_formwork(self.dimensions)
+        
+    def _compute_reinforcement(self) -> Dict:
+        """Раскрой арматуры двойного каркаса"""
+        return plan_reinforcement(self.dimensions)
+        
+    def _compute_materials_base(self) -> Dict[str, float]:
         """Базовые материалы для обоих типов бассейнов"""
         if not self.dimensions or not self.areas or not self.volumes:
             raise ValueError("Сначала необходимо рассчитать все параметры")
             
         materials = {}
         
-        # Фанера 18мм (наружная опалубка)
-        materials['plywood_18'] = (self.areas.outer + self.areas.walls) * 1.1  # +10% на подрезку
+        # Фанера 18мм (щиты опалубки стен и плиты)
+        formwork = self._get('formwork')
+        materials['plywood_18'] = formwork['plywood_area']  # целые листы с оборачиваемостью
         
-        # Арматура 12мм (двойной каркас)
+        # Арматура 12мм (двойной каркас): заказ целыми хлыстами по карте раскроя
         total_concrete_area = self.areas.walls + self.areas.bottom
-        materials['rebar_12'] = total_concrete_area * 20  # 20м.п. на м² для двойного каркаса
+        materials['rebar_12'] = self._get('reinforcement')['ordered_length']
         
-        # Брус 50х50 (периметр снаружи и внутри, два слоя)
-        outer_perimeter = 2 * (self.dimensions.outer_length + self.dimensions.outer_width)
-        inner_perimeter = 2 * (self.dimensions.length + self.dimensions.width)
-        materials['timber_50x50'] = (outer_perimeter + inner_perimeter) * 2  # два слоя
+        # Брус 50х50 (стойки и схватки по сетке щитов)
+        materials['timber_50x50'] = formwork['timber_length']
         
         # Бетон
         materials['concrete_200'] = self.volumes.concrete_200
@@ -169,7 +379,7 @@ class PoolCalculator:
         
         # Копинговый камень
         perimeter = 2 * (self.dimensions.length + self.dimensions.width)
-        materials['coping_stone'] = perimeter * 1.1  # +10% на подрезку
+        materials['coping_stone'] = perimeter * self.waste_factors['coping_stone']
         materials['adhesive_80'] = math.ceil(perimeter / 5)  # 1 мешок на 5м
         materials['grout'] = perimeter * 0.2  # 0.2кг на м.п.
         materials['sealant'] = math.ceil(perimeter / 4)  # 1 тюбик на 4м
@@ -188,39 +398,41 @@ class PoolCalculator:
         
         return materials
         
-    def calculate_materials_liner(self) -> Dict[str, float]:
+    def _compute_materials_liner(self) -> Dict[str, float]:
         """Расчет материалов для бассейна с отделкой лайнером"""
-        materials = self.calculate_materials_base()
+        materials = dict(self._get('materials_base'))
         
         # Добавляем материалы для лайнера
         total_area = self.areas.total
-        materials['geotextile'] = total_area * 1.15  # +15% на нахлесты
+        rolls = self._get('roll_plans')
+        materials['geotextile'] = rolls['geotextile']['purchased_area']  # целые рулоны по раскрою
         materials['waterproofing'] = total_area * 2.5  # 2.5 слоя
-        materials['liner'] = total_area * 1.15  # +15% на сварку
+        materials['liner'] = rolls['liner']['purchased_area']  # целые рулоны по раскрою
         
         return materials
         
-    def calculate_materials_ceramic(self, finish_type: str) -> Dict[str, float]:
+    def _compute_materials_ceramic(self) -> Dict[str, float]:
         """Расчет материалов для бассейна с отделкой керамогранитом/мозаикой"""
-        materials = self.calculate_materials_base()
+        materials = dict(self._get('materials_base'))
+        finish_type = self._input('finish_type')
         
         total_area = self.areas.total
         
         # Гидроизоляция
-        materials['coverflex'] = total_area * 1.1  # +10% на потери
-        materials['fiberglass_mesh'] = total_area * 1.15  # +15% на нахлесты
+        materials['coverflex'] = total_area * self.waste_factors['coverflex']
+        materials['fiberglass_mesh'] = self._get('roll_plans')['fiberglass_mesh']['purchased_area']  # целые рулоны
         
         # Лента для углов
         corners_length = (self.dimensions.length + self.dimensions.width) * 2  # периметр дна
-        materials['litoband'] = corners_length * 1.2  # +20% на нахлесты
+        materials['litoband'] = corners_length * self.waste_factors['litoband']
         
         if finish_type == 'ceramic':
             # Керамогранит
-            materials['ceramic_tile'] = total_area * 1.1  # +10% на подрезку
+            materials['ceramic_tile'] = self._get('tile_layout')['purchased_area']  # целые коробки по раскладке
             materials['tile_adhesive'] = total_area * 7.5  # 7.5кг на м²
         else:
             # Мозаика
-            materials['mosaic'] = total_area * 1.15  # +15% на подрезку
+            materials['mosaic'] = self._get('tile_layout')['purchased_area']  # целые коробки по раскладке
             materials['mosaic_adhesive'] = total_area * 5  # 5кг на м²
             
         # Общие материалы для обоих типов
@@ -230,7 +442,11 @@ class PoolCalculator:
         
         return materials
         
-    def calculate_works(self) -> List[Dict[str, any]]:
+    def _compute_logistics(self) -> Dict:
+        """Вывоз грунта и доставка бетона"""
+        return plan_site(self.volumes, self._input('soil_type'))
+        
+    def _compute_works(self) -> List[Dict[str, any]]:
         """Расчет работ"""
         if not self.dimensions or not self.areas or not self.volumes:
             raise ValueError("Сначала необходимо рассчитать все параметры")
@@ -260,7 +476,7 @@ class PoolCalculator:
         works.append({
             'name': 'Вывоз грунта',
             'unit': 'рейс',
-            'quantity': math.ceil(self.volumes.pit / 6)  # КАМАЗ 6м³
+            'quantity': self._get('logistics')['haul']['trips']  # КАМАЗ 6м³ с учетом разрыхления
         })
         
         works.append({
@@ -341,3 +557,10 @@ class PoolCalculator:
         })
         
         return works
+
+
+def build_calculator(params: Dict, calculator: Optional[PoolCalculator] = None) -> PoolCalculator:
+    """Калькулятор по параметрам запроса (мм); переданный калькулятор пересчитывает только изменившееся"""
+    calculator = calculator or PoolCalculator()
+    calculator.set_params(params)
+    return calculator
@@ -0,0 +1,165 @@
+from typing import Dict, List
+
+# Коэффициенты и цены на материалы
+materials_rates = {
+    # Основные материалы
+    'sand': {'name': 'Песок', 'unit': 'м³', 'price': 800},
+    'gravel': {'name': 'Щебень', 'unit': 'м³', 'price': 1200},
+    'concrete_200': {'name': 'Бетон М200', 'unit': 'м³', 'price': 4500},
+    'concrete_300': {'name': 'Бетон М300', 'unit': 'м³', 'price': 5000},
+    'rebar_12': {'name': 'Арматура 12мм', 'unit': 'м.п.', 'price': 80},
+    'wire': {'name': 'Проволока вязальная', 'unit': 'кг', 'price': 100},
+    'plywood_18': {'name': 'Фанера 18мм', 'unit': 'м²', 'price': 1200},
+    'timber_50x50': {'name': 'Брус 50х50', 'unit': 'м.п.', 'price': 80},
+    'consumables': {'name': 'Расходные материалы', 'unit': 'компл.', 'price': 15000},
+    'concrete_pump': {'name': 'Услуги бетононасоса', 'unit': 'услуга', 'price': 18000},
+    'ground_corner': {'name': 'Уголок для заземления', 'unit': 'компл.', 'price': 3500},
+    'cement': {'name': 'Цемент', 'unit': 'мешок', 'price': 450},
+    'fibroazolit': {'name': 'Фиброазолит', 'unit': 'компл.', 'price': 9000},
+
+    # Гидроизоляция
+    'geotextile': {'name': 'Геотекстиль', 'unit': 'м²', 'price': 50},
+    'waterproofing': {'name': 'Гидроизоляция', 'unit': 'м²', 'price': 300},
+    'coverflex': {'name': 'CoverFlex', 'unit': 'кг', 'price': 400},
+    'fiberglass_mesh': {'name': 'Стеклосетка', 'unit': 'м²', 'price': 60},
+    'litoband': {'name': 'Лента Литобанд', 'unit': 'м.п.', 'price': 200},
+
+    # Штукатурка
+    'primer': {'name': 'Грунтовка', 'unit': 'канистра', 'price': 2500},
+    'adhesive_ec3000': {'name': 'Клей EC3000', 'unit': 'мешок', 'price': 900},
+    'plaster': {'name': 'Штукатурка', 'unit': 'мешок', 'price': 550},
+
+    # Отделочные материалы
+    'liner': {'name': 'ПВХ лайнер', 'unit': 'м²', 'price': 800},
+    'ceramic_tile': {'name': 'Керамогранит', 'unit': 'м²', 'price': 1500},
+    'mosaic': {'name': 'Мозаика', 'unit': 'м²', 'price': 2500},
+    'tile_adhesive': {'name': 'Клей для керамогранита', 'unit': 'кг', 'price': 50},
+    'mosaic_adhesive': {'name': 'Клей для мозаики', 'unit': 'кг', 'price': 80},
+    'latex_additive': {'name': 'Латексная добавка', 'unit': 'л', 'price': 350},
+    'epoxy_grout': {'name': 'Затирка эпоксидная', 'unit': 'кг', 'price': 1200},
+    'grout_cleaner': {'name': 'Очиститель затирки', 'unit': 'компл.', 'price': 1500},
+
+    # Бортовые материалы
+    'coping_stone': {'name': 'Копинговый камень', 'unit': 'м.п.', 'price': 1800},
+    'adhesive_80': {'name': 'Клей для копинга', 'unit': 'кг', 'price': 80},
+    'grout': {'name': 'Затирка для копинга', 'unit': 'кг', 'price': 150},
+    'sealant': {'name': 'Герметик', 'unit': 'шт', 'price': 400},
+}
+
+# Рулонные материалы: ширина и длина рулона, нахлест полос (м)
+roll_formats = {
+    'liner': {'width': 1.65, 'length': 25.0, 'overlap': 0.05},
+    'geotextile': {'width': 2.0, 'length': 50.0, 'overlap': 0.1},
+    'fiberglass_mesh': {'width': 1.0, 'length': 50.0, 'overlap': 0.1},
+}
+
+# Листовые материалы опалубки: размер листа (м) и число заливок до износа
+sheet_formats = {
+    'plywood_18': {'width': 2.5, 'height': 1.25, 'reuse_limit': 5},
+}
+
+# Фасовка: размеры упаковок в единицах материала, вместимость паллеты (в тех же единицах)
+pack_formats = {
+    'wire': {'pack': 'бухта', 'sizes': (5,)},
+    'adhesive_80': {'pack': 'мешок', 'sizes': (1,), 'pallet': 48},  # Расчет ведется в мешках по 25 кг
+    'grout': {'pack': 'ведро', 'sizes': (5, 2)},
+    'coverflex': {'pack': 'комплект', 'sizes': (32, 8), 'pallet': 576},
+    'litoband': {'pack': 'рулон', 'sizes': (10,)},
+    'cement': {'pack': 'мешок', 'sizes': (1,), 'pallet': 40},
+    'plaster': {'pack': 'мешок', 'sizes': (1,), 'pallet': 48},
+    'adhesive_ec3000': {'pack': 'мешок', 'sizes': (1,), 'pallet': 48},
+    'tile_adhesive': {'pack': 'мешок', 'sizes': (25, 5), 'pallet': 1200},
+    'mosaic_adhesive': {'pack': 'мешок', 'sizes': (25, 5), 'pallet': 1200},
+    'latex_additive': {'pack': 'канистра', 'sizes': (10, 5, 1)},
+    'epoxy_grout': {'pack': 'ведро', 'sizes': (5, 1)},
+    'coping_stone': {'pack': 'камень', 'sizes': (0.5,), 'pallet': 30},
+    'timber_50x50': {'pack': 'брус', 'sizes': (3, 6)},
+}
+
+TRUCK_PALLETS = 18  # Паллет в одной машине
+
+# Коэффициент разрыхления грунта при вывозе (объем в кузове к объему в котловане)
+soil_swell = {
+    'sand': 1.15,  # Песок
+    'loam': 1.25,  # Суглинок
+    'clay': 1.3,  # Глина
+}
+
+# Тарифы на эксплуатацию
+utility_rates = {
+    'electricity': 6.5,  # руб за кВт·ч
+    'water': 55,  # руб за м³ подпитки
+}
+
+# Расценки на работы (по наименованию из PoolCalculator.calculate_works)
+works_rates = {
+    'Разметка бассейна для техники': 300,
+    'Нивелировка и привязка к территории': 5000,
+    'Выемка грунта под чашу бассейна': 550,
+    'Вывоз грунта': 6500,
+    'Доработка грунта вручную': 350,
+    'Отсыпка щебнем 10см': 350,
+    'Устройство контура заземления': 7500,
+    'Бетонирование подбетонки': 800,
+    'Монтаж опалубки и армирование': 1500,
+    'Бетонирование чаши': 2500,
+    'Изготовление ступеней': 4000,
+    'Обратная отсыпка глиной': 600,
+    'Грунтовка под штукатурку': 100,
+    'Нанесение клея под гребенку': 300,
+    'Штукатурка': 700,
+    'Грунтовка борта и ступеней': 150,
+}
+
+
+# Выработка на работы: бригада и объем за смену (в единицах из calculate_works).
+# Бригада None - работа выполняется техникой без бригад из графика
+works_productivity = {
+    'Разметка бассейна для техники': {'crew': 'Геодезисты', 'rate': 200},
+    'Нивелировка и привязка к территории': {'crew': 'Геодезисты', 'rate': 2},
+    'Выемка грунта под чашу бассейна': {'crew': 'Экскаватор', 'rate': 120},
+    'Вывоз грунта': {'crew': None, 'rate': 30},
+    'Доработка грунта вручную': {'crew': 'Разнорабочие', 'rate': 60},
+    'Отсыпка щебнем 10см': {'crew': 'Разнорабочие', 'rate': 80},
+    'Устройство контура заземления': {'crew': 'Электрики', 'rate': 1},
+    'Бетонирование подбетонки': {'crew': 'Бетонщики', 'rate': 20},
+    'Монтаж опалубки и армирование': {'crew': 'Бетонщики', 'rate': 15},
+    'Бетонирование чаши': {'crew': 'Бетонщики', 'rate': 20},
+    'Изготовление ступеней': {'crew': 'Бетонщики', 'rate': 2},
+    'Обратная отсыпка глиной': {'crew': 'Разнорабочие', 'rate': 40},
+    'Грунтовка под штукатурку': {'crew': 'Отделочники', 'rate': 300},
+    'Нанесение клея под гребенку': {'crew': 'Отделочники', 'rate': 80},
+    'Штукатурка': {'crew': 'Отделочники', 'rate': 40},
+    'Грунтовка борта и ступеней': {'crew': 'Отделочники', 'rate': 200},
+}
+
+def price_materials(materials: Dict[str, float]) -> List[Dict]:
+    """Стоимость материалов по каталогу (позиции без цены пропускаются)"""
+    results = []
+    for material, quantity in materials.items():
+        if material in materials_rates:
+            rate = materials_rates[material]
+            results.append({
+                'key': material,
+                'name': rate['name'],
+                'unit': rate['unit'],
+                'quantity': quantity,
+                'price': rate['price'],
+                'total': quantity * rate['price']
+            })
+    return results
+
+
+def price_works(works: List[Dict]) -> List[Dict]:
+    """Стоимость работ по каталогу"""
+    results = []
+    for work in works:
+        price = works_rates.get(work['name'], 0)
+        results.append({
+            'name': work['name'],
+            'unit': work['unit'],
+            'quantity': work['quantity'],
+            'price': price,
+            'total': work['quantity'] * price
+        })
+    return results
@@ -0,0 +1,238 @@
+from typing import Dict, IO, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .bulk import parse_row
+from .calculator import PoolCalculator, build_calculator
+from .catalog import materials_rates, works_rates
+
+logger = logging.getLogger(__name__)
+
+ROW_GROUP_ROWS = 100_000  # Строк позиций в одной группе строк Parquet
+FORMATS = ('parquet', 'arrow')
+
+# Словарь позиций: код -> (вид, ключ, наименование, цена); строки таблицы хранят только код
+LINES: List[Tuple[str, str, str, float]] = (
+    [('material', key, rate['name'], rate['price']) for key, rate in materials_rates.items()] +
+    [('work', name, name, price) for name, price in works_rates.items()]
+)
+CODES = {(kind, key): code for code, (kind, key, _, _) in enumerate(LINES)}
+PRICES = np.array([price for *_, price in LINES], dtype=float)
+
+# Единицы измерения материалов и работ
+UNITS = sorted({rate['unit'] for rate in materials_rates.values()} | {'м²', 'м³', 'рейс', 'услуга', 'шт'})
+UNIT_CODES = {unit: code for code, unit in enumerate(UNITS)}
+MATERIAL_UNITS = {key: UNIT_CODES[rate['unit']] for key, rate in materials_rates.items()}
+
+
+def _project_id(row: Dict) -> Optional[str]:
+    """Код проекта из входных данных (колонка id), если задан"""
+    value = row.get('id')
+    return None if value in (None, '') else str(value)
+
+
+def _vocabulary(values: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Значения словарной колонки без повторов и номер значения для каждого кода позиции"""
+    unique = list(dict.fromkeys(values))
+    number = {value: index for index, value in enumerate(unique)}
+    return unique, np.array([number[value] for value in values], dtype=np.int32)
+
+
+class LineChunk:
+    """Позиции порции проектов в виде массивов кодов и количеств"""
+    def __init__(self):
+        self.names: List[str] = []  # Названия проектов порции
+        self.ids: List[Optional[str]] = []  # Коды проектов из входных данных
+        self.rows: List[int] = []  # Номера строк проектов во входном файле
+        self.project: List[int] = []  # Номер проекта в порции для каждой позиции
+        self.code: List[int] = []
+        self.unit: List[int] = []
+        self.quantity: List[float] = []
+        self.failed: List[Tuple[int, Optional[str], str, str]] = []  # (строка, код, название, ошибка)
+
+    def add(self, number: int, row: Dict, calculator: PoolCalculator) -> None:
+        """Рассчитать проект и добавить его позиции либо строку с ошибкой"""
+        try:
+            params = parse_row(row)
+            calculator = build_calculator(params, calculator)
+            materials = calculator.calculate_materials(params['pool_type'], params['finish_type'])
+            works = calculator.calculate_works()
+        except (ArithmeticError, ValueError) as e:
+            logger.warning(f"Строка {number}: {e}")
+            self.failed.append((number, _project_id(row), str(row.get('name') or ''), str(e)))
+            return
+        index = len(self.names)
+        self.names.append(str(row.get('name') or ''))
+        self.ids.append(_project_id(row))
+        self.rows.append(number)
+        for key, quantity in materials.items():
+            code = CODES.get(('material', key))
+            if code is not None:
+                self.project.append(index)
+                self.code.append(code)
+                self.unit.append(MATERIAL_UNITS[key])
+                self.quantity.append(quantity)
+        for work in works:
+            code = CODES.get(('work', work['name']))
+            if code is not None:
+                self.project.append(index)
+                self.code.append(code)
+                self.unit.append(UNIT_CODES[work['unit']])
+                self.quantity.append(work['quantity'])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Колонки порции: номер проекта в порции, строка, код позиции, код единицы, количество"""
+        project = np.array(self.project, dtype=np.int32)
+        return {
+            'project': project,
+            'row': np.array(self.rows, dtype=np.int64)[project] if self.rows else np.empty(0, np.int64),
+            'code': np.array(self.code, dtype=np.int32),
+            'unit': np.array(self.unit, dtype=np.int32),
+            'quantity': np.array(self.quantity, dtype=float),
+            'names': self.names,
+            'ids': self.ids,
+            'failed': self.failed,
+            'errors': len(self.failed)
+        }
+
+
+# Калькулятор процесса-исполнителя
+_calculator: Optional[PoolCalculator] = None
+
+
+def estimate_chunk_lines(chunk: List[Tuple[int, Dict]]) -> Dict[str, np.ndarray]:
+    """Позиции смет порции проектов в процессе-исполнителе"""
+    global _calculator
+    if _calculator is None:
+        _calculator = PoolCalculator()
+    lines = LineChunk()
+    for number, row in chunk:
+        lines.add(number, row, _calculator)
+    return lines.arrays()
+
+
+class LineWriter:
+    """Запись позиций смет в Parquet или Arrow IPC группами строк (нужен pyarrow)
+
+    Колонки: row, project, name, kind, key, line, unit, quantity, price, total, error.
+    row - номер проекта во входных данных, project - его код (id), если задан.
+    Проект с ошибкой дает одну строку с текстом в error и пустыми позициями.
+    Текстовые колонки словарные: в файле хранятся коды, а не строки.
+    """
+    def __init__(self, file: IO, file_format: str = 'parquet', row_group_rows: int = ROW_GROUP_ROWS):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для выгрузки в Parquet/Arrow установите pyarrow")
+        if file_format not in FORMATS:
+            raise ValueError(f"Неподдерживаемый формат выгрузки: {file_format}")
+        self.pa = pa
+        self.row_group_rows = row_group_rows
+        text = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([
+            ('row', pa.int64()), ('project', text), ('name', text), ('kind', text), ('key', text),
+            ('line', text), ('unit', text), ('quantity', pa.float64()), ('price', pa.float64()),
+            ('total', pa.float64()), ('error', pa.string())
+        ])
+        # Словари без повторов (pandas не принимает повторяющиеся категории)
+        self.vocabularies = []
+        for column in range(3):
+            values, index = _vocabulary([line[column] for line in LINES])
+            self.vocabularies.append((pa.array(values, type=pa.string()), index))
+        self.units = pa.array(UNITS)
+        if file_format == 'parquet':
+            self.writer = pq.ParquetWriter(file, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(file, self.schema)
+        self.pending: List[Dict] = []
+        self.pending_rows = 0
+        self.rows = 0
+        self.projects = 0
+        self.errors = 0
+
+    def add(self, chunk: Dict) -> None:
+        """Добавить порцию из LineChunk.arrays(), группа пишется по накоплении"""
+        self.projects += len(chunk['names'])
+        self.errors += chunk['errors']
+        if not len(chunk['code']) and not chunk['failed']:
+            return
+        self.pending.append(chunk)
+        self.pending_rows += len(chunk['code']) + len(chunk['failed'])
+        if self.pending_rows >= self.row_group_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать накопленные порции одной группой строк"""
+        if not self.pending:
+            return
+        pa = self.pa
+        # Проекты группы: сначала рассчитанные, затем строки с ошибками
+        names: List[str] = []
+        ids: List[Optional[str]] = []
+        name_index = []
+        for chunk in self.pending:
+            name_index.append(chunk['project'] + len(names))
+            names.extend(chunk['names'])
+            ids.extend(chunk['ids'])
+        failed = [item for chunk in self.pending for item in chunk['failed']]
+        name_index.append(np.arange(len(names), len(names) + len(failed), dtype=np.int32))
+        names.extend(name for _, _, name, _ in failed)
+        ids.extend(project_id for _, project_id, _, _ in failed)
+        code = np.concatenate([chunk['code'] for chunk in self.pending])
+        quantity = np.concatenate([chunk['quantity'] for chunk in self.pending])
+        price = PRICES[code]
+        lines = len(code)
+        # У строк с ошибкой позиция, количество и цена пустые
+        missing = np.concatenate([np.zeros(lines, dtype=bool), np.ones(len(failed), dtype=bool)])
+        blank = np.zeros(len(failed), dtype=np.int32)
+
+        def dictionary(indices: np.ndarray, values, mask=None) -> 'pa.DictionaryArray':
+            return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32(), mask=mask), values)
+
+        def numbers(values: np.ndarray) -> 'pa.Array':
+            return pa.array(np.concatenate([values, np.zeros(len(failed))]), mask=missing)
+
+        project = np.concatenate(name_index)
+        table = pa.Table.from_arrays([
+            pa.array(np.concatenate([chunk['row'] for chunk in self.pending]
+                                    + [np.array([row for row, *_ in failed], dtype=np.int64)])),
+            pa.array(ids, type=pa.string()).dictionary_encode().take(pa.array(project)),
+            pa.array(names, type=pa.string()).dictionary_encode().take(pa.array(project)),
+            *[dictionary(index[np.concatenate([code, blank])], values, missing)
+              for values, index in self.vocabularies],
+            dictionary(np.concatenate([chunk['unit'] for chunk in self.pending] + [blank]), self.units, missing),
+            numbers(quantity),
+            numbers(price),
+            numbers(quantity * price),
+            pa.concat_arrays([pa.nulls(lines, pa.string()),
+                              pa.array([error for *_, error in failed], type=pa.string())])
+        ], schema=self.schema)
+        self.writer.write_table(table)
+        self.rows += lines + len(failed)
+        self.pending = []
+        self.pending_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+        logger.debug(f"Выгрузка позиций: {self.rows} строк по {self.projects} проектам, "
+                     f"с ошибками {self.errors}")
+
+
+def export_lines(designs: Iterable[Dict], file: IO, file_format: str = 'parquet',
+                 calculator: Optional[PoolCalculator] = None,
+                 chunk_size: int = 1000) -> Dict[str, int]:
+    """Выгрузка позиций набора смет в текущем процессе (designs - параметры как в /calculate)"""
+    calculator = calculator or PoolCalculator()
+    writer = LineWriter(file, file_format)
+    lines = LineChunk()
+    for number, design in enumerate(designs, start=1):
+        lines.add(number, design, calculator)
+        if len(lines.names) >= chunk_size:
+            writer.add(lines.arrays())
+            lines = LineChunk()
+    writer.add(lines.arrays())
+    writer.close()
+    return {'projects': writer.projects, 'rows': writer.rows, 'errors': writer.errors}
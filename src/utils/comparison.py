@@ -0,0 +1,54 @@
+from typing import Dict, Optional, Sequence
+import logging
+
+from .calculator import PoolCalculator, build_calculator
+from .catalog import price_materials, price_works
+
+logger = logging.getLogger(__name__)
+
+# Варианты отделки: название -> (тип бассейна, тип отделки)
+FINISHES = {
+    'liner': ('liner', 'ceramic'),
+    'ceramic': ('ceramic', 'ceramic'),
+    'mosaic': ('ceramic', 'mosaic'),
+}
+
+
+def compare_finishes(params: Dict, finishes: Sequence[str] = tuple(FINISHES),
+                     calculator: Optional[PoolCalculator] = None) -> Dict:
+    """Сравнение вариантов отделки: геометрия, базовые материалы и работы считаются один раз"""
+    unknown = [finish for finish in finishes if finish not in FINISHES]
+    if unknown:
+        raise ValueError(f"Неизвестный тип отделки: {', '.join(unknown)}")
+
+    calculator = build_calculator(params, calculator)
+    works_total = sum(line['total'] for line in price_works(calculator.calculate_works()))
+
+    # Строки матрицы: позиция -> количества и суммы по вариантам
+    rows: Dict[str, Dict] = {}
+    materials_totals = []
+    for column, finish in enumerate(finishes):
+        pool_type, finish_type = FINISHES[finish]
+        lines = price_materials(calculator.calculate_materials(pool_type, finish_type))
+        for line in lines:
+            row = rows.setdefault(line['key'], {
+                'key': line['key'],
+                'name': line['name'],
+                'unit': line['unit'],
+                'quantities': [0] * len(finishes),
+                'totals': [0] * len(finishes)
+            })
+            row['quantities'][column] = line['quantity']
+            row['totals'][column] = line['total']
+        materials_totals.append(sum(line['total'] for line in lines))
+
+    logger.debug(f"Сравнение отделки {list(finishes)}: {materials_totals}")
+    return {
+        'finishes': list(finishes),
+        'materials': list(rows.values()),
+        'totals': {
+            'materials': materials_totals,
+            'works': [works_total] * len(finishes),
+            'total': [total + works_total for total in materials_totals]
+        }
+    }
@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, Optional
+import logging
+
+from .calculator import PoolCalculator, build_calculator
+from .logistics import (DEFAULT_FLEET, DISTANCE_KM, POURS, plan_haul, plan_pour,
+                        schedule_hauls, schedule_pours, travel_minutes)
+
+logger = logging.getLogger(__name__)
+
+
+def plan_logistics(projects: Iterable[Dict], fleet: Optional[Dict] = None,
+                   calculator: Optional[PoolCalculator] = None) -> Dict:
+    """План смены по соседним объектам: вывоз грунта и заливки бетона
+
+    Объект - параметры бассейна и поля 'distance_km' (до полигона и завода),
+    'priority' (меньше - раньше), 'pour' (марка бетона заливки в этот день или
+    пусто), 'haul' (вывозить ли грунт, по умолчанию да), 'soil_type'.
+    """
+    fleet = {**DEFAULT_FLEET, **(fleet or {})}
+    if fleet['trucks'] <= 0 or fleet['mixers'] <= 0:
+        raise ValueError("В парке должны быть самосвалы и миксеры")
+    calculator = calculator or PoolCalculator()
+
+    sites = []
+    for number, project in enumerate(projects, start=1):
+        calculator = build_calculator(project, calculator)
+        volumes = calculator.volumes
+        soil_type = project.get('soil_type', 'loam')
+        haul = plan_haul(volumes.pit, soil_type, fleet['truck_capacity'])
+        if not project.get('haul', True):
+            haul['trips'] = 0
+        grade = project.get('pour')
+        if grade and grade not in POURS:
+            raise ValueError(f"Неизвестная марка бетона: {grade}")
+        sites.append({
+            'name': project.get('name', f'Объект {number}'),
+            'priority': int(project.get('priority', 0)),
+            'travel': travel_minutes(float(project.get('distance_km', DISTANCE_KM)), fleet['speed_kmh']),
+            'haul': haul,
+            'pour': plan_pour(getattr(volumes, grade), grade, fleet['mixer_sizes'],
+                              fleet['pump_rate']) if grade else None
+        })
+    if not sites:
+        raise ValueError("Не задано ни одного объекта")
+
+    schedule_hauls(sites, fleet)
+    schedule_pours(sites, fleet)
+
+    trips_left = sum(site['haul_schedule']['trips_left'] for site in sites)
+    overtime = [site['name'] for site in sites if site['pour'] and site['pour']['schedule']['overtime']]
+    logger.debug(f"Логистика {len(sites)} объектов: перенесено рейсов {trips_left}, "
+                 f"заливки сверх смены: {len(overtime)}")
+    return {
+        'fleet': {key: list(value) if isinstance(value, tuple) else value for key, value in fleet.items()},
+        'sites': sites,
+        'trips': sum(site['haul_schedule']['trips_done'] for site in sites),
+        'trips_left': trips_left,
+        'deliveries': sum(len(site['pour']['loads']) for site in sites if site['pour']),
+        'overtime_pours': overtime
+    }
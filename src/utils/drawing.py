@@ -0,0 +1,421 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+import io
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+VIEWS = ('plan', 'section')
+FORMATS = ('svg', 'png')
+DEFAULT_WIDTH = 800  # Ширина изображения, пикс.
+MAX_WIDTH = 4000
+MAX_PIXELS = 12_000_000  # Предел площади изображения: высота зависит от пропорций бассейна
+SUPERSAMPLE_PIXELS = 16_000_000  # Больший PNG рисуется без сглаживания увеличением
+# Допустимые размеры, мм: как в конструкторе PoolDesigner; глубина от 0.5 м для детских чаш
+DIMENSION_LIMITS = {
+    'length': (1000, 50000),
+    'width': (1000, 25000),
+    'shallow_depth': (500, 5000),
+    'deep_depth': (500, 5000),
+}
+MAX_STEPS = 6
+MARGIN = 80  # Поле под размерные подписи, пикс.
+FONT_SIZE = 13
+
+# Конструкция, мм: как в PoolCalculator
+SHELL = 250  # Стены и дно, бетон М300
+BASE = 100  # Подбетонка М200
+PIT_OFFSET = 1300  # Котлован шире чаши: 500 до наружного контура + 800
+PIT_EXTRA_DEPTH = 450  # Котлован глубже чаши
+STEP_TREAD = 300
+STEP_RISE = 150
+
+# Формы бассейна: ключ API -> названия, в том числе из конструктора PoolDesigner
+SHAPES = {
+    'rectangular': ('rectangular', 'прямоугольный'),
+    'oval': ('oval', 'овальный'),
+    'l_shaped': ('l_shaped', 'l-образный'),
+    'freeform': ('freeform', 'свободная форма'),
+}
+
+# Стили: заливка, линия, толщина линии (пикс.), пунктир
+STYLES = {
+    'pit': ('#f3ecdf', '#a88a5f', 1, True),
+    'shell': ('#c9c9c9', '#555555', 1, False),
+    'base': ('#e0e0e0', '#777777', 1, False),
+    'water': ('#a6d8f2', '#1f5f8b', 2, False),
+    'step': ('#d9eef9', '#1f5f8b', 1, False),
+    'ground': (None, '#6b5536', 2, False),
+    'dimension': (None, '#333333', 1, False),
+}
+TEXT_COLOR = '#222222'
+
+# Шрифты с кириллицей (обычный, жирный) для PNG и PDF; PDF_FONT_DIR задает свой каталог
+FONT_FILES = ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf')
+FONT_DIRS = (
+    os.environ.get('PDF_FONT_DIR', ''),
+    '/usr/share/fonts/truetype/dejavu',
+    '/usr/share/fonts/dejavu',
+    'C:\\Windows\\Fonts',
+)
+
+
+def font_paths() -> Optional[Tuple[str, str]]:
+    """Файлы шрифта с кириллицей (обычный, жирный) или None"""
+    for directory in FONT_DIRS:
+        paths = tuple(os.path.join(directory, name) for name in FONT_FILES)
+        if directory and all(os.path.exists(path) for path in paths):
+            return paths
+    return None
+
+
+@dataclass
+class Primitive:
+    """Элемент чертежа в миллиметрах (ось y направлена вниз)"""
+    kind: str  # polygon, ellipse (две угловые точки), polyline, text
+    points: List[Tuple[float, float]]
+    style: str = 'dimension'
+    text: str = ''
+    anchor: str = 'middle'  # Выравнивание подписи: start, middle, end
+
+
+@dataclass
+class Scene:
+    """Чертеж: элементы и границы в миллиметрах"""
+    primitives: List[Primitive] = field(default_factory=list)
+
+    def add(self, kind: str, points: Sequence[Tuple[float, float]], style: str = 'dimension',
+            text: str = '', anchor: str = 'middle') -> None:
+        self.primitives.append(Primitive(kind, list(points), style, text, anchor))
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        points = [point for primitive in self.primitives if primitive.kind != 'text'
+                  for point in primitive.points]
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+def drawing_params(params: Dict) -> Dict:
+    """Проверка параметров чертежа (мм); форма по ключу API или названию из конструктора"""
+    values = {}
+    for key in ('length', 'width', 'shallow_depth', 'deep_depth'):
+        try:
+            values[key] = float(params[key])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Некорректное значение {key}: {params.get(key)}")
+        low, high = DIMENSION_LIMITS[key]
+        if not low <= values[key] <= high:
+            raise ValueError(f"Значение {key} должно быть от {low} до {high} мм")
+    if values['shallow_depth'] > values['deep_depth']:
+        raise ValueError("Мелкая часть глубже глубокой")
+    try:
+        values['steps_count'] = int(params.get('steps_count') or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректное количество ступеней: {params.get('steps_count')}")
+    if not 0 <= values['steps_count'] <= MAX_STEPS:
+        raise ValueError(f"Количество ступеней должно быть от 0 до {MAX_STEPS}")
+
+    shape = str(params.get('shape') or 'rectangular').strip().lower()
+    names = {name: key for key, aliases in SHAPES.items() for name in aliases}
+    if shape not in names:
+        raise ValueError(f"Неизвестная форма бассейна: {params.get('shape')}")
+    values['shape'] = names[shape]
+    if values['shape'] == 'l_shaped':
+        values['l_length'] = float(params.get('l_length') or values['length'] / 2)
+        values['l_width'] = float(params.get('l_width') or values['width'] / 2)
+        if not (0 < values['l_length'] < values['length'] and 0 < values['l_width'] < values['width']):
+            raise ValueError("Выступ L-образного бассейна должен быть меньше основной чаши")
+    return values
+
+
+def _outline(params: Dict) -> List[Tuple[float, float]]:
+    """Контур чаши в плане для многоугольных форм"""
+    length, width = params['length'], params['width']
+    if params['shape'] == 'l_shaped':
+        l_length, l_width = params['l_length'], params['l_width']
+        return [(0, 0), (length, 0), (length, l_width), (length - l_length, l_width),
+                (length - l_length, width), (0, width)]
+    return [(0, 0), (length, 0), (length, width), (0, width)]
+
+
+def _offset(points: List[Tuple[float, float]], distance: float) -> List[Tuple[float, float]]:
+    """Смещение наружу контура из прямых углов (обход по часовой стрелке при y вниз)"""
+    result = []
+    count = len(points)
+    for index, (x, y) in enumerate(points):
+        before = points[index - 1]
+        after = points[(index + 1) % count]
+        # Внешние нормали соседних ребер
+        normals = []
+        for (x1, y1), (x2, y2) in ((before, (x, y)), ((x, y), after)):
+            size = math.hypot(x2 - x1, y2 - y1)
+            normals.append(((y2 - y1) / size, -(x2 - x1) / size))
+        result.append((x + distance * (normals[0][0] + normals[1][0]),
+                       y + distance * (normals[0][1] + normals[1][1])))
+    return result
+
+
+def _dimension(scene: Scene, start: Tuple[float, float], end: Tuple[float, float],
+               text: str, anchor: str = 'middle') -> None:
+    """Размерная линия с засечками и подписью у середины"""
+    scene.add('polyline', [start, end])
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    size = math.hypot(dx, dy) or 1
+    tick = 0.02 * size + 100
+    for x, y in (start, end):
+        scene.add('polyline', [(x - dy / size * tick, y + dx / size * tick),
+                               (x + dy / size * tick, y - dx / size * tick)])
+    scene.add('text', [((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)], text=text, anchor=anchor)
+
+
+def plan_scene(params: Dict) -> Scene:
+    """План: котлован, стены, зеркало воды, ступени у мелкой части, размеры"""
+    scene = Scene()
+    length, width = params['length'], params['width']
+    scene.add('polygon', [(-PIT_OFFSET, -PIT_OFFSET), (length + PIT_OFFSET, -PIT_OFFSET),
+                          (length + PIT_OFFSET, width + PIT_OFFSET), (-PIT_OFFSET, width + PIT_OFFSET)], 'pit')
+    if params['shape'] == 'oval':
+        scene.add('ellipse', [(-SHELL, -SHELL), (length + SHELL, width + SHELL)], 'shell')
+        scene.add('ellipse', [(0, 0), (length, width)], 'water')
+    else:
+        outline = _outline(params)
+        scene.add('polygon', _offset(outline, SHELL), 'shell')
+        scene.add('polygon', outline, 'water')
+
+    # Ступени: проступь 300 мм поперек бассейна у мелкой части
+    for step in range(1, params['steps_count'] + 1):
+        x = step * STEP_TREAD
+        if x >= length / 2:
+            break
+        if params['shape'] == 'oval':
+            half = width / 2 * math.sqrt(max(1 - ((x - length / 2) / (length / 2)) ** 2, 0))
+            scene.add('polyline', [(x, width / 2 - half), (x, width / 2 + half)], 'step')
+        else:
+            scene.add('polyline', [(x, 0), (x, width)], 'step')
+
+    gap = PIT_OFFSET * 0.5
+    _dimension(scene, (0, width + gap), (length, width + gap), f"{length:.0f} мм")
+    _dimension(scene, (-gap, 0), (-gap, width), f"{width:.0f} мм", 'end')
+    if params['shape'] == 'l_shaped':
+        l_length, l_width = params['l_length'], params['l_width']
+        _dimension(scene, (length + gap, 0), (length + gap, l_width), f"{l_width:.0f} мм", 'start')
+        _dimension(scene, (length - l_length, -gap), (length, -gap), f"{l_length:.0f} мм")
+    return scene
+
+
+def section_scene(params: Dict) -> Scene:
+    """Продольный разрез: котлован, подбетонка, чаша, ступени, глубины"""
+    scene = Scene()
+    length = params['length']
+    shallow, deep = params['shallow_depth'], params['deep_depth']
+
+    def floor(x: float) -> float:
+        return shallow + (deep - shallow) * x / length
+
+    scene.add('polygon', [(-PIT_OFFSET, 0), (length + PIT_OFFSET, 0),
+                          (length + PIT_OFFSET, deep + PIT_EXTRA_DEPTH),
+                          (-PIT_OFFSET, shallow + PIT_EXTRA_DEPTH)], 'pit')
+    scene.add('polygon', [(-SHELL - BASE, shallow + SHELL), (length + SHELL + BASE, deep + SHELL),
+                          (length + SHELL + BASE, deep + SHELL + BASE),
+                          (-SHELL - BASE, shallow + SHELL + BASE)], 'base')
+    scene.add('polygon', [(-SHELL, 0), (length + SHELL, 0), (length + SHELL, deep + SHELL),
+                          (-SHELL, shallow + SHELL)], 'shell')
+    scene.add('polygon', [(0, 0), (length, 0), (length, deep), (0, shallow)], 'water')
+
+    # Ступени спускаются от борта мелкой части
+    steps = []
+    for step in range(1, params['steps_count'] + 1):
+        x, y = step * STEP_TREAD, step * STEP_RISE
+        if x >= length / 2 or y >= floor(x):
+            break
+        steps.extend([(x - STEP_TREAD, y), (x, y)])
+    if steps:
+        x = steps[-1][0]
+        scene.add('polygon', steps + [(x, floor(x)), (0, shallow)], 'step')
+
+    scene.add('polyline', [(-PIT_OFFSET * 1.2, 0), (length + PIT_OFFSET * 1.2, 0)], 'ground')
+    gap = PIT_OFFSET * 0.5
+    _dimension(scene, (0, -gap), (length, -gap), f"{length:.0f} мм")
+    _dimension(scene, (-gap * 2, 0), (-gap * 2, shallow), f"{shallow:.0f} мм", 'end')
+    _dimension(scene, (length + gap * 2, 0), (length + gap * 2, deep), f"{deep:.0f} мм", 'start')
+    return scene
+
+
+SCENES = {'plan': plan_scene, 'section': section_scene}
+
+
+class _Transform:
+    """Перевод миллиметров сцены в пиксели изображения заданной ширины"""
+    def __init__(self, scene: Scene, width: float, margin: float = MARGIN):
+        self.left, self.top, right, bottom = scene.bounds()
+        self.margin = margin
+        self.scale = (width - 2 * margin) / (right - self.left)
+        self.width = width
+        self.height = (bottom - self.top) * self.scale + 2 * margin
+
+    def __call__(self, point: Tuple[float, float]) -> Tuple[float, float]:
+        return ((point[0] - self.left) * self.scale + self.margin,
+                (point[1] - self.top) * self.scale + self.margin)
+
+
+def _text_offset(primitive: Primitive) -> Tuple[float, float]:
+    """Подпись размера ставится над горизонтальной линией и сбоку от вертикальной"""
+    if primitive.anchor == 'end':
+        return -6, FONT_SIZE / 3
+    if primitive.anchor == 'start':
+        return 6, FONT_SIZE / 3
+    return 0, -6
+
+
+def render_svg(scene: Scene, width: int = DEFAULT_WIDTH) -> bytes:
+    """Чертеж в SVG"""
+    transform = _Transform(scene, width)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{transform.width:.0f}" '
+             f'height="{transform.height:.0f}" viewBox="0 0 {transform.width:.0f} {transform.height:.0f}" '
+             f'font-family="DejaVu Sans, Arial, sans-serif" font-size="{FONT_SIZE}">']
+    for primitive in scene.primitives:
+        points = [transform(point) for point in primitive.points]
+        if primitive.kind == 'text':
+            (x, y), (dx, dy) = points[0], _text_offset(primitive)
+            parts.append(f'<text x="{x + dx:.1f}" y="{y + dy:.1f}" text-anchor="{primitive.anchor}" '
+                         f'fill="{TEXT_COLOR}">{escape(primitive.text)}</text>')
+            continue
+        fill, stroke, stroke_width, dashed = STYLES[primitive.style]
+        style = (f'fill="{fill or "none"}" stroke="{stroke}" stroke-width="{stroke_width}"'
+                 + (' stroke-dasharray="6 4"' if dashed else ''))
+        if primitive.kind == 'ellipse':
+            (x0, y0), (x1, y1) = points
+            parts.append(f'<ellipse cx="{(x0 + x1) / 2:.1f}" cy="{(y0 + y1) / 2:.1f}" '
+                         f'rx="{(x1 - x0) / 2:.1f}" ry="{(y1 - y0) / 2:.1f}" {style}/>')
+        else:
+            tag = 'polygon' if primitive.kind == 'polygon' else 'polyline'
+            coordinates = ' '.join(f'{x:.1f},{y:.1f}' for x, y in points)
+            parts.append(f'<{tag} points="{coordinates}" {style}/>')
+    parts.append('</svg>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _dashes(points: List[Tuple[float, float]], dash: float = 6, gap: float = 4):
+    """Отрезки пунктира вдоль ломаной"""
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        size = math.hypot(x2 - x1, y2 - y1)
+        position = 0.0
+        while position < size:
+            end = min(position + dash, size)
+            yield [(x1 + (x2 - x1) * position / size, y1 + (y2 - y1) * position / size),
+                   (x1 + (x2 - x1) * end / size, y1 + (y2 - y1) * end / size)]
+            position = end + gap
+
+
+@lru_cache(maxsize=None)
+def png_font(size: int):
+    """Шрифт Pillow заданного размера: файл шрифта читается один раз на процесс"""
+    from PIL import ImageFont
+
+    paths = font_paths()
+    return ImageFont.truetype(paths[0], size) if paths else ImageFont.load_default()
+
+
+def render_png(scene: Scene, width: int = DEFAULT_WIDTH, supersample: int = 2) -> bytes:
+    """Чертеж в PNG (Pillow): рисуется с увеличением и уменьшается для сглаживания"""
+    from PIL import Image, ImageDraw
+
+    if _Transform(scene, width).height * width * supersample ** 2 > SUPERSAMPLE_PIXELS:
+        supersample = 1
+    transform = _Transform(scene, width * supersample, MARGIN * supersample)
+    image = Image.new('RGB', (round(transform.width), round(transform.height)), 'white')
+    draw = ImageDraw.Draw(image)
+    paths = font_paths()
+    font = png_font(FONT_SIZE * supersample)
+    anchors = {'start': 'lm', 'middle': 'ms', 'end': 'rm'}
+    for primitive in scene.primitives:
+        points = [transform(point) for point in primitive.points]
+        if primitive.kind == 'text':
+            (x, y), (dx, _) = points[0], _text_offset(primitive)
+            anchor = anchors[primitive.anchor] if paths else None
+            dy = -6 if primitive.anchor == 'middle' else 0  # Якорь Pillow уже центрирует по высоте
+            draw.text((x + dx * supersample, y + dy * supersample), primitive.text,
+                      fill=TEXT_COLOR, font=font, anchor=anchor)
+            continue
+        fill, stroke, stroke_width, dashed = STYLES[primitive.style]
+        line_width = stroke_width * supersample
+        if primitive.kind == 'ellipse':
+            draw.ellipse([points[0], points[1]], fill=fill, outline=stroke, width=line_width)
+            continue
+        if primitive.kind == 'polygon':
+            if fill:
+                draw.polygon(points, fill=fill)
+            points = points + points[:1]
+        if dashed:
+            for segment in _dashes(points, 6 * supersample, 4 * supersample):
+                draw.line(segment, fill=stroke, width=line_width)
+        else:
+            draw.line(points, fill=stroke, width=line_width, joint='curve')
+    if supersample > 1:
+        image = image.resize((round(transform.width / supersample), round(transform.height / supersample)),
+                             Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def pool_drawing(scene: Scene, width: float, font: str = 'Helvetica'):
+    """Чертеж как reportlab Drawing - вставляется в PDF как обычный элемент документа"""
+    from reportlab.graphics.shapes import Drawing, Ellipse, PolyLine, Polygon, String
+    from reportlab.lib.colors import HexColor
+
+    transform = _Transform(scene, width)
+    drawing = Drawing(transform.width, transform.height)
+
+    def flip(point: Tuple[float, float]) -> Tuple[float, float]:
+        x, y = transform(point)
+        return x, transform.height - y  # В PDF ось y направлена вверх
+
+    for primitive in scene.primitives:
+        points = [flip(point) for point in primitive.points]
+        if primitive.kind == 'text':
+            (x, y), (dx, dy) = points[0], _text_offset(primitive)
+            drawing.add(String(x + dx, y - dy, primitive.text, fontName=font, fontSize=FONT_SIZE * 0.7,
+                               textAnchor=primitive.anchor, fillColor=HexColor(TEXT_COLOR)))
+            continue
+        fill, stroke, stroke_width, dashed = STYLES[primitive.style]
+        style = {
+            'strokeColor': HexColor(stroke),
+            'strokeWidth': stroke_width * 0.5,
+            'strokeDashArray': [3, 2] if dashed else None,
+        }
+        if primitive.kind == 'ellipse':
+            (x0, y0), (x1, y1) = points
+            drawing.add(Ellipse((x0 + x1) / 2, (y0 + y1) / 2, abs(x1 - x0) / 2, abs(y1 - y0) / 2,
+                                fillColor=HexColor(fill) if fill else None, **style))
+        elif primitive.kind == 'polygon':
+            drawing.add(Polygon([coordinate for point in points for coordinate in point],
+                                fillColor=HexColor(fill) if fill else None, **style))
+        else:
+            drawing.add(PolyLine([coordinate for point in points for coordinate in point], **style))
+    return drawing
+
+
+def render_drawing(params: Dict, view: str = 'plan', image_format: str = 'svg',
+                   width: int = DEFAULT_WIDTH) -> bytes:
+    """План или разрез бассейна в SVG или PNG по параметрам drawing_params"""
+    if view not in VIEWS:
+        raise ValueError(f"Неизвестный вид чертежа: {view}")
+    if image_format not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат изображения: {image_format}")
+    if not 100 <= width <= MAX_WIDTH:
+        raise ValueError(f"Ширина изображения должна быть от 100 до {MAX_WIDTH} пикс.")
+    scene = SCENES[view](params)
+    # Узкий длинный бассейн дает высокое изображение: ограничивается площадь, а не только ширина
+    transform = _Transform(scene, width)
+    if transform.width * transform.height > MAX_PIXELS:
+        raise ValueError(f"Слишком большое изображение ({transform.width:.0f}×{transform.height:.0f} пикс.), "
+                         f"уменьшите ширину")
+    if image_format == 'svg':
+        return render_svg(scene, width)
+    return render_png(scene, width)
@@ -0,0 +1,227 @@
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Dict, List, Optional, Tuple
+import gzip
+import json
+import struct
+
+# Форматы ответа /calculate: JSON (как jsonify) и MessagePack
+MEDIA_TYPES = {'application/json': 'json', 'application/msgpack': 'msgpack', 'application/x-msgpack': 'msgpack'}
+MIMETYPES = {'json': 'application/json', 'msgpack': 'application/msgpack'}
+# Разделы результата и глубина пути в fields= (dimensions.internal.length)
+SECTIONS = {'dimensions': 3, 'areas': 2, 'volumes': 2, 'materials': 2, 'works': 1}
+GZIP_MIN_BYTES = 1024  # Меньшие ответы не сжимаются: заголовок gzip съедает выигрыш
+GZIP_LEVEL = 5
+
+Fields = Tuple[Tuple[str, ...], ...]
+
+
+def parse_fields(value: Optional[str]) -> Fields:
+    """Поля ответа из fields=areas,volumes.pit; пусто - весь результат"""
+    paths = set()
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        path = tuple(item.split('.'))
+        if path[0] not in SECTIONS or len(path) > SECTIONS[path[0]] or not all(path):
+            raise ValueError(f"Неизвестное поле ответа: {item}")
+        paths.add(path)
+    return tuple(sorted(paths))
+
+
+def _selection(fields: Fields):
+    """Дерево выбранных полей: True - значение целиком"""
+    if not fields:
+        return True
+    tree: Dict = {}
+    for path in fields:
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if node is True:
+                break
+        else:
+            node[path[-1]] = True
+    return tree
+
+
+def _accepted(header: Optional[str]) -> List[Tuple[str, float]]:
+    """Значения заголовка Accept/Accept-Encoding с весами q"""
+    items = []
+    for part in (header or '').split(','):
+        name, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            items.append((name.lower(), quality))
+    return items
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Формат ответа по заголовку Accept; без подходящего - JSON"""
+    best, best_quality = 'json', 0.0
+    for name, quality in _accepted(accept):
+        media = MEDIA_TYPES.get(name, 'json' if name in ('*/*', 'application/*') else None)
+        # При равных весах предпочтителен JSON
+        if media and (quality > best_quality or quality == best_quality and media == 'json'):
+            best, best_quality = media, quality
+    return best
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    return any(name in ('gzip', '*') and quality > 0 for name, quality in _accepted(accept_encoding))
+
+
+# JSON: компактный, с сортировкой ключей и экранированием не-ASCII, как jsonify
+
+# Значения целиком кодирует C-ускоренный кодировщик json
+_JSON = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+
+@lru_cache(maxsize=1024)
+def _json_key(key: str) -> str:
+    return encode_basestring_ascii(key) + ':'
+
+
+def _json_value(value, out: List[str]) -> None:
+    out.append(_JSON.encode(value))
+
+
+def _compile_json(selection) -> Callable[[Dict, List[str]], None]:
+    if selection is True:
+        return _json_value
+    children = [(key, _json_key(key), _compile_json(child)) for key, child in sorted(selection.items())]
+
+    def write(value: Dict, out: List[str]) -> None:
+        out.append('{')
+        first = True
+        for key, prefix, child in children:
+            if key in value:
+                if not first:
+                    out.append(',')
+                first = False
+                out.append(prefix)
+                child(value[key], out)
+        out.append('}')
+    return write
+
+
+# MessagePack: те же данные в двоичном виде, ключи отсортированы
+
+def _pack_header(size: int, fix: int, codes: Tuple[int, int]) -> bytes:
+    if size < 16:
+        return bytes((fix | size,))
+    if size < 0x10000:
+        return bytes((codes[0],)) + struct.pack('>H', size)
+    return bytes((codes[1],)) + struct.pack('>I', size)
+
+
+@lru_cache(maxsize=1024)
+def _pack_str(value: str) -> bytes:
+    data = value.encode('utf-8')
+    size = len(data)
+    if size < 32:
+        return bytes((0xa0 | size,)) + data
+    if size < 0x100:
+        return bytes((0xd9, size)) + data
+    if size < 0x10000:
+        return b'\xda' + struct.pack('>H', size) + data
+    return b'\xdb' + struct.pack('>I', size) + data
+
+
+def _pack_int(value: int) -> bytes:
+    if 0 <= value < 0x80:
+        return bytes((value,))
+    if -32 <= value < 0:
+        return struct.pack('b', value)
+    for low, high, code, form in ((0, 0xff, 0xcc, '>B'), (0, 0xffff, 0xcd, '>H'), (0, 0xffffffff, 0xce, '>I'),
+                                  (-0x80, 0x7f, 0xd0, '>b'), (-0x8000, 0x7fff, 0xd1, '>h'),
+                                  (-0x80000000, 0x7fffffff, 0xd2, '>i')):
+        if low <= value <= high:
+            return bytes((code,)) + struct.pack(form, value)
+    if value > 0:
+        return b'\xcf' + struct.pack('>Q', value)
+    return b'\xd3' + struct.pack('>q', value)
+
+
+def _pack_value(value, out: bytearray) -> None:
+    if isinstance(value, str):
+        out += _pack_str(value)
+    elif value is None:
+        out.append(0xc0)
+    elif value is True:
+        out.append(0xc3)
+    elif value is False:
+        out.append(0xc2)
+    elif isinstance(value, float):
+        out.append(0xcb)
+        out += struct.pack('>d', value)
+    elif isinstance(value, int):
+        out += _pack_int(value)
+    elif isinstance(value, dict):
+        out += _pack_header(len(value), 0x80, (0xde, 0xdf))
+        for key in sorted(value):
+            out += _pack_str(key)
+            _pack_value(value[key], out)
+    else:
+        out += _pack_header(len(value), 0x90, (0xdc, 0xdd))
+        for item in value:
+            _pack_value(item, out)
+
+
+def _compile_msgpack(selection) -> Callable[[Dict, bytearray], None]:
+    if selection is True:
+        return _pack_value
+    children = [(key, _pack_str(key), _compile_msgpack(child)) for key, child in sorted(selection.items())]
+
+    def write(value: Dict, out: bytearray) -> None:
+        present = [child for child in children if child[0] in value]
+        out += _pack_header(len(present), 0x80, (0xde, 0xdf))
+        for key, packed, child in present:
+            out += packed
+            child(value[key], out)
+    return write
+
+
+@lru_cache(maxsize=256)
+def encoder(fields: Fields, media: str) -> Callable[[Dict], bytes]:
+    """Кодировщик ответа {'success': true, 'data': ...} для набора полей
+
+    Ключи выбранных полей кодируются один раз при сборке кодировщика,
+    для каждого ответа кодируются только значения.
+    """
+    envelope = {'data': _selection(fields), 'success': True}
+    if media == 'msgpack':
+        write_msgpack = _compile_msgpack(envelope)
+
+        def encode(result: Dict) -> bytes:
+            out = bytearray()
+            write_msgpack({'data': result, 'success': True}, out)
+            return bytes(out)
+    else:
+        write_json = _compile_json(envelope)
+
+        def encode(result: Dict) -> bytes:
+            out: List[str] = []
+            write_json({'data': result, 'success': True}, out)
+            out.append('\n')
+            return ''.join(out).encode('ascii')
+    return encode
+
+
+def encode_result(result: Dict, fields: Fields, accept: Optional[str],
+                  accept_encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+    """Тело и заголовки ответа /calculate по заголовкам Accept и Accept-Encoding"""
+    media = negotiate(accept)
+    body = encoder(fields, media)(result)
+    headers = {'Content-Type': MIMETYPES[media], 'Vary': 'Accept, Accept-Encoding'}
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, GZIP_LEVEL, mtime=0)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
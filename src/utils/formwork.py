@@ -0,0 +1,157 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+import logging
+import math
+
+import numpy as np
+
+from .catalog import sheet_formats
+from .reinforcement import SHELL_THICKNESS
+
+logger = logging.getLogger(__name__)
+
+CUT_STEP = 50  # Размеры подрезанных панелей округляются вверх до 5см (мм)
+STUD_SPACING = 625  # Шаг стоек из бруса (4 пролета на лист 2500), мм
+WALER_SPACING = 600  # Шаг горизонтальных схваток, мм
+
+
+def panel_sizes(length: int, start_height: int, end_height: int,
+                sheet_width: int, sheet_height: int) -> Counter:
+    """Панели опалубки на грани-трапеции: {(ширина, высота): количество}, мм"""
+    columns = np.arange(0, length, sheet_width)
+    widths = np.minimum(sheet_width, length - columns)
+
+    # Панель в колонке должна перекрыть наибольшую высоту грани в ее пределах
+    slope = (end_height - start_height) / length
+    column_heights = np.maximum(start_height + slope * columns,
+                                start_height + slope * (columns + widths))
+    rows = np.arange(0, column_heights.max(), sheet_height)
+    heights = np.clip(column_heights[None, :] - rows[:, None], 0, sheet_height)
+    heights = np.ceil(heights / CUT_STEP) * CUT_STEP
+    heights = np.minimum(heights, sheet_height)
+    mask = heights > 0
+
+    sizes = np.stack([np.broadcast_to(widths, heights.shape)[mask], heights[mask]])
+    unique, counts = np.unique(sizes.astype(int), axis=1, return_counts=True)
+    return Counter({(int(width), int(height)): int(count)
+                    for (width, height), count in zip(unique.T, counts)})
+
+
+def _best_panels(length: int, start_height: int, end_height: int,
+                 sheet_width: int, sheet_height: int) -> Counter:
+    """Панели в ориентации листа с меньшим числом панелей"""
+    variants = [panel_sizes(length, start_height, end_height, sheet_width, sheet_height),
+                panel_sizes(length, start_height, end_height, sheet_height, sheet_width)]
+    return min(variants, key=lambda panels: sum(panels.values()))
+
+
+def pack_panels(panels: List[Tuple[int, int]], sheet_width: int, sheet_height: int) -> int:
+    """Число листов для подрезанных панелей (полочная раскладка)"""
+    sheets: List[Dict] = []
+    for width, height in sorted(panels, key=lambda panel: (panel[1], panel[0]), reverse=True):
+        # Панель длинной стороной вдоль листа
+        if width > sheet_width or height > sheet_height:
+            width, height = height, width
+        placed = False
+        for sheet in sheets:
+            for shelf in sheet['shelves']:
+                if height <= shelf['height'] and shelf['used'] + width <= sheet_width:
+                    shelf['used'] += width
+                    placed = True
+                    break
+            if not placed and sheet['height'] + height <= sheet_height:
+                sheet['shelves'].append({'height': height, 'used': width})
+                sheet['height'] += height
+                placed = True
+            if placed:
+                break
+        if not placed:
+            sheets.append({'height': height, 'shelves': [{'height': height, 'used': width}]})
+    return len(sheets)
+
+
+def _timber(length: int, height: float) -> float:
+    """Брус на грань: стойки по шагу и горизонтальные схватки, м.п."""
+    studs = (math.ceil(length / STUD_SPACING) + 1) * height
+    walers = (math.ceil(height / WALER_SPACING) + 1) * length
+    return (studs + walers) / 1000
+
+
+def pour_stages(dimensions) -> List[Tuple[str, List[Tuple[int, int, int, int]]]]:
+    """Заливки и их грани опалубки: (название, [(кол-во, длина, высота в начале, в конце)]), мм"""
+    thickness = round(SHELL_THICKNESS * 1000)
+    length = round(dimensions.length * 1000)
+    width = round(dimensions.width * 1000)
+    shallow = round(dimensions.shallow_depth * 1000)
+    deep = round(dimensions.deep_depth * 1000)
+    outer_length = length + 2 * thickness
+    outer_width = width + 2 * thickness
+    return [
+        ('Плита дна', [
+            (2, outer_length, thickness, thickness),
+            (2, outer_width, thickness, thickness),
+        ]),
+        ('Продольные стены', [
+            (2, length, shallow, deep),  # внутренние щиты
+            (2, outer_length, shallow + thickness, deep + thickness),  # наружные щиты
+        ]),
+        ('Торцевые стены', [
+            (1, width, shallow, shallow),
+            (1, width, deep, deep),
+            (1, outer_width, shallow + thickness, shallow + thickness),
+            (1, outer_width, deep + thickness, deep + thickness),
+        ]),
+    ]
+
+
+def plan_formwork(dimensions, sheet: str = 'plywood_18') -> Dict:
+    """Раскладка листов опалубки по граням с оборачиваемостью между заливками"""
+    if sheet not in sheet_formats:
+        raise ValueError(f"Нет формата листа: {sheet}")
+    sheet_format = sheet_formats[sheet]
+    sheet_width = round(sheet_format['width'] * 1000)
+    sheet_height = round(sheet_format['height'] * 1000)
+    reuse_limit = sheet_format['reuse_limit']
+
+    stages = []
+    for name, faces in pour_stages(dimensions):
+        panels = Counter()
+        timber = 0.0
+        for count, length, start_height, end_height in faces:
+            face_panels = _best_panels(length, start_height, end_height, sheet_width, sheet_height)
+            for size, quantity in face_panels.items():
+                panels[size] += quantity * count
+            timber += _timber(length, max(start_height, end_height)) * count
+        stages.append({'stage': name, 'panels': panels, 'timber': timber})
+
+    # Панель одного размера переходит на следующую заливку, пока не изношена
+    needed = Counter()
+    for size in set().union(*(stage['panels'] for stage in stages)):
+        uses = [stage['panels'][size] for stage in stages]
+        needed[size] = max(max(uses), math.ceil(sum(uses) / reuse_limit))
+
+    def sheets_for(panels: Counter) -> int:
+        whole = sum(count for (width, height), count in panels.items()
+                    if {width, height} == {sheet_width, sheet_height})
+        cut = [size for size, count in panels.items()
+               if {size[0], size[1]} != {sheet_width, sheet_height} for _ in range(count)]
+        return whole + pack_panels(cut, sheet_width, sheet_height)
+
+    sheets = sheets_for(needed)
+    sheets_without_reuse = sum(sheets_for(stage['panels']) for stage in stages)
+    timber = max(stage['timber'] for stage in stages)  # брус переставляется вместе со щитами
+
+    logger.debug(f"Опалубка: {sheets} листов (без оборачиваемости {sheets_without_reuse})")
+    return {
+        'sheet': {'width': sheet_format['width'], 'height': sheet_format['height']},
+        'stages': [{
+            'stage': stage['stage'],
+            'panels': [{'width': width / 1000, 'height': height / 1000, 'count': count}
+                       for (width, height), count in sorted(stage['panels'].items(), reverse=True)],
+            'timber': stage['timber']
+        } for stage in stages],
+        'sheets': sheets,
+        'sheets_without_reuse': sheets_without_reuse,
+        'plywood_area': sheets * sheet_format['width'] * sheet_format['height'],
+        'timber_length': timber
+    }
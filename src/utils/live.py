@@ -0,0 +1,154 @@
+from functools import partial
+from typing import Callable, Dict, Generator, Iterator, Optional, Tuple, Union
+import json
+import logging
+import re
+import secrets
+import time
+
+from .calculator import PoolCalculator
+from .sharedcache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05  # Проверка новых правок, с
+DEBOUNCE = 0.15  # Расчет после паузы во вводе, с
+MAX_DELAY = 0.5  # Расчет не позже этого времени с первой правки при непрерывном вводе, с
+HEARTBEAT = 15.0  # Комментарий для прокси и обнаружения закрытых соединений, с
+IDLE_TIMEOUT = 600.0  # Поток закрывается без правок; браузер переподключится сам, с
+SESSION_ID = re.compile(r'[0-9a-f]{16}')
+
+Compute = Callable[[Dict, PoolCalculator], Dict]
+# Сообщение SSE, пауза (None) или расчет: сервер вызывает его и передает результат send()
+Step = Union[str, None, Callable[[], Dict]]
+
+
+def new_session() -> str:
+    return secrets.token_hex(8)
+
+
+def post_edit(edits: SharedCache, session: str, params: Dict) -> int:
+    """Сохранить текущие параметры формы сеанса; возвращает номер правки
+
+    Браузер присылает параметры целиком, поэтому одновременные правки не
+    нужно сливать: побеждает последняя. Правка лежит в общей памяти и видна
+    потоку сеанса в любом воркере.
+    """
+    if not SESSION_ID.fullmatch(session):
+        raise ValueError("Неизвестный сеанс")
+    if not isinstance(params, dict):
+        raise ValueError("Параметры должны быть объектом JSON")
+    revision = time.time_ns()
+    payload = json.dumps({'revision': revision, 'params': params}, ensure_ascii=False).encode('utf-8')
+    if not edits.put(session, payload):
+        raise ValueError("Слишком большой набор параметров")
+    return revision
+
+
+def _latest(edits: SharedCache, session: str) -> Tuple[int, Optional[Dict]]:
+    value = edits.get(session)
+    if value is None:
+        return 0, None
+    edit = json.loads(value)
+    return edit['revision'], edit['params']
+
+
+def _flatten(value, prefix: str = '') -> Dict[str, object]:
+    """Значения результата по путям через точку; списки (работы) - целиком"""
+    if not isinstance(value, dict):
+        return {prefix: value}
+    flat = {}
+    for key, item in value.items():
+        flat.update(_flatten(item, f'{prefix}.{key}' if prefix else key))
+    return flat
+
+
+def diff(old: Optional[Dict], new: Dict) -> Dict[str, object]:
+    """Изменения результата: новые значения по путям и удаленные пути"""
+    before = _flatten(old) if old else {}
+    after = _flatten(new)
+    return {
+        'set': {path: value for path, value in after.items() if path not in before or before[path] != value},
+        'unset': [path for path in before if path not in after]
+    }
+
+
+def event(name: str, data, event_id: Optional[int] = None) -> str:
+    """Сообщение Server-Sent Events"""
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def session_events(session: str, edits: SharedCache, compute: Compute) -> Generator[Step, Optional[Dict], None]:
+    """События сеанса: пересчет после паузы во вводе и разница с прошлым результатом
+
+    Правки, пришедшие во время паузы или расчета, объединяются: считается
+    только последнее состояние формы. Калькулятор сеанса хранит граф расчета,
+    поэтому пересчитываются лишь узлы, зависящие от измененных параметров.
+    None означает паузу на POLL_INTERVAL: ее выдерживает сервер (поток WSGI
+    или цикл событий ASGI). Расчет выдается вызываемым объектом: сервер
+    выполняет его сам (ASGI - вне цикла событий) и возвращает результат
+    через send(), ошибку - через throw().
+    """
+    calculator = PoolCalculator()
+    result: Optional[Dict] = None
+    computed = 0
+    yield event('session', {'session': session})
+    yield 'retry: 2000\n\n'
+
+    started = last_sent = last_edit = time.monotonic()
+    while True:
+        yield None
+        now = time.monotonic()
+        revision, params = _latest(edits, session)
+        if revision > computed:
+            # Ждем паузы во вводе, но не дольше MAX_DELAY с первой правки
+            first_seen = last_change = now
+            while now - last_change < DEBOUNCE and now - first_seen < MAX_DELAY:
+                yield None
+                now = time.monotonic()
+                newest, newest_params = _latest(edits, session)
+                if newest != revision:
+                    revision, params, last_change = newest, newest_params, now
+            computed = revision
+            last_edit = last_sent = time.monotonic()
+            try:
+                current = yield partial(compute, params, calculator)
+            except Exception as e:
+                logger.debug(f"Сеанс {session}: {str(e)}")
+                yield event('failure', {'error': str(e)}, revision)
+                continue
+            changes = diff(result, current)
+            result = current
+            yield event('delta', dict(changes, revision=revision), revision)
+        elif now - last_edit > IDLE_TIMEOUT:
+            logger.debug(f"Сеанс {session} закрыт без правок за {now - started:.0f} с")
+            return
+        elif now - last_sent > HEARTBEAT:
+            last_sent = now
+            yield ': ping\n\n'
+
+
+def stream(session: str, edits: SharedCache, compute: Compute) -> Iterator[str]:
+    """Поток событий сеанса для WSGI: занимает поток воркера на время соединения"""
+    events = session_events(session, edits, compute)
+    step = next(events)
+    while True:
+        if step is None:
+            time.sleep(POLL_INTERVAL)
+            advance = partial(next, events)
+        elif callable(step):
+            try:
+                advance = partial(events.send, step())
+            except Exception as e:
+                advance = partial(events.throw, e)
+        else:
+            yield step
+            advance = partial(next, events)
+        try:
+            step = advance()
+        except StopIteration:
+            return
@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import json
+import time
+
+# Параметры бассейна для запросов; длина меняется, чтобы выгрузки не брались из кэша
+DESIGN = {'length': 7500, 'width': 4000, 'shallow_depth': 1200, 'deep_depth': 1800,
+          'steps_count': 4, 'pool_type': 'ceramic', 'finish_type': 'ceramic'}
+SCENARIOS = ('calculate', 'pdf', 'mixed')
+
+
+async def request(url: str, method: str = 'GET', body: bytes = b'',
+                  chunks: int = 1, upload_delay: float = 0.0) -> Tuple[int, bytes]:
+    """HTTP/1.1-запрос с отдельным соединением; тело отправляется chunks порциями с паузой"""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        head = (f'{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n')
+        writer.write(head.encode('latin-1'))
+        size = -(-len(body) // chunks) if body else 0
+        for offset in range(0, len(body), size or 1):
+            if offset and upload_delay:
+                await asyncio.sleep(upload_delay)
+            writer.write(body[offset:offset + size])
+            await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_line, _, rest = response.partition(b'\r\n')
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, rest.partition(b'\r\n\r\n')[2]
+
+
+def _payloads(base: str, scenario: str, count: int, export_data: Dict) -> List[Tuple[str, bytes]]:
+    """Запросы сценария: расчет, выгрузка PDF или оба через один"""
+    payloads = []
+    for number in range(count):
+        design = dict(DESIGN, length=DESIGN['length'] + number % 1000)
+        if scenario == 'calculate' or scenario == 'mixed' and number % 2 == 0:
+            payloads.append((base + '/calculate', json.dumps(design).encode('utf-8')))
+        else:
+            data = dict(export_data, materials=dict(export_data['materials'], _request=number))
+            payloads.append((base + '/export/pdf', json.dumps(data).encode('utf-8')))
+    return payloads
+
+
+async def run_target(base: str, scenario: str, count: int, concurrency: int,
+                     chunks: int, upload_delay: float) -> Dict:
+    """Нагрузка на один сервер: count запросов не больше concurrency одновременно"""
+    status, body = await request(base + '/calculate', 'POST', json.dumps(DESIGN).encode('utf-8'))
+    if status != 200:
+        raise ValueError(f"{base}: /calculate вернул {status}")
+    export_data = json.loads(body)['data']
+
+    payloads = _payloads(base, scenario, count, export_data)
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(url: str, payload: bytes) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, body = await request(url, 'POST', payload, chunks, upload_delay)
+            except OSError:
+                errors += 1
+                return
+            if status != 200 or not (body.startswith(b'%PDF') or b'"success":true' in body.replace(b' ', b'')):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(url, payload) for url, payload in payloads))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(share: float) -> float:
+        return latencies[min(int(share * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': latencies[-1] * 1000 if latencies else 0.0
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Сравнение пропускной способности и задержек серверов API расчета")
+    parser.add_argument('targets', nargs='+', help="Серверы в виде имя=http://хост:порт")
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed', help="Запросы: расчет, PDF или оба")
+    parser.add_argument('--requests', type=int, default=500, help="Число запросов на сервер")
+    parser.add_argument('--concurrency', type=int, default=32, help="Одновременных клиентов")
+    parser.add_argument('--chunks', type=int, default=1, help="Порций при отправке тела")
+    parser.add_argument('--upload-delay', type=float, default=0.0,
+                        help="Пауза между порциями тела, с (медленные клиенты)")
+    args = parser.parse_args(argv)
+
+    print(f"{'Сервер':<12}{'Запросов':>10}{'Ошибок':>8}{'Запр/с':>9}"
+          f"{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for target in args.targets:
+        name, _, base = target.rpartition('=')
+        result = asyncio.run(run_target(base.rstrip('/'), args.scenario, args.requests, args.concurrency,
+                                        args.chunks, args.upload_delay))
+        print(f"{name or base:<12}{result['requests']:>10}{result['errors']:>8}{result['throughput']:>9.1f}"
+              f"{result['p50']:>10.0f}{result['p95']:>10.0f}{result['p99']:>10.0f}{result['max']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+from typing import Dict, List
+import heapq
+import logging
+import math
+
+from .catalog import soil_swell
+
+logger = logging.getLogger(__name__)
+
+DUMP_TRUCK_CAPACITY = 6.0  # КАМАЗ, м³ разрыхленного грунта
+MIXER_SIZES = (9.0, 7.0, 5.0)  # Объем барабана миксеров, м³
+ORDER_STEP = 0.5  # Бетон заказывается кратно 0.5 м³
+PUMP_RATE = 20.0  # Производительность бетононасоса, м³/ч
+PUMP_SETUP_MINUTES = 40  # Приезд и установка насоса
+LOAD_MINUTES = 8  # Погрузка самосвала экскаватором
+DUMP_MINUTES = 10  # Разгрузка на полигоне
+PLANT_MINUTES = 15  # Загрузка миксера на заводе
+SPEED_KMH = 30.0  # Средняя скорость техники
+DISTANCE_KM = 15.0  # Расстояние от объекта до полигона и завода по умолчанию
+WORKDAY_MINUTES = 600  # Длина рабочей смены
+
+# Заливки по маркам бетона
+POURS = {
+    'concrete_200': 'Подбетонка',
+    'concrete_300': 'Чаша',
+}
+
+# Параметры парка по умолчанию
+DEFAULT_FLEET = {
+    'trucks': 8,
+    'mixers': 6,
+    'truck_capacity': DUMP_TRUCK_CAPACITY,
+    'mixer_sizes': MIXER_SIZES,
+    'pump_rate': PUMP_RATE,
+    'speed_kmh': SPEED_KMH,
+    'workday_minutes': WORKDAY_MINUTES,
+}
+
+
+def plan_haul(pit_volume: float, soil_type: str = 'loam',
+              capacity: float = DUMP_TRUCK_CAPACITY) -> Dict:
+    """Вывоз грунта: объем с учетом разрыхления и число рейсов"""
+    if soil_type not in soil_swell:
+        raise ValueError(f"Неизвестный тип грунта: {soil_type}")
+    swell = soil_swell[soil_type]
+    loose = pit_volume * swell
+    trips = math.ceil(loose / capacity - 1e-9)
+    return {
+        'soil_type': soil_type,
+        'bank_volume': pit_volume,
+        'swell': swell,
+        'loose_volume': loose,
+        'trips': trips,
+        'last_load': loose - (trips - 1) * capacity if trips else 0
+    }
+
+
+def plan_pour(volume: float, grade: str, mixer_sizes=MIXER_SIZES,
+              pump_rate: float = PUMP_RATE) -> Dict:
+    """Доставка бетона миксерами: полные рейсы крупнейшего миксера и добор меньшим"""
+    if volume <= 0:
+        raise ValueError("Объем заливки должен быть больше нуля")
+    sizes = sorted(mixer_sizes)
+    ordered = math.ceil(volume / ORDER_STEP - 1e-9) * ORDER_STEP
+    full = int(ordered // sizes[-1])
+    loads = [sizes[-1]] * full
+    remainder = ordered - full * sizes[-1]
+    if remainder > 1e-9:
+        loads.append(remainder)
+    return {
+        'grade': grade,
+        'pour': POURS.get(grade, grade),
+        'volume': volume,
+        'ordered': ordered,
+        'loads': [{'volume': load,
+                   'mixer': next(size for size in sizes if size >= load - 1e-9)}
+                  for load in loads],
+        'pump_minutes': ordered / pump_rate * 60
+    }
+
+
+def plan_site(volumes, soil_type: str = 'loam') -> Dict:
+    """Рейсы самосвалов и доставки бетона для одного объекта (PoolVolumes)"""
+    return {
+        'haul': plan_haul(volumes.pit, soil_type),
+        'pours': [plan_pour(getattr(volumes, grade), grade) for grade in POURS]
+    }
+
+
+def travel_minutes(distance_km: float, speed_kmh: float) -> float:
+    """Время в пути, мин"""
+    return distance_km / speed_kmh * 60
+
+
+def schedule_hauls(sites: List[Dict], fleet: Dict) -> List[Dict]:
+    """Вывоз грунта с нескольких объектов общим парком самосвалов за смену
+
+    Очередь самосвалов по времени освобождения и очередь объектов по
+    приоритету и моменту выезда к освобождению экскаватора. Самосвал едет на
+    самый приоритетный объект, где не придется ждать погрузки, а если такого
+    нет - туда, где погрузка начнется раньше. Рейс, который не успевает в
+    смену у самого раннего самосвала, не успеет и у остальных - объект
+    снимается с очереди, остаток переносится.
+    """
+    workday = fleet['workday_minutes']
+    trucks = [(0.0, number) for number in range(fleet['trucks'])]
+    heapq.heapify(trucks)
+
+    queue = []
+    for index, site in enumerate(sites):
+        site['haul_schedule'] = {'trips_done': 0, 'finish': None}
+        if site['haul']['trips'] > 0:
+            queue.append((site['priority'], -site['travel'], index))
+            site['_excavator_free'] = 0.0
+    heapq.heapify(queue)
+
+    while trucks and queue:
+        free_at, number = heapq.heappop(trucks)
+        chosen = None
+        skipped = []
+        while queue:
+            entry = heapq.heappop(queue)
+            site = sites[entry[2]]
+            if free_at + site['travel'] + LOAD_MINUTES + site['travel'] + DUMP_MINUTES > workday:
+                continue
+            if entry[1] <= free_at:
+                if chosen is not None:
+                    skipped.append(chosen)
+                chosen = entry
+                break
+            if chosen is None or entry[1] < chosen[1]:
+                if chosen is not None:
+                    skipped.append(chosen)
+                chosen = entry
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(queue, entry)
+        if chosen is None:
+            break
+
+        site = sites[chosen[2]]
+        loaded = max(free_at + site['travel'], site['_excavator_free']) + LOAD_MINUTES
+        back = loaded + site['travel'] + DUMP_MINUTES
+        if back > workday:
+            # Очередь у экскаватора не дает закончить рейс в смену
+            heapq.heappush(trucks, (free_at, number))
+            continue
+        site['_excavator_free'] = loaded
+        schedule = site['haul_schedule']
+        schedule['trips_done'] += 1
+        schedule['finish'] = back
+        if schedule['trips_done'] < site['haul']['trips']:
+            heapq.heappush(queue, (site['priority'], loaded - site['travel'], chosen[2]))
+        heapq.heappush(trucks, (back, number))
+
+    for site in sites:
+        site.pop('_excavator_free', None)
+        site['haul_schedule']['trips_left'] = site['haul']['trips'] - site['haul_schedule']['trips_done']
+    return sites
+
+
+def schedule_pours(sites: List[Dict], fleet: Dict) -> List[Dict]:
+    """Доставка бетона на несколько заливок общим парком миксеров
+
+    Очередь заливок по моменту, когда насосу нужен следующий миксер (при
+    равенстве - по приоритету объекта), и очередь миксеров по времени
+    освобождения. Миксер выезжает с завода так, чтобы прибыть к сроку.
+    """
+    mixers = [(0.0, number) for number in range(fleet['mixers'])]
+    heapq.heapify(mixers)
+    pump_rate = fleet['pump_rate']
+
+    queue = []
+    for index, site in enumerate(sites):
+        if site.get('pour'):
+            pour = site['pour']
+            # Заливка начинается, когда насос установлен и может доехать первый миксер
+            start = max(float(PUMP_SETUP_MINUTES), PLANT_MINUTES + site['travel'])
+            pour['schedule'] = {'start': start, 'finish': None,
+                                'pump_idle': 0.0, 'max_gap': 0.0, 'mixers': set()}
+            pour['_next'] = 0
+            queue.append((start, site['priority'], index))
+    heapq.heapify(queue)
+
+    while queue:
+        needed, priority, index = heapq.heappop(queue)
+        pour = sites[index]['pour']
+        travel = sites[index]['travel']
+        load = pour['loads'][pour['_next']]
+        free_at, number = heapq.heappop(mixers)
+
+        depart = max(free_at, needed - travel - PLANT_MINUTES)
+        arrival = depart + PLANT_MINUTES + travel
+        start = max(arrival, needed)
+        finish = start + load['volume'] / pump_rate * 60
+        heapq.heappush(mixers, (finish + travel, number))
+
+        schedule = pour['schedule']
+        gap = start - needed
+        schedule['pump_idle'] += gap
+        schedule['max_gap'] = max(schedule['max_gap'], gap)
+        schedule['finish'] = finish
+        schedule['mixers'].add(number)
+        pour['_next'] += 1
+        if pour['_next'] < len(pour['loads']):
+            heapq.heappush(queue, (finish, priority, index))
+
+    for site in sites:
+        pour = site.get('pour')
+        if pour:
+            del pour['_next']
+            schedule = pour['schedule']
+            schedule['mixers'] = len(schedule['mixers'])
+            schedule['overtime'] = schedule['finish'] > fleet['workday_minutes']
+    return sites
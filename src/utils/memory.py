@@ -0,0 +1,61 @@
+from typing import Dict, List
+import argparse
+import os
+
+# Поля /proc/<pid>/smaps_rollup, кБ
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Память процесса по smaps_rollup (Linux), кБ"""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if name in FIELDS:
+                memory[name] = int(value.split()[0])
+    return {
+        'rss': memory['Rss'],
+        'pss': memory['Pss'],
+        'shared': memory['Shared_Clean'] + memory['Shared_Dirty'],
+        'private': memory['Private_Clean'] + memory['Private_Dirty']
+    }
+
+
+def children(pid: int) -> List[int]:
+    """Дочерние процессы (воркеры gunicorn)"""
+    result = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as file:
+                    # Поле 4 - родитель; имя процесса в скобках может содержать пробелы
+                    parent = int(file.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if parent == pid:
+                result.append(int(entry))
+    return sorted(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Память мастер-процесса gunicorn и его воркеров")
+    parser.add_argument('pid', type=int, help="PID мастер-процесса")
+    args = parser.parse_args()
+
+    print(f"{'Процесс':<16}{'RSS, МБ':>10}{'PSS, МБ':>10}{'Общая, МБ':>12}{'Своя, МБ':>11}")
+    rows = [('мастер', args.pid)] + [(f'воркер {pid}', pid) for pid in children(args.pid)]
+    workers = []
+    for name, pid in rows:
+        memory = process_memory(pid)
+        if pid != args.pid:
+            workers.append(memory)
+        print(f"{name:<16}{memory['rss'] / 1024:>10.1f}{memory['pss'] / 1024:>10.1f}"
+              f"{memory['shared'] / 1024:>12.1f}{memory['private'] / 1024:>11.1f}")
+    if workers:
+        print(f"Среднее на воркер: RSS {sum(m['rss'] for m in workers) / len(workers) / 1024:.1f} МБ, "
+              f"своя память {sum(m['private'] for m in workers) / len(workers) / 1024:.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+from typing import Dict, List, Optional
+import csv
+import logging
+
+import numpy as np
+
+from .calculator import build_calculator
+from .catalog import utility_rates
+
+logger = logging.getLogger(__name__)
+
+HOURS = 8760  # Часов в году (без високосного дня)
+CHUNK_POOLS = 256  # Бассейнов за один проход (ограничивает память: бассейны x часы)
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_STARTS = np.cumsum((0,) + MONTH_DAYS[:-1]) * 24  # Первый час каждого месяца
+
+WATER_HEAT_CAPACITY = 4.186  # кДж/(кг·К)
+STEFAN_BOLTZMANN = 5.67e-8  # Вт/(м²·К⁴)
+EMISSIVITY = 0.95  # Излучательная способность воды
+SKY_DEPRESSION = 12.0  # Небо холоднее воздуха, °C
+SOLAR_ABSORPTANCE = 0.75  # Доля солнечной радиации, поглощаемая чашей
+SHELL_U = 0.5  # Теплопередача через стены и дно в грунт, Вт/(м²·К)
+WIND_FACTOR = 0.3  # Ветер у поверхности воды к метеорологическому (10 м)
+ACTIVITY_FACTOR = 0.5  # Поправка испарения для частного бассейна
+
+# Колонки CSV климата: температура воздуха (°C), влажность (%), ветер (м/с), радиация (Вт/м²)
+CLIMATE_COLUMNS = ('temperature', 'humidity', 'wind', 'solar')
+
+# Параметры эксплуатации по умолчанию
+OPERATION_DEFAULTS = {
+    'setpoint': 28.0,  # Температура воды, °C
+    'season': (5, 6, 7, 8, 9),  # Месяцы работы бассейна
+    'cover': False,  # Накрытие на ночь
+    'cover_hours': (20, 8),  # Накрытие с 20:00 до 08:00
+    'cop': 4.0,  # Коэффициент преобразования теплового насоса при 15°C
+    'ground_temperature': 10.0,  # Температура грунта и подпиточной воды, °C
+}
+
+# Доля потерь, остающаяся под накрытием
+COVER_FACTORS = {
+    'evaporation': 0.1,
+    'convection': 0.5,
+    'radiation': 0.5,
+    'solar': 0.3,
+}
+
+
+def load_climate(path: str) -> Dict[str, np.ndarray]:
+    """Почасовой климат из CSV (8760 строк, колонки CLIMATE_COLUMNS)"""
+    columns = {name: [] for name in CLIMATE_COLUMNS}
+    with open(path, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        missing = [name for name in CLIMATE_COLUMNS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"В файле климата нет колонок: {', '.join(missing)}")
+        for row in reader:
+            for name in CLIMATE_COLUMNS:
+                columns[name].append(float(row[name]))
+    climate = {name: np.array(values) for name, values in columns.items()}
+    if len(climate['temperature']) != HOURS:
+        raise ValueError(f"Файл климата должен содержать {HOURS} часов")
+    return climate
+
+
+def synthetic_climate(mean: float = 6.0, year_amplitude: float = 13.0,
+                      day_amplitude: float = 5.0, peak_solar: float = 850.0) -> Dict[str, np.ndarray]:
+    """Типовой год без файла климата (средняя полоса России)"""
+    hours = np.arange(HOURS)
+    day = hours // 24
+    hour = hours % 24
+    season = -np.cos(2 * np.pi * (day - 15) / 365)  # -1 в середине января, 1 в середине июля
+    daily = -np.cos(2 * np.pi * (hour - 3) / 24)  # минимум в 3:00, максимум в 15:00
+    daylight = np.clip(np.sin(np.pi * (hour - 6 + season * 2) / (12 + season * 4)), 0, None)
+    return {
+        'temperature': mean + year_amplitude * season + day_amplitude * daily,
+        'humidity': 75 - 15 * daily,
+        'wind': np.full(HOURS, 3.0),
+        'solar': peak_solar * (0.6 + 0.4 * season) * daylight,
+    }
+
+
+def _vapor_pressure(temperature: np.ndarray) -> np.ndarray:
+    """Давление насыщенного пара (формула Магнуса), кПа"""
+    return 0.6108 * np.exp(17.27 * temperature / (temperature + 237.3))
+
+
+def pool_geometry(params: Dict) -> Dict[str, float]:
+    """Зеркало воды, объем воды и площадь чаши по размерам PoolCalculator"""
+    calculator = build_calculator(params)
+    dimensions = calculator.dimensions
+    return {
+        'surface': dimensions.length * dimensions.width,
+        'volume': dimensions.length * dimensions.width * (dimensions.shallow_depth + dimensions.deep_depth) / 2,
+        'shell': calculator.areas.bottom + calculator.areas.walls
+    }
+
+
+def _simulate_chunk(surface: np.ndarray, volume: np.ndarray, shell: np.ndarray,
+                    climate: Dict[str, np.ndarray], config: Dict,
+                    operating: np.ndarray, covered: np.ndarray) -> Dict[str, np.ndarray]:
+    """Тепловой баланс части портфеля: матрицы бассейны x часы, кВт·ч"""
+    setpoint = config['setpoint']
+    air = climate['temperature'][None, :]
+    wind = climate['wind'][None, :] * WIND_FACTOR
+    area = surface[:, None]
+
+    # Испарение (формула Carrier), конвекция, излучение на небо, теплопередача в грунт, кВт
+    pressure_water = _vapor_pressure(np.array(setpoint))
+    pressure_air = _vapor_pressure(air) * climate['humidity'][None, :] / 100
+    evaporation = (area * (0.089 + 0.0782 * wind) * ACTIVITY_FACTOR *
+                   np.clip(pressure_water - pressure_air, 0, None))
+    convection = area * (3.1 + 4.1 * wind) * (setpoint - air) / 1000
+    radiation = area * EMISSIVITY * STEFAN_BOLTZMANN * (
+        (setpoint + 273.15) ** 4 - (air - SKY_DEPRESSION + 273.15) ** 4) / 1000
+    conduction = shell[:, None] * SHELL_U * (setpoint - config['ground_temperature']) / 1000
+    solar = area * SOLAR_ABSORPTANCE * climate['solar'][None, :] / 1000
+
+    cover = np.where(covered, 1.0, 0.0)[None, :]
+    evaporation = evaporation * (1 - cover * (1 - COVER_FACTORS['evaporation']))
+    convection = convection * (1 - cover * (1 - COVER_FACTORS['convection']))
+    radiation = radiation * (1 - cover * (1 - COVER_FACTORS['radiation']))
+    solar = solar * (1 - cover * (1 - COVER_FACTORS['solar']))
+
+    # Испаренная вода, м³/ч (теплота испарения 2430 кДж/кг), и нагрев подпитки
+    makeup = evaporation * 3600 / 2430 / 1000
+    makeup_heat = makeup * 1000 * WATER_HEAT_CAPACITY * (setpoint - config['ground_temperature']) / 3600
+
+    # Нагреватель держит уставку: избыток солнца не накапливается
+    heat = np.clip(evaporation + convection + radiation + conduction + makeup_heat - solar, 0, None)
+    heat = heat * operating[None, :]
+    makeup = makeup * operating[None, :]
+    cop = np.clip(config['cop'] + 0.1 * (air - 15), 1.5, None)
+    electricity = heat / cop
+
+    # Первичный нагрев чаши в начале сезона
+    warmup = volume * 1000 * WATER_HEAT_CAPACITY * max(setpoint - config['ground_temperature'], 0) / 3600
+    first_hour = int(np.argmax(operating)) if operating.any() else None
+    if first_hour is not None:
+        heat[:, first_hour] += warmup
+        electricity[:, first_hour] += warmup / cop[0, first_hour]
+
+    return {
+        'heat': np.add.reduceat(heat, MONTH_STARTS, axis=1),
+        'electricity': np.add.reduceat(electricity, MONTH_STARTS, axis=1),
+        'evaporation': np.add.reduceat(makeup, MONTH_STARTS, axis=1),
+    }
+
+
+def simulate_operation(designs: List[Dict], config: Optional[Dict] = None,
+                       climate: Optional[Dict[str, np.ndarray]] = None) -> List[Dict]:
+    """Годовые затраты на подогрев и подпитку воды для набора бассейнов
+
+    Почасовой баланс за год считается сразу по группе бассейнов (матрицы
+    бассейны x 8760 часов). config - OPERATION_DEFAULTS и тарифы
+    'electricity_price', 'water_price'; climate - из load_climate, по
+    умолчанию synthetic_climate.
+    """
+    config = {**OPERATION_DEFAULTS, **(config or {})}
+    climate = climate or synthetic_climate()
+    electricity_price = float(config.get('electricity_price', utility_rates['electricity']))
+    water_price = float(config.get('water_price', utility_rates['water']))
+    if not designs:
+        raise ValueError("Не задано ни одного бассейна")
+
+    hours = np.arange(HOURS)
+    month = np.searchsorted(MONTH_STARTS, hours, side='right')  # 1..12
+    operating = np.isin(month, list(config['season'])).astype(float)
+    start, end = config['cover_hours']
+    hour = hours % 24
+    night = (hour >= start) | (hour < end) if start > end else (hour >= start) & (hour < end)
+    covered = night if config['cover'] else np.zeros(HOURS, dtype=bool)
+
+    geometry = [pool_geometry(design) for design in designs]
+    results = []
+    for offset in range(0, len(geometry), CHUNK_POOLS):
+        chunk = geometry[offset:offset + CHUNK_POOLS]
+        monthly = _simulate_chunk(
+            np.array([pool['surface'] for pool in chunk]),
+            np.array([pool['volume'] for pool in chunk]),
+            np.array([pool['shell'] for pool in chunk]),
+            climate, config, operating, covered
+        )
+        for index, pool in enumerate(chunk):
+            electricity = float(monthly['electricity'][index].sum())
+            evaporation = float(monthly['evaporation'][index].sum())
+            results.append({
+                'surface': pool['surface'],
+                'volume': pool['volume'],
+                'heat': float(monthly['heat'][index].sum()),
+                'electricity': electricity,
+                'evaporation': evaporation,
+                'electricity_cost': electricity * electricity_price,
+                'water_cost': evaporation * water_price,
+                'total': electricity * electricity_price + evaporation * water_price,
+                'monthly': [{
+                    'month': number + 1,
+                    'heat': float(monthly['heat'][index, number]),
+                    'electricity': float(monthly['electricity'][index, number]),
+                    'evaporation': float(monthly['evaporation'][index, number])
+                } for number in range(12)]
+            })
+
+    logger.debug(f"Эксплуатация {len(results)} бассейнов: {sum(result['total'] for result in results):.0f} руб/год")
+    return results
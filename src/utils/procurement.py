@@ -0,0 +1,167 @@
+from collections import Counter
+from functools import reduce
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import math
+
+from .calculator import PoolCalculator, build_calculator
+from .catalog import TRUCK_PALLETS, materials_rates, pack_formats
+
+logger = logging.getLogger(__name__)
+
+SCALE = 1000  # Размеры упаковок переводятся в целые тысячные доли единицы
+
+
+def pack_order(quantity: float, sizes: Iterable[float]) -> Tuple[Dict[float, int], float]:
+    """Набор упаковок, покрывающий количество: сначала наименьший остаток, затем меньше упаковок
+
+    Возвращает {размер: количество упаковок} и заказанное количество.
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    units = [round(size * SCALE) for size in sizes]
+    step = reduce(math.gcd, units)
+    steps = [unit // step for unit in units]
+    target = math.ceil(quantity * SCALE / step - 1e-9)
+    if target <= 0:
+        return {}, 0
+
+    # В оптимальном наборе мелких упаковок меньше, чем шагов в крупной: большой заказ
+    # закрывается крупными, перебор - только по окну у конца заказа
+    largest = steps[0]
+    window = largest * largest
+    bulk = max(0, (target - window) // largest)
+    rest = target - bulk * largest
+
+    # Минимальное число упаковок для каждой суммы окна (неограниченный размен)
+    limit = rest + largest
+    packs: List[Optional[int]] = [0] + [None] * limit
+    choice = [0] * (limit + 1)
+    for amount in range(1, limit + 1):
+        for index, size in enumerate(steps):
+            if size <= amount and packs[amount - size] is not None:
+                count = packs[amount - size] + 1
+                if packs[amount] is None or count < packs[amount]:
+                    packs[amount] = count
+                    choice[amount] = index
+    amount = next(amount for amount in range(rest, limit + 1) if packs[amount] is not None)
+
+    counts = Counter({sizes[0]: bulk}) if bulk else Counter()
+    ordered = amount + bulk * largest
+    while amount:
+        counts[sizes[choice[amount]]] += 1
+        amount -= steps[choice[amount]]
+    return dict(counts), ordered * step / SCALE
+
+
+def round_materials(materials: Dict[str, float]) -> List[Dict]:
+    """Округление ведомости материалов до упаковок и паллет"""
+    lines = []
+    for key, quantity in materials.items():
+        rate = materials_rates.get(key, {})
+        line = {
+            'key': key,
+            'name': rate.get('name', key),
+            'unit': rate.get('unit', ''),
+            'quantity': quantity,
+            'packs': [],
+            'ordered': quantity,
+            'leftover': 0,
+            'pallets': 0,
+            'loose': 0
+        }
+        pack_format = pack_formats.get(key)
+        if pack_format:
+            packs, ordered = pack_order(quantity, pack_format['sizes'])
+            line['packs'] = [{'pack': pack_format['pack'], 'size': size, 'count': count}
+                             for size, count in sorted(packs.items(), reverse=True)]
+            line['ordered'] = ordered
+            line['leftover'] = ordered - quantity
+            if 'pallet' in pack_format:
+                # Полные паллеты и россыпь на последнем паллетоместе
+                pallet = pack_format['pallet']
+                line['pallets'] = int(ordered // pallet)
+                line['loose'] = ordered - line['pallets'] * pallet
+        lines.append(line)
+    return lines
+
+
+def _pack_count(line: Dict) -> int:
+    """Число упаковок в строке ведомости"""
+    return sum(pack['count'] for pack in line['packs'])
+
+
+def _leftover_cost(lines: List[Dict]) -> float:
+    """Стоимость остатков сверх потребности"""
+    return sum(line['leftover'] * materials_rates.get(line['key'], {}).get('price', 0) for line in lines)
+
+
+def _pallet_places(lines: List[Dict]) -> int:
+    """Паллетомест: полные паллеты плюс паллета под россыпь"""
+    return sum(line['pallets'] + (1 if line['loose'] > 1e-9 else 0) for line in lines)
+
+
+def read_projects(lines: Iterable) -> Iterator[Dict]:
+    """Проекты из JSON Lines построчно (пустые строки пропускаются)"""
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Строка {number}: некорректный JSON ({e.msg})")
+
+
+def consolidate_orders(projects: Iterable[Dict], calculator: Optional[PoolCalculator] = None) -> Dict:
+    """Сводный заказ по нескольким объектам с округлением до упаковок
+
+    Проекты обрабатываются по одному (подходит генератор): накапливаются только
+    суммы количеств и показатели раздельного заказа для сравнения.
+    """
+    calculator = calculator or PoolCalculator()
+    totals = Counter()
+    separate_packs = Counter()
+    separate_leftover = Counter()
+    separate = {'packs': 0, 'leftover_cost': 0.0, 'pallet_places': 0, 'trucks': 0}
+    projects_count = 0
+    for project in projects:
+        calculator = build_calculator(project, calculator)
+        materials = calculator.calculate_materials(project.get('pool_type', 'ceramic'),
+                                                   project.get('finish_type', 'ceramic'))
+        lines = round_materials(materials)
+        for line in lines:
+            separate_packs[line['key']] += _pack_count(line)
+            separate_leftover[line['key']] += line['leftover']
+        pallet_places = _pallet_places(lines)
+        separate['leftover_cost'] += _leftover_cost(lines)
+        separate['pallet_places'] += pallet_places
+        separate['trucks'] += math.ceil(pallet_places / TRUCK_PALLETS)
+        totals.update(materials)
+        projects_count += 1
+    if not projects_count:
+        raise ValueError("Не задано ни одного проекта")
+    separate['packs'] = sum(separate_packs.values())
+
+    lines = round_materials(dict(totals))
+    for line in lines:
+        line['separate_packs'] = separate_packs[line['key']]
+        line['separate_leftover'] = separate_leftover[line['key']]
+    pallet_places = _pallet_places(lines)
+    consolidated = {
+        'packs': sum(_pack_count(line) for line in lines),
+        'leftover_cost': _leftover_cost(lines),
+        'pallet_places': pallet_places,
+        'trucks': math.ceil(pallet_places / TRUCK_PALLETS)
+    }
+
+    logger.debug(f"Сводный заказ по {projects_count} объектам: {consolidated['packs']} упаковок "
+                 f"(раздельно {separate['packs']})")
+    return {
+        'projects': projects_count,
+        'materials': lines,
+        'consolidated': consolidated,
+        'separate': separate
+    }
@@ -0,0 +1,289 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+REBAR_DIAMETER = 0.012  # Арматура 12мм
+REBAR_WEIGHT = 0.888  # кг на м.п. для d12
+SPACING = 0.2  # Шаг стержней 20см
+COVER = 0.05  # Защитный слой 5см
+SHELL_THICKNESS = 0.25  # Толщина стен и дна чаши
+LAP_LENGTH = 40 * REBAR_DIAMETER  # Нахлест при стыковке 40d
+ANCHORAGE = 0.4  # Загиб в плиту и заводка на угол
+STOCK_LENGTHS = (11.7,)  # Длины хлыстов у поставщика, м
+CUT_STEP = 50  # Длины раскроя округляются вверх до 5см (мм)
+MAX_PATTERNS = 40_000  # Предел перебора карт раскроя в точном режиме
+EXACT_TIME_LIMIT = 2.0  # Предел времени точного режима целиком: перебор, LP и MILP, с
+MILP_COLUMNS = 8_000  # На больших моделях HiGHS проверяет предел времени слишком редко
+
+
+@dataclass
+class BarGroup:
+    """Группа одинаковых стержней каркаса"""
+    element: str  # Элемент чаши
+    length: float  # Длина стержня, м
+    count: int  # Количество
+
+
+def _levels(height: float) -> List[float]:
+    """Отметки горизонтальных стержней от верха стены"""
+    return [level * SPACING for level in range(int(height / SPACING) + 1)]
+
+
+def bar_schedule(dimensions) -> List[BarGroup]:
+    """Спецификация стержней двойного каркаса по размерам чаши (PoolDimensions)"""
+    groups: List[BarGroup] = []
+    shallow = dimensions.shallow_depth
+    deep = dimensions.deep_depth
+
+    # Дно: плита под стенами, нижняя и верхняя сетки
+    slab_length = dimensions.length + 2 * (SHELL_THICKNESS - COVER)
+    slab_width = dimensions.width + 2 * (SHELL_THICKNESS - COVER)
+    for layer in ('нижняя', 'верхняя'):
+        groups.append(BarGroup(f'Дно, {layer} сетка, вдоль', slab_length,
+                               int(slab_width / SPACING) + 1))
+        groups.append(BarGroup(f'Дно, {layer} сетка, поперек', slab_width,
+                               int(slab_length / SPACING) + 1))
+
+    # Стены: внутренний и наружный ряды
+    for layer, offset in (('внутр.', COVER), ('наруж.', SHELL_THICKNESS - COVER)):
+        length = dimensions.length + 2 * offset
+        width = dimensions.width + 2 * offset
+
+        # Продольные стены (2 шт): высота меняется от мелкой части к глубокой
+        vertical = Counter()
+        for position in range(int(length / SPACING) + 1):
+            x = position * SPACING / length
+            vertical[round(shallow + (deep - shallow) * x + ANCHORAGE, 3)] += 2
+        for bar_length, count in sorted(vertical.items()):
+            groups.append(BarGroup(f'Продольные стены, {layer}, вертикаль', bar_length, count))
+
+        horizontal = Counter()
+        for level in _levels(deep):
+            if level <= shallow or deep == shallow:
+                span = length
+            else:
+                span = length * (deep - level) / (deep - shallow)
+            horizontal[round(span + 2 * ANCHORAGE, 3)] += 2
+        for bar_length, count in sorted(horizontal.items()):
+            groups.append(BarGroup(f'Продольные стены, {layer}, горизонталь', bar_length, count))
+
+        # Торцевые стены: мелкая и глубокая
+        for name, height in (('мелкая', shallow), ('глубокая', deep)):
+            groups.append(BarGroup(f'Торцевая стена ({name}), {layer}, вертикаль',
+                                   height + ANCHORAGE, int(width / SPACING) + 1))
+            groups.append(BarGroup(f'Торцевая стена ({name}), {layer}, горизонталь',
+                                   width + 2 * ANCHORAGE, len(_levels(height))))
+
+    return groups
+
+
+def split_bar(length: int, stock: int, lap: int) -> List[int]:
+    """Деление стержня длиннее хлыста на куски с нахлестом (мм)"""
+    if length <= stock:
+        return [length]
+    pieces_count = math.ceil((length - lap) / (stock - lap))
+    last = length - (pieces_count - 1) * (stock - lap)
+    return [stock] * (pieces_count - 1) + [last]
+
+
+def best_fit_decreasing(pieces: List[int], stock: int, kerf: int) -> List[Tuple[int, ...]]:
+    """Раскрой методом «лучший подходящий по убыванию» (мм)"""
+    bins: List[List[int]] = []
+    free: List[Tuple[int, int]] = []  # (остаток, номер хлыста) по возрастанию остатка
+    for piece in sorted(pieces, reverse=True):
+        index = bisect_left(free, (piece, -1))
+        if index < len(free):
+            remainder, number = free.pop(index)
+        else:
+            number = len(bins)
+            bins.append([])
+            remainder = stock
+        bins[number].append(piece)
+        remainder -= piece + kerf
+        if remainder > 0:
+            insort(free, (remainder, number))
+    return [tuple(pieces) for pieces in bins]
+
+
+def _enumerate_patterns(sizes: List[int], caps: List[int], capacity: int,
+                        deadline: float) -> Optional[List[Tuple[int, ...]]]:
+    """Все максимальные карты раскроя одного хлыста
+
+    None при превышении MAX_PATTERNS или по истечении срока deadline (time.monotonic).
+    """
+    patterns: List[Tuple[int, ...]] = []
+    counts = [0] * len(sizes)
+    calls = [0]
+
+    def walk(index: int, remaining: int) -> bool:
+        if len(patterns) > MAX_PATTERNS:
+            return False
+        calls[0] += 1
+        if not calls[0] % 4096 and time.monotonic() > deadline:
+            return False
+        if index == len(sizes):
+            # Максимальная карта: ни один недобранный размер уже не помещается
+            if any(counts) and all(counts[i] >= caps[i] or sizes[i] > remaining
+                                   for i in range(len(sizes))):
+                patterns.append(tuple(counts))
+            return True
+        for count in range(min(caps[index], remaining // sizes[index]), -1, -1):
+            counts[index] = count
+            if not walk(index + 1, remaining - count * sizes[index]):
+                return False
+        counts[index] = 0
+        return True
+
+    return patterns if walk(0, capacity) else None
+
+
+def _cut_exact(demand: Dict[int, int], stock_lengths: Sequence[int],
+               kerf: int) -> Optional[Tuple[List[Tuple[int, ...]], bool]]:
+    """Раскрой линейным и целочисленным программированием (нужен scipy)
+
+    Решение LP-релаксации по всем картам раскроя округляется вниз, остаток
+    раскраивается эвристикой. Если это не совпало с нижней оценкой LP, запускается
+    MILP (не больше MILP_COLUMNS карт). Весь расчет укладывается в EXACT_TIME_LIMIT: если перебор карт или
+    LP не успели, возвращается None и используется эвристика. Возвращает карты
+    раскроя и признак доказанной оптимальности.
+    """
+    try:
+        import numpy as np
+        from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+    except ImportError:
+        logger.warning("Точный раскрой недоступен без scipy, используется эвристика")
+        return None
+    deadline = time.monotonic() + EXACT_TIME_LIMIT
+
+    lengths = sorted(demand, reverse=True)
+    sizes = [length + kerf for length in lengths]
+    caps = [demand[length] for length in lengths]
+
+    stocks: List[int] = []
+    columns: List[Tuple[int, ...]] = []
+    for stock in stock_lengths:
+        patterns = _enumerate_patterns(sizes, caps, stock + kerf, deadline)
+        if patterns is None:
+            logger.warning("Слишком много карт раскроя для точного режима, используется эвристика")
+            return None
+        stocks.extend([stock] * len(patterns))
+        columns.extend(patterns)
+
+    costs = np.array(stocks, dtype=float)
+    matrix = np.array(columns, dtype=float).T
+    required = np.array(caps, dtype=float)
+
+    def expand(quantities) -> List[Tuple[int, ...]]:
+        bins: List[Tuple[int, ...]] = []
+        for column, quantity in enumerate(quantities):
+            pieces = tuple(length for length, count in zip(lengths, columns[column]) for _ in range(count))
+            bins.extend([pieces] * int(quantity))
+        return bins
+
+    # LP-релаксация: нижняя оценка и основа решения
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        logger.warning("Не хватило времени на точный раскрой, используется эвристика")
+        return None
+    relaxed = linprog(costs, A_ub=-matrix, b_ub=-required, bounds=(0, None), method='highs',
+                      options={'time_limit': remaining})
+    if not relaxed.success:
+        logger.warning(f"LP-релаксация раскроя не решена: {relaxed.message}")
+        return None
+    quantities = np.floor(relaxed.x + 1e-9)
+    residual = np.maximum(required - matrix @ quantities, 0).astype(int)
+    pieces = [length for length, count in zip(lengths, residual) for _ in range(count)]
+    bins = expand(quantities) + best_fit_decreasing(pieces, max(stock_lengths), kerf)
+    ordered = sum(_fit_stock(cuts, stock_lengths, kerf) for cuts in bins)
+
+    # Нижняя оценка: для одной длины хлыста - целое число хлыстов
+    bound = relaxed.fun
+    if len(stock_lengths) == 1:
+        bound = math.ceil(relaxed.fun / stock_lengths[0] - 1e-9) * stock_lengths[0]
+    if ordered <= bound + 1e-6:
+        return bins, True
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or len(columns) > MILP_COLUMNS:
+        # Округленное решение LP допустимо, но оптимальность не доказана
+        return bins, False
+    result = milp(
+        c=costs,
+        constraints=LinearConstraint(matrix, lb=required, ub=np.inf),
+        integrality=np.ones(len(columns)),
+        bounds=Bounds(0, np.inf),
+        options={'time_limit': remaining}
+    )
+    if result.x is not None and result.fun < ordered - 1e-6:
+        return expand(np.round(result.x)), result.success
+    # MILP не нашел лучшего: решение оптимально, если MILP доказал оптимум
+    return bins, result.success
+
+
+def _fit_stock(cuts: Tuple[int, ...], stock_lengths: Sequence[int], kerf: int) -> int:
+    """Минимальная длина хлыста, из которой выходит карта раскроя (мм)"""
+    used = sum(cuts) + kerf * (len(cuts) - 1)
+    return min(length for length in stock_lengths if length >= used)
+
+
+def plan_reinforcement(dimensions, stock_lengths: Sequence[float] = STOCK_LENGTHS,
+                       exact: bool = False, kerf_mm: int = 0) -> Dict:
+    """Ведомость стержней и раскрой хлыстов для двойного каркаса чаши"""
+    if not stock_lengths:
+        raise ValueError("Не заданы длины хлыстов")
+    stocks = sorted(round(length * 1000) for length in stock_lengths)
+    lap = round(LAP_LENGTH * 1000)
+    if stocks[-1] <= lap:
+        raise ValueError("Длина хлыста должна быть больше нахлеста")
+
+    groups = bar_schedule(dimensions)
+
+    # Куски для раскроя (мм), длинные стержни стыкуются внахлест
+    pieces: List[int] = []
+    for group in groups:
+        length = math.ceil(group.length * 1000 / CUT_STEP) * CUT_STEP
+        pieces.extend(split_bar(length, stocks[-1], lap) * group.count)
+
+    solution = _cut_exact(Counter(pieces), stocks, kerf_mm) if exact else None
+    if solution is not None:
+        bins, optimal = solution
+        method = 'exact' if optimal else 'exact_unproven'
+    else:
+        bins = best_fit_decreasing(pieces, stocks[-1], kerf_mm)
+        method = 'heuristic'
+
+    # Каждый хлыст берем минимальной подходящей длины
+    patterns = Counter()
+    for cuts in bins:
+        patterns[(_fit_stock(cuts, stocks, kerf_mm), cuts)] += 1
+
+    order = Counter()
+    for (stock, _), count in patterns.items():
+        order[stock] += count
+
+    required = sum(group.length * group.count for group in groups)
+    ordered = sum(stock * count for stock, count in order.items()) / 1000
+    offcut = sum((stock - sum(cuts)) * count for (stock, cuts), count in patterns.items()) / 1000
+
+    logger.debug(f"Раскрой арматуры ({method}): {sum(order.values())} хлыстов, обрезки {offcut:.2f} м")
+    return {
+        'method': method,
+        'bars': [{'element': group.element, 'length': group.length, 'count': group.count}
+                 for group in groups],
+        'order': [{'stock_length': stock / 1000, 'count': count}
+                  for stock, count in sorted(order.items())],
+        'patterns': [{'stock_length': stock / 1000, 'cuts': [cut / 1000 for cut in cuts],
+                      'count': count, 'offcut': (stock - sum(cuts)) / 1000}
+                     for (stock, cuts), count in patterns.most_common()],
+        'required_length': required,
+        'ordered_length': ordered,
+        'offcut_length': offcut,
+        'waste_percent': offcut / ordered * 100 if ordered else 0,
+        'weight': ordered * REBAR_WEIGHT
+    }
@@ -0,0 +1,234 @@
+from datetime import datetime
+from itertools import chain, islice
+from typing import Dict, IO, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape
+import logging
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (BaseDocTemplate, Frame, PageBreak, PageTemplate, Paragraph, Spacer, Table,
+                                TableStyle)
+
+from .bulk import estimate_row
+from .calculator import PoolCalculator
+from .drawing import drawing_params, font_paths, plan_scene, pool_drawing, section_scene
+
+logger = logging.getLogger(__name__)
+
+MAX_DESIGNS = 200  # Проектов в одном комплекте
+
+POOL_TYPE_NAMES = {'liner': 'Лайнер', 'ceramic': 'Керамогранит'}
+FINISH_TYPE_NAMES = {'ceramic': 'керамогранит', 'mosaic': 'мозаика'}
+
+# Ширины колонок задаются заранее: Table не измеряет каждую ячейку
+PAGE_WIDTH = A4[0] - 30 * mm
+SUMMARY_WIDTHS = [0.06, 0.26, 0.2, 0.16, 0.1, 0.1, 0.12]
+LINES_WIDTHS = [0.46, 0.1, 0.12, 0.14, 0.18]
+PARAMS_WIDTHS = [0.4, 0.6]
+
+
+class ReportTemplates:
+    """Шрифты, стили абзацев и стили таблиц, общие для всех смет комплекта
+
+    Создаются один раз на процесс (templates()): регистрация TTF-шрифта и
+    сборка стилей не повторяются для каждой сметы.
+    """
+    def __init__(self):
+        self.font, self.bold = self._register_fonts()
+        self.title = ParagraphStyle('title', fontName=self.bold, fontSize=16, leading=20, spaceAfter=6)
+        self.heading = ParagraphStyle('heading', fontName=self.bold, fontSize=13, leading=16,
+                                      spaceBefore=8, spaceAfter=4)
+        self.normal = ParagraphStyle('normal', fontName=self.font, fontSize=9, leading=11)
+        self.total = ParagraphStyle('total', fontName=self.bold, fontSize=11, leading=14, spaceBefore=4)
+        grid = [
+            ('FONTNAME', (0, 0), (-1, -1), self.font),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]
+        header = [
+            ('FONTNAME', (0, 0), (-1, 0), self.bold),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ]
+        self.params_style = TableStyle(grid)
+        self.lines_style = TableStyle(grid + header + [('ALIGN', (2, 1), (-1, -1), 'RIGHT')])
+        self.summary_style = TableStyle(grid + header + [('ALIGN', (4, 1), (-1, -1), 'RIGHT')])
+
+    @staticmethod
+    def _register_fonts():
+        """Зарегистрировать шрифт с кириллицей; без него - встроенный Helvetica"""
+        paths = font_paths()
+        if paths is None:
+            logger.warning("Шрифт с кириллицей не найден, задайте PDF_FONT_DIR")
+            return 'Helvetica', 'Helvetica-Bold'
+        pdfmetrics.registerFont(TTFont('PoolSans', paths[0]))
+        pdfmetrics.registerFont(TTFont('PoolSans-Bold', paths[1]))
+        return 'PoolSans', 'PoolSans-Bold'
+
+
+_templates: Optional[ReportTemplates] = None
+_templates_lock = threading.Lock()
+
+
+def templates() -> ReportTemplates:
+    global _templates
+    with _templates_lock:
+        if _templates is None:
+            _templates = ReportTemplates()
+    return _templates
+
+
+def _money(value: float) -> str:
+    return f"{value:,.0f}".replace(',', ' ')
+
+
+def _design_title(number: int, estimate: Dict) -> str:
+    return escape(str(estimate['name'])) or f"Вариант {number}"
+
+
+def summary_table(estimates: List[Dict], t: ReportTemplates) -> Table:
+    """Сводная таблица сравнения вариантов"""
+    rows = [['№', 'Вариант', 'Размеры, м', 'Тип', 'Материалы', 'Работы', 'Итого, руб']]
+    for number, estimate in enumerate(estimates, start=1):
+        if estimate['error']:
+            rows.append([number, Paragraph(_design_title(number, estimate), t.normal),
+                         Paragraph(escape(estimate['error']), t.normal), '', '', '', ''])
+            continue
+        rows.append([
+            number,
+            Paragraph(_design_title(number, estimate), t.normal),
+            f"{estimate['length'] / 1000:.1f}×{estimate['width'] / 1000:.1f}×"
+            f"{estimate['shallow_depth'] / 1000:.1f}–{estimate['deep_depth'] / 1000:.1f}",
+            f"{POOL_TYPE_NAMES[estimate['pool_type']]}"
+            + (f", {FINISH_TYPE_NAMES[estimate['finish_type']]}" if estimate['pool_type'] == 'ceramic' else ''),
+            _money(estimate['materials_total']),
+            _money(estimate['works_total']),
+            _money(estimate['total'])
+        ])
+    valid = [estimate for estimate in estimates if not estimate['error']]
+    if len(valid) > 1:
+        cheapest = min(valid, key=lambda estimate: estimate['total'])
+        rows.append(['', 'Минимальная стоимость', '', '', '', '', _money(cheapest['total'])])
+    widths = [PAGE_WIDTH * share for share in SUMMARY_WIDTHS]
+    table = Table(rows, colWidths=widths, style=t.summary_style, repeatRows=1)
+    if len(valid) > 1:
+        table.setStyle([('FONTNAME', (0, -1), (-1, -1), t.bold)])
+    return table
+
+
+def _lines_table(lines: List[Dict], t: ReportTemplates) -> Table:
+    rows = [['Наименование', 'Ед.изм.', 'Кол-во', 'Цена', 'Сумма']]
+    for line in lines:
+        # Наименования каталога короткие: простой текст без переноса строк быстрее Paragraph
+        rows.append([line['name'], line['unit'], f"{line['quantity']:.2f}",
+                     _money(line['price']), _money(line['total'])])
+    widths = [PAGE_WIDTH * share for share in LINES_WIDTHS]
+    return Table(rows, colWidths=widths, style=t.lines_style, repeatRows=1)
+
+
+def estimate_flowables(number: int, estimate: Dict, t: ReportTemplates) -> List:
+    """Страницы одной сметы: параметры, материалы, работы, итоги"""
+    elements: List = [PageBreak(), Paragraph(f"{number}. {_design_title(number, estimate)}", t.title)]
+    if estimate['error']:
+        elements.append(Paragraph(f"Ошибка расчета: {escape(estimate['error'])}", t.normal))
+        return elements
+    params = [
+        ['Длина, мм', f"{estimate['length']:.0f}"],
+        ['Ширина, мм', f"{estimate['width']:.0f}"],
+        ['Глубина мелкой части, мм', f"{estimate['shallow_depth']:.0f}"],
+        ['Глубина глубокой части, мм', f"{estimate['deep_depth']:.0f}"],
+        ['Ступени', str(estimate['steps_count'])],
+        ['Тип бассейна', POOL_TYPE_NAMES[estimate['pool_type']]],
+        ['Бетон М300, м³', f"{estimate['concrete_300']:.2f}"],
+        ['Котлован, м³', f"{estimate['pit']:.2f}"],
+    ]
+    elements.append(Table(params, colWidths=[PAGE_WIDTH * share for share in PARAMS_WIDTHS],
+                          style=t.params_style, hAlign='LEFT'))
+    # План и разрез рядом
+    drawing_width = PAGE_WIDTH / 2 - 2 * mm
+    try:
+        geometry = drawing_params(estimate)
+    except ValueError as e:
+        # Размеры вне пределов чертежа: смета выводится без него
+        logger.debug(f"Чертеж не построен: {str(e)}")
+        geometry = None
+    if geometry:
+        elements.append(Table([[pool_drawing(scene(geometry), drawing_width, t.font)
+                                for scene in (plan_scene, section_scene)]],
+                              colWidths=[PAGE_WIDTH / 2] * 2, style=[('VALIGN', (0, 0), (-1, -1), 'MIDDLE')]))
+    elements.append(Paragraph("Материалы", t.heading))
+    elements.append(_lines_table(estimate['materials'], t))
+    elements.append(Paragraph("Работы", t.heading))
+    elements.append(_lines_table(estimate['works'], t))
+    elements.append(Paragraph(f"Итого материалы: {_money(estimate['materials_total'])} руб", t.total))
+    elements.append(Paragraph(f"Итого работы: {_money(estimate['works_total'])} руб", t.total))
+    elements.append(Paragraph(f"ВСЕГО: {_money(estimate['total'])} руб", t.title))
+    return elements
+
+
+class BundleDocTemplate(BaseDocTemplate):
+    """Документ, сверстанный по частям
+
+    build_parts берет следующую часть (страницы одной сметы) только когда
+    предыдущая уже размещена на страницах: таблицы и чертежи сметы
+    освобождаются сразу после верстки, а не живут до конца документа.
+    """
+    def build_parts(self, parts: Iterator[List]) -> None:
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='page', frames=frame, pagesize=self.pagesize)])
+        self._startBuild()
+        canv = self.canv
+        canv._doctemplate = self
+        try:
+            for part in parts:
+                flowables = list(part)
+                while flowables:
+                    self.clean_hanging()
+                    # Элемент снимается с начала списка, остаток разбиения вставляется обратно
+                    self.handle_flowable(flowables)
+        finally:
+            del canv._doctemplate
+        self._endBuild()
+
+
+def render_bundle(designs: Iterable[Dict], file: IO, calculator: Optional[PoolCalculator] = None) -> Dict:
+    """Комплект смет в одном PDF: сводная таблица, затем сметы по вариантам
+
+    designs - параметры как в /calculate, с необязательным 'name'.
+    Сметы считаются одним калькулятором, шрифты и стили общие. Итоги нужны
+    сводной таблице заранее, а страницы каждой сметы строятся и верстаются
+    по очереди (BundleDocTemplate).
+    """
+    # Число проектов проверяется до расчета смет
+    designs = list(islice(designs, MAX_DESIGNS + 1))
+    if not designs:
+        raise ValueError("Не задано ни одного проекта")
+    if len(designs) > MAX_DESIGNS:
+        raise ValueError(f"В комплекте не больше {MAX_DESIGNS} проектов")
+    calculator = calculator or PoolCalculator()
+    estimates = [estimate_row(number, design, calculator)
+                 for number, design in enumerate(designs, start=1)]
+
+    t = templates()
+    header = [
+        Paragraph("Сравнение вариантов бассейна", t.title),
+        Paragraph(f"Дата: {datetime.now().strftime('%d.%m.%Y')}", t.normal),
+        Spacer(1, 4 * mm),
+        summary_table(estimates, t),
+    ]
+    parts = (estimate_flowables(number, estimate, t) for number, estimate in enumerate(estimates, start=1))
+    doc = BundleDocTemplate(file, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm,
+                            topMargin=15 * mm, bottomMargin=15 * mm,
+                            title="Сравнение вариантов бассейна")
+    doc.build_parts(chain([header], parts))
+    errors = sum(1 for estimate in estimates if estimate['error'])
+    logger.debug(f"Комплект смет: {len(estimates)} вариантов, {doc.page} страниц, с ошибками {errors}")
+    return {'designs': len(estimates), 'pages': doc.page, 'errors': errors}
@@ -0,0 +1,113 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+import logging
+import math
+
+from .catalog import roll_formats
+from .reinforcement import best_fit_decreasing, split_bar
+from .tiling import surfaces
+
+logger = logging.getLogger(__name__)
+
+# Варианты укладки полос: вдоль длины поверхности или поперек
+ORIENTATIONS = ('along', 'across')
+
+
+def _bands(span: int, width: int, overlap: int) -> List[Tuple[int, int]]:
+    """Полосы ширины width с нахлестом, покрывающие отрезок span: (начало, конец)"""
+    if span <= width:
+        return [(0, span)]
+    count = math.ceil((span - overlap) / (width - overlap))
+    return [(index * (width - overlap), min(index * (width - overlap) + width, span))
+            for index in range(count)]
+
+
+def strip_lengths(length: int, start_height: int, end_height: int, orientation: str,
+                  width: int, overlap: int) -> List[int]:
+    """Длины полос для поверхности-трапеции (мм), с нахлестом на соседние поверхности"""
+    low = min(start_height, end_height)
+    high = max(start_height, end_height)
+
+    def height_at(x: float) -> float:
+        return start_height + (end_height - start_height) * x / length
+
+    if orientation == 'along':
+        # Полосы идут вдоль длины, длина полосы - ширина поверхности на верхней кромке полосы
+        strips = []
+        for top, _ in _bands(high, width, overlap):
+            span = length if top <= low else length * (high - top) / (high - low)
+            strips.append(math.ceil(span) + 2 * overlap)
+        return strips
+
+    # Полосы идут поперек, длина полосы - наибольшая высота в пределах полосы
+    return [math.ceil(max(height_at(start), height_at(end))) + 2 * overlap
+            for start, end in _bands(length, width, overlap)]
+
+
+def _plan(strips: List[Tuple[str, int]], roll_length: int, overlap: int) -> Dict:
+    """Раскрой полос по рулонам"""
+    pieces = []
+    for _, strip in strips:
+        pieces.extend(split_bar(strip, roll_length, overlap))
+    rolls = best_fit_decreasing(pieces, roll_length, 0)
+    return {'rolls': rolls, 'strip_length': sum(pieces)}
+
+
+def plan_rolls(dimensions, material: str) -> Dict:
+    """План укладки рулонного материала по дну, стенам и ступеням"""
+    if material not in roll_formats:
+        raise ValueError(f"Нет формата рулона для материала: {material}")
+    roll = roll_formats[material]
+    width = round(roll['width'] * 1000)
+    roll_length = round(roll['length'] * 1000)
+    overlap = round(roll['overlap'] * 1000)
+
+    pool_surfaces = surfaces(dimensions)
+
+    # Полосы для каждой поверхности в обеих ориентациях
+    options = {}
+    for name, count, length, start_height, end_height in pool_surfaces:
+        for orientation in ORIENTATIONS:
+            strips = strip_lengths(length, start_height, end_height, orientation, width, overlap)
+            options[(name, orientation)] = [(name, strip) for strip in strips] * count
+
+    # Кандидаты: все поверхности в одной ориентации или у каждой своя с меньшим расходом
+    candidates = {orientation: {name: orientation for name, *_ in pool_surfaces}
+                  for orientation in ORIENTATIONS}
+    candidates['mixed'] = {
+        name: min(ORIENTATIONS, key=lambda orientation: sum(strip for _, strip in options[(name, orientation)]))
+        for name, *_ in pool_surfaces
+    }
+
+    best = None
+    for label, choice in candidates.items():
+        strips = [strip for name, orientation in choice.items() for strip in options[(name, orientation)]]
+        plan = _plan(strips, roll_length, overlap)
+        key = (len(plan['rolls']), plan['strip_length'])
+        if best is None or key < best[0]:
+            best = (key, label, choice, strips, plan)
+    _, label, choice, strips, plan = best
+
+    strip_counts = Counter(strips)
+    cut_list = Counter(plan['rolls'])
+    rolls_count = len(plan['rolls'])
+    area = sum(count * length * (start_height + end_height) / 2
+               for _, count, length, start_height, end_height in pool_surfaces) / 1_000_000
+    purchased = rolls_count * roll['width'] * roll['length']
+    logger.debug(f"Раскрой {material}: {rolls_count} рулонов ({label})")
+    return {
+        'material': material,
+        'roll_width': roll['width'],
+        'roll_length': roll['length'],
+        'orientation': label,
+        'surfaces': choice,
+        'rolls': rolls_count,
+        'strips': [{'surface': name, 'length': strip / 1000, 'count': count}
+                   for (name, strip), count in sorted(strip_counts.items())],
+        'cut_list': [{'cuts': [cut / 1000 for cut in cuts], 'count': count,
+                      'remainder': (roll_length - sum(cuts)) / 1000}
+                     for cuts, count in cut_list.most_common()],
+        'surface_area': area,
+        'purchased_area': purchased,
+        'waste_percent': (purchased / area - 1) * 100 if area else 0
+    }
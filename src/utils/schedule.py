@@ -0,0 +1,191 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import math
+
+from .calculator import PoolCalculator, build_calculator
+from .catalog import works_productivity
+
+logger = logging.getLogger(__name__)
+
+DURATION_STEP = 0.5  # Длительности округляются вверх до полусмены, дни
+
+# Предшественники работ: работа -> [(предшественник, технологический перерыв в днях)].
+# Отсутствующие в смете предшественники (например, ступени) пропускаются
+WORK_PRECEDENCE = {
+    'Нивелировка и привязка к территории': [('Разметка бассейна для техники', 0)],
+    'Выемка грунта под чашу бассейна': [('Нивелировка и привязка к территории', 0)],
+    'Вывоз грунта': [('Нивелировка и привязка к территории', 0)],  # идет вместе с выемкой
+    'Доработка грунта вручную': [('Выемка грунта под чашу бассейна', 0)],
+    'Отсыпка щебнем 10см': [('Доработка грунта вручную', 0)],
+    'Устройство контура заземления': [('Доработка грунта вручную', 0)],
+    'Бетонирование подбетонки': [('Отсыпка щебнем 10см', 0), ('Устройство контура заземления', 0)],
+    'Монтаж опалубки и армирование': [('Бетонирование подбетонки', 2)],
+    'Бетонирование чаши': [('Монтаж опалубки и армирование', 0)],
+    'Изготовление ступеней': [('Бетонирование чаши', 3)],
+    'Обратная отсыпка глиной': [('Бетонирование чаши', 7)],
+    'Грунтовка под штукатурку': [('Бетонирование чаши', 14), ('Изготовление ступеней', 7)],
+    'Нанесение клея под гребенку': [('Грунтовка под штукатурку', 1)],
+    'Штукатурка': [('Нанесение клея под гребенку', 1)],
+    'Грунтовка борта и ступеней': [('Штукатурка', 1)],
+}
+
+# Бригады по умолчанию: название -> количество
+DEFAULT_CREWS = {
+    'Геодезисты': 1,
+    'Экскаватор': 1,
+    'Разнорабочие': 2,
+    'Электрики': 1,
+    'Бетонщики': 2,
+    'Отделочники': 2,
+}
+
+
+def work_duration(name: str, quantity: float) -> float:
+    """Длительность работы одной бригадой, дни"""
+    if name not in works_productivity:
+        raise ValueError(f"Нет выработки для работы: {name}")
+    days = quantity / works_productivity[name]['rate']
+    return max(DURATION_STEP, math.ceil(days / DURATION_STEP - 1e-9) * DURATION_STEP)
+
+
+def project_tasks(works: List[Dict]) -> List[Dict]:
+    """Задачи проекта из calculate_works: длительность, бригада, предшественники"""
+    names = {work['name'] for work in works}
+    tasks = []
+    for work in works:
+        name = work['name']
+        tasks.append({
+            'work': name,
+            'crew': works_productivity.get(name, {}).get('crew'),
+            'duration': work_duration(name, work['quantity']),
+            'after': [(before, lag) for before, lag in WORK_PRECEDENCE.get(name, ()) if before in names]
+        })
+    return tasks
+
+
+def _tails(tasks: List[Dict]) -> List[float]:
+    """Длина критического пути от начала каждой задачи до конца проекта"""
+    index = {task['work']: number for number, task in enumerate(tasks)}
+    successors: List[List[Tuple[int, float]]] = [[] for _ in tasks]
+    for number, task in enumerate(tasks):
+        for before, lag in task['after']:
+            successors[index[before]].append((number, lag))
+
+    tails: List[Optional[float]] = [None] * len(tasks)
+
+    def tail(number: int) -> float:
+        if tails[number] is None:
+            tails[number] = tasks[number]['duration'] + max(
+                (lag + tail(successor) for successor, lag in successors[number]), default=0)
+        return tails[number]
+
+    return [tail(number) for number in range(len(tasks))]
+
+
+def schedule_projects(projects: Iterable[Dict], crews: Optional[Dict[str, int]] = None,
+                      calculator: Optional[PoolCalculator] = None) -> Dict:
+    """График работ по всем активным проектам с ограничением по бригадам
+
+    Событийная модель: очередь событий (освобождение бригады, готовность
+    задачи) и очереди готовых задач по бригадам. Свободная бригада берет
+    готовую задачу с наименьшим приоритетом проекта, а при равенстве - с
+    наибольшим остатком критического пути. Проект - параметры бассейна и
+    поля 'name', 'priority' (меньше - раньше) и 'start' (день начала).
+    """
+    crews = {**DEFAULT_CREWS, **(crews or {})}
+    calculator = calculator or PoolCalculator()
+
+    projects_list = []
+    tasks: List[Dict] = []
+    for number, project in enumerate(projects):
+        calculator = build_calculator(project, calculator)
+        project_list = project_tasks(calculator.calculate_works())
+        offset = len(tasks)
+        index = {task['work']: offset + position for position, task in enumerate(project_list)}
+        priority = int(project.get('priority', 0))
+        for task, tail in zip(project_list, _tails(project_list)):
+            task.update({
+                'project': number,
+                'key': (priority, -tail, number, index[task['work']]),
+                'release': float(project.get('start', 0)),
+                'waiting': len(task['after']),
+                'successors': []
+            })
+            tasks.append(task)
+        for task in project_list:
+            for before, lag in task['after']:
+                tasks[index[before]]['successors'].append((index[task['work']], lag))
+        projects_list.append({'name': project.get('name', f'Проект {number + 1}'), 'priority': priority})
+    if not tasks:
+        raise ValueError("Не задано ни одного проекта")
+
+    missing = {task['crew'] for task in tasks if task['crew'] is not None and crews.get(task['crew'], 0) <= 0}
+    if missing:
+        raise ValueError(f"Нет бригад: {', '.join(sorted(missing))}")
+
+    # События: (время, вид, номер задачи); освобождение бригады (0) раньше готовности (1)
+    events = [(task['release'], 1, number) for number, task in enumerate(tasks) if not task['waiting']]
+    heapq.heapify(events)
+    free = dict(crews)
+    ready: Dict[str, list] = {crew: [] for crew in crews}
+    busy = {crew: 0.0 for crew in crews}
+
+    def finish(number: int, time: float) -> None:
+        """Запланировать окончание задачи и готовность последователей"""
+        for successor, lag in tasks[number]['successors']:
+            task = tasks[successor]
+            task['release'] = max(task['release'], time + lag)
+            task['waiting'] -= 1
+            if not task['waiting']:
+                heapq.heappush(events, (task['release'], 1, successor))
+
+    while events:
+        now = events[0][0]
+        while events and events[0][0] == now:
+            _, kind, number = heapq.heappop(events)
+            task = tasks[number]
+            if kind == 0:
+                free[task['crew']] += 1
+                finish(number, now)
+            elif task['crew'] is None:
+                # Работа техникой: начинается сразу
+                task['start'] = now
+                task['finish'] = now + task['duration']
+                finish(number, task['finish'])
+            else:
+                heapq.heappush(ready[task['crew']], (task['key'], number))
+
+        for crew, queue in ready.items():
+            while queue and free[crew]:
+                _, number = heapq.heappop(queue)
+                task = tasks[number]
+                task['start'] = now
+                task['finish'] = now + task['duration']
+                free[crew] -= 1
+                busy[crew] += task['duration']
+                heapq.heappush(events, (task['finish'], 0, number))
+
+    makespan = max(task['finish'] for task in tasks)
+    for project in projects_list:
+        project['tasks'] = []
+    for task in tasks:
+        projects_list[task['project']]['tasks'].append({
+            'work': task['work'],
+            'crew': task['crew'],
+            'duration': task['duration'],
+            'start': task['start'],
+            'finish': task['finish']
+        })
+    for project in projects_list:
+        project['start'] = min(task['start'] for task in project['tasks'])
+        project['finish'] = max(task['finish'] for task in project['tasks'])
+
+    logger.debug(f"График {len(projects_list)} проектов ({len(tasks)} задач): {makespan} дней")
+    return {
+        'crews': crews,
+        'projects': projects_list,
+        'makespan': makespan,
+        'utilization': {crew: busy[crew] / (count * makespan) if makespan else 0
+                        for crew, count in crews.items()}
+    }
@@ -0,0 +1,59 @@
+from typing import Optional
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import struct
+
+logger = logging.getLogger(__name__)
+
+SLOT_BYTES = 8 * 1024  # Ячейка: ключ, длина и значение
+SIZE_MB = 16
+LOCKS = 16  # Блокировки по группам ячеек
+_HEADER = struct.Struct('32sI')  # sha256 ключа, длина значения
+
+
+class SharedCache:
+    """Кэш значений в общей памяти для процессов-воркеров
+
+    Анонимная разделяемая область mmap создается в мастер-процессе до fork,
+    поэтому все воркеры gunicorn видят одни и те же ячейки. Ячейка выбирается
+    по хешу ключа, при совпадении ячеек старое значение вытесняется.
+    Без предзагрузки (каждый воркер создает свой кэш) работает как обычный
+    кэш процесса.
+    """
+    def __init__(self, size_mb: int = SIZE_MB, slot_bytes: int = SLOT_BYTES):
+        self.slot_bytes = slot_bytes
+        self.slots = max(size_mb * 1024 * 1024 // slot_bytes, 1)
+        self.memory = mmap.mmap(-1, self.slots * slot_bytes)
+        self.locks = [multiprocessing.Lock() for _ in range(LOCKS)]
+        self.hits = 0
+        self.misses = 0
+
+    def _slot(self, key: str):
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        slot = int.from_bytes(digest[:8], 'little') % self.slots
+        return digest, slot * self.slot_bytes, self.locks[slot % LOCKS]
+
+    def get(self, key: str) -> Optional[bytes]:
+        digest, offset, lock = self._slot(key)
+        with lock:
+            stored, size = _HEADER.unpack_from(self.memory, offset)
+            if stored != digest:
+                self.misses += 1
+                return None
+            start = offset + _HEADER.size
+            value = self.memory[start:start + size]
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> bool:
+        """Сохранить значение; False, если оно не помещается в ячейку"""
+        if len(value) > self.slot_bytes - _HEADER.size:
+            return False
+        digest, offset, lock = self._slot(key)
+        with lock:
+            start = offset + _HEADER.size
+            self.memory[start:start + len(value)] = value
+            _HEADER.pack_into(self.memory, offset, digest, len(value))
+        return True
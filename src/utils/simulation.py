@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from .calculator import WASTE_FACTORS, build_calculator
+from .catalog import materials_rates, works_rates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAWS = 100_000  # Количество испытаний на одну смету
+CHUNK_SIZE = 25_000  # Испытаний за один проход (ограничивает память)
+DEFAULT_PRICE_SPREAD = 0.1  # ±10% к цене каталога
+
+
+@dataclass
+class Distribution:
+    """Треугольное распределение величины"""
+    low: float  # Минимум
+    mode: float  # Наиболее вероятное значение
+    high: float  # Максимум
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Distribution':
+        """Распределение из словаря {'low', 'mode', 'high'}"""
+        mode = float(data['mode'])
+        distribution = cls(
+            low=float(data.get('low', mode)),
+            mode=mode,
+            high=float(data.get('high', mode))
+        )
+        if not distribution.low <= distribution.mode <= distribution.high:
+            raise ValueError("Должно выполняться low <= mode <= high")
+        return distribution
+
+    @classmethod
+    def for_waste(cls, factor: float) -> 'Distribution':
+        """Распределение по умолчанию для коэффициента запаса: от половины до двойного запаса"""
+        return cls(low=1 + (factor - 1) / 2, mode=factor, high=1 + (factor - 1) * 2)
+
+    @classmethod
+    def for_price(cls, price: float, spread: float) -> 'Distribution':
+        """Распределение цены ±spread от цены каталога"""
+        return cls(low=price * (1 - spread), mode=price, high=price * (1 + spread))
+
+
+def _sample(rng: np.random.Generator, low: np.ndarray, mode: np.ndarray,
+            high: np.ndarray, size: int) -> np.ndarray:
+    """Матрица выборок (испытания x позиции), постоянные позиции не разыгрываются"""
+    samples = np.empty((size, len(mode)))
+    variable = high > low
+    samples[:, ~variable] = mode[~variable]
+    if variable.any():
+        samples[:, variable] = rng.triangular(
+            low[variable], mode[variable], high[variable],
+            size=(size, int(variable.sum()))
+        )
+    return samples
+
+
+def _build_lines(params: Dict, config: Dict) -> Dict[str, np.ndarray]:
+    """Позиции сметы: чистые количества и распределения запаса и цены"""
+    spread = float(config.get('price_spread', DEFAULT_PRICE_SPREAD))
+    waste_config = config.get('waste', {})
+    price_config = config.get('prices', {})
+
+    # Количества без запаса: запас разыгрывается отдельно
+    calculator = build_calculator(params)
+    calculator.waste_factors = {key: 1.0 for key in WASTE_FACTORS}
+    materials = calculator.calculate_materials(params['pool_type'], params.get('finish_type', 'ceramic'))
+    works = calculator.calculate_works()
+
+    lines = []
+    for key, quantity in materials.items():
+        if key not in materials_rates:
+            continue
+        if key in waste_config:
+            waste = Distribution.from_dict(waste_config[key])
+        elif key in WASTE_FACTORS:
+            waste = Distribution.for_waste(WASTE_FACTORS[key])
+        else:
+            waste = Distribution(1.0, 1.0, 1.0)
+        if key in price_config:
+            price = Distribution.from_dict(price_config[key])
+        else:
+            price = Distribution.for_price(materials_rates[key]['price'], spread)
+        lines.append((quantity, waste, price))
+
+    for work in works:
+        rate = works_rates.get(work['name'], 0)
+        if work['name'] in price_config:
+            price = Distribution.from_dict(price_config[work['name']])
+        else:
+            price = Distribution.for_price(rate, spread)
+        lines.append((work['quantity'], Distribution(1.0, 1.0, 1.0), price))
+
+    return {
+        'quantity': np.array([line[0] for line in lines], dtype=float),
+        'waste_low': np.array([line[1].low for line in lines]),
+        'waste_mode': np.array([line[1].mode for line in lines]),
+        'waste_high': np.array([line[1].high for line in lines]),
+        'price_low': np.array([line[2].low for line in lines]),
+        'price_mode': np.array([line[2].mode for line in lines]),
+        'price_high': np.array([line[2].high for line in lines]),
+    }
+
+
+def simulate_costs(params: Dict, config: Optional[Dict] = None) -> Dict[str, float]:
+    """Диапазон стоимости (P10/P50/P90) методом Монте-Карло
+
+    params - параметры бассейна как в запросе /calculate (мм),
+    config - {'draws', 'seed', 'price_spread', 'waste': {ключ: распределение},
+    'prices': {ключ или наименование работы: распределение}}
+    """
+    config = config or {}
+    draws = int(config.get('draws', DEFAULT_DRAWS))
+    if draws <= 0:
+        raise ValueError("Количество испытаний должно быть положительным")
+    rng = np.random.default_rng(config.get('seed'))
+    lines = _build_lines(params, config)
+
+    totals = np.empty(draws)
+    for start in range(0, draws, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, draws - start)
+        waste = _sample(rng, lines['waste_low'], lines['waste_mode'], lines['waste_high'], size)
+        prices = _sample(rng, lines['price_low'], lines['price_mode'], lines['price_high'], size)
+        totals[start:start + size] = (waste * prices) @ lines['quantity']
+
+    p10, p50, p90 = np.percentile(totals, [10, 50, 90])
+    result = {
+        'draws': draws,
+        'deterministic': float(np.sum(lines['quantity'] * lines['waste_mode'] * lines['price_mode'])),
+        'mean': float(totals.mean()),
+        'p10': float(p10),
+        'p50': float(p50),
+        'p90': float(p90)
+    }
+    logger.debug(f"Моделирование стоимости: {result}")
+    return result
+
+
+def simulate_portfolio(designs: List[Dict], config: Optional[Dict] = None,
+                       processes: Optional[int] = None) -> List[Dict[str, float]]:
+    """Моделирование набора смет, при processes > 1 - в пуле процессов"""
+    if not processes or processes < 2 or len(designs) < 2:
+        return [simulate_costs(design, config) for design in designs]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(simulate_costs, designs, [config] * len(designs)))
@@ -0,0 +1,71 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Выполняющийся расчет: ожидающие получают его результат или исключение"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных расчетов между потоками
+
+    Первый вызов do с ключом выполняет функцию, остальные вызовы с тем же
+    ключом ждут ее завершения и получают тот же результат (или то же
+    исключение). После завершения ключ освобождается: результат не кэшируется.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"Объединено одинаковых запросов: {call.waiters + 1}")
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Объединение одинаковых одновременных расчетов в цикле событий asyncio"""
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """function - корутинная функция без аргументов"""
+        future = self._calls.get(key)
+        if future is not None:
+            # shield: отмена одного ожидающего не отменяет расчет для остальных
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(function())
+        self._calls[key] = future
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
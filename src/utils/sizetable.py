@@ -0,0 +1,374 @@
+# Таблица стандартных размеров: сметы /calculate для сетки с шагом 100 мм,
+# рассчитанные заранее и сохраненные в файл .npy, который открывается через
+# mmap. Запрос на сетке получает ответ по индексу ячейки, вне сетки считается
+# калькулятором. Имя файла содержит отпечаток исходного кода расчета и
+# каталога: после их изменения таблица строится заново.
+#
+#     python -m src.utils.sizetable build --processes 4
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .batch import run_batch
+from .calculator import PoolCalculator
+from .catalog import materials_rates, works_rates
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1  # Увеличить при изменении формата ответа /calculate
+
+# Сетка стандартных размеров, мм
+AXES = (
+    ('length', tuple(range(4000, 10001, 100))),
+    ('width', tuple(range(2500, 5001, 100))),
+    ('shallow_depth', (1200, 1400, 1500)),
+    ('deep_depth', (1500, 1800, 2000)),
+    ('steps_count', (0, 3, 4)),
+    ('variant', ('liner', 'ceramic', 'mosaic'))  # Пленка или керамика с отделкой плиткой/мозаикой
+)
+
+# Модуль, с которого начинается обход импортов для отпечатка: calculate_result
+# и все модули src, которые он импортирует (калькулятор, каталог, кодирование ответа)
+SOURCE_ROOT = 'src/main.py'
+
+# Столбцы: 0 - номер раскладки ячейки (NaN - ячейка не рассчитана), далее
+# размеры, площади, объемы, материалы каталога и работы
+FIELDS = (
+    ('dimensions', 'internal', 'length'), ('dimensions', 'internal', 'width'),
+    ('dimensions', 'internal', 'shallow_depth'), ('dimensions', 'internal', 'deep_depth'),
+    ('dimensions', 'external', 'length'), ('dimensions', 'external', 'width'),
+    ('dimensions', 'pit', 'length'), ('dimensions', 'pit', 'width'),
+    ('areas', 'bottom'), ('areas', 'walls'), ('areas', 'steps'), ('areas', 'total'),
+    ('areas', 'outer'), ('areas', 'pit'),
+    ('volumes', 'pit'), ('volumes', 'concrete_200'), ('volumes', 'concrete_300')
+)
+MATERIAL_COLUMNS = {key: 1 + len(FIELDS) + number for number, key in enumerate(materials_rates)}
+WORK_COLUMNS = {name: 1 + len(FIELDS) + len(materials_rates) + number for number, name in enumerate(works_rates)}
+COLUMNS = 1 + len(FIELDS) + len(materials_rates) + len(works_rates)
+
+CHUNK_SIZE = 324  # Ячеек в задаче: 4 размера в плане со всеми глубинами и вариантами
+RELOAD_INTERVAL = 30.0  # Проверка появления таблицы после фоновой сборки, с
+BUILD_TIMEOUT = 3600  # Блокировка сборки старше этого считается брошенной, с
+
+# Калькулятор процесса-исполнителя: создается при первой задаче
+_calculator: Optional[PoolCalculator] = None
+
+
+def _imported_modules(path: str, base: str) -> Iterator[List[str]]:
+    """Имена модулей (по частям), импортируемых файлом, в том числе внутри функций"""
+    package = os.path.relpath(os.path.dirname(path), base).split(os.sep)
+    with open(path, 'rb') as file:
+        tree = ast.parse(file.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split('.')
+        elif isinstance(node, ast.ImportFrom):
+            parent = package[:len(package) - node.level + 1] if node.level else []
+            module = parent + (node.module.split('.') if node.module else [])
+            yield module
+            # from . import x: x может быть модулем пакета
+            for alias in node.names:
+                yield module + [alias.name]
+
+
+def source_files() -> List[str]:
+    """Файлы исходного кода, от которых зависит ответ /calculate
+
+    SOURCE_ROOT и все модули src, которые он импортирует прямо или через
+    другие модули. Импорты читаются из исходного текста, поэтому список не
+    зависит от того, какие модули уже загружены в процессе.
+    """
+    base = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    pending = [os.path.join(base, SOURCE_ROOT)]
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        for parts in _imported_modules(path, base):
+            if parts[0] != 'src':
+                continue
+            module = os.path.join(base, *parts)
+            for candidate in (module + '.py', os.path.join(module, '__init__.py')):
+                if os.path.isfile(candidate):
+                    pending.append(candidate)
+    return sorted(found)
+
+
+def fingerprint() -> str:
+    """Отпечаток исходного кода расчета, каталога и сетки"""
+    digest = hashlib.sha256(f'{TABLE_VERSION}:{AXES!r}'.encode('utf-8'))
+    base = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for path in source_files():
+        digest.update(os.path.relpath(path, base).replace(os.sep, '/').encode('utf-8'))
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def _shape() -> Tuple[int, ...]:
+    return tuple(len(values) for _, values in AXES)
+
+
+def _params(values: Tuple) -> Dict:
+    """Параметры запроса /calculate для ячейки"""
+    params = dict(zip((name for name, _ in AXES[:-1]), values[:-1]))
+    variant = values[-1]
+    params['pool_type'] = 'liner' if variant == 'liner' else 'ceramic'
+    params['finish_type'] = 'ceramic' if variant == 'liner' else variant
+    return params
+
+
+def cells() -> Iterator[Tuple[int, Dict]]:
+    """Ячейки сетки по порядку индекса: (индекс, параметры запроса)"""
+    for index, position in enumerate(np.ndindex(*_shape())):
+        yield index, _params(tuple(values[i] for (_, values), i in zip(AXES, position)))
+
+
+def _encode(result: Dict) -> Tuple[List[float], Tuple]:
+    """Строка таблицы и раскладка ячейки: порядок позиций, единицы и целые значения"""
+    row = [np.nan] * COLUMNS
+    integers = []
+    for column, path in enumerate(FIELDS, start=1):
+        value = result
+        for key in path:
+            value = value[key]
+        row[column] = value
+        integers.append(isinstance(value, int))
+    materials = []
+    for key, value in result['materials'].items():
+        if key not in MATERIAL_COLUMNS:
+            raise ValueError(f"Материал {key} отсутствует в каталоге")
+        row[MATERIAL_COLUMNS[key]] = value
+        materials.append((key, isinstance(value, int)))
+    works = []
+    for work in result['works']:
+        if work['name'] not in WORK_COLUMNS or set(work) != {'name', 'unit', 'quantity'}:
+            raise ValueError(f"Работа {work['name']} не поддерживается таблицей")
+        row[WORK_COLUMNS[work['name']]] = work['quantity']
+        works.append((work['name'], work['unit'], isinstance(work['quantity'], int)))
+    return row, (tuple(integers), tuple(materials), tuple(works))
+
+
+def build_chunk(chunk: List[Tuple[int, Dict]]) -> List[Tuple[int, Optional[List[float]], Optional[Tuple]]]:
+    """Строки таблицы для порции ячеек в процессе-исполнителе"""
+    # Расчет /calculate живет в приложении; импорт здесь, чтобы не было цикла
+    from ..main import calculate_result
+    global _calculator
+    if _calculator is None:
+        _calculator = PoolCalculator()
+    rows = []
+    for index, params in chunk:
+        try:
+            row, layout = _encode(calculate_result(params, _calculator))
+        except ValueError as e:
+            logger.warning(f"Ячейка {params}: {str(e)}")
+            row, layout = None, None
+        rows.append((index, row, layout))
+    return rows
+
+
+def _paths(directory: str, key: str) -> Tuple[str, str]:
+    base = os.path.join(directory, f'sizes-{key}')
+    return base + '.npy', base + '.json'
+
+
+def build(directory: str, processes: Optional[int] = None, quiet: bool = True) -> Dict:
+    """Рассчитать всю сетку и записать таблицу; старые таблицы удаляются"""
+    os.makedirs(directory, exist_ok=True)
+    key = fingerprint()
+    array_path, meta_path = _paths(directory, key)
+    started = time.perf_counter()
+    count = int(np.prod(_shape()))
+
+    # Запись во временный файл: читатели видят только готовую таблицу
+    array = np.lib.format.open_memmap(array_path + '.tmp', mode='w+', dtype=np.float64, shape=(count, COLUMNS))
+    layouts: Dict[Tuple, int] = {}
+    done = 0
+    for rows in run_batch(cells(), processes, CHUNK_SIZE, worker=build_chunk):
+        for index, row, layout in rows:
+            if row is None:
+                array[index] = np.nan
+                continue
+            row[0] = layouts.setdefault(layout, len(layouts))
+            array[index] = row
+        done += len(rows)
+        if not quiet:
+            print(f"\rРассчитано ячеек: {done}/{count}", end='', file=sys.stderr)
+    if not quiet:
+        print(file=sys.stderr)
+    array.flush()
+    del array
+
+    meta = {
+        'fingerprint': key,
+        'axes': [[name, list(values)] for name, values in AXES],
+        'layouts': [[list(integers), [list(item) for item in materials], [list(item) for item in works]]
+                    for integers, materials, works in sorted(layouts, key=layouts.get)],
+        'cells': count,
+        'seconds': round(time.perf_counter() - started, 1)
+    }
+    os.replace(array_path + '.tmp', array_path)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+    os.replace(meta_path + '.tmp', meta_path)
+
+    for path in glob.glob(os.path.join(directory, 'sizes-*')):
+        if not path.startswith(os.path.join(directory, f'sizes-{key}')):
+            os.remove(path)
+    logger.info(f"Таблица стандартных размеров: {count} ячеек, {meta['seconds']} с, "
+                f"{os.path.getsize(array_path) / 1024 / 1024:.1f} МБ")
+    return meta
+
+
+class SizeTable:
+    """Готовые сметы стандартных размеров с поиском ячейки по индексу
+
+    Таблица открывается через mmap только для чтения, поэтому воркеры
+    разделяют одни страницы файла. Если таблицы для текущего отпечатка нет,
+    она собирается в отдельном процессе, а до ее появления lookup
+    возвращает None и расчет идет калькулятором.
+    """
+    def __init__(self, directory: str, auto_build: bool = True):
+        self.directory = directory
+        self.auto_build = auto_build
+        self.fingerprint = fingerprint()
+        self.array: Optional[np.ndarray] = None
+        self.layouts: List[Tuple] = []
+        self._positions = [{value: i for i, value in enumerate(values)} for _, values in AXES]
+        self._strides = np.cumprod((_shape() + (1,))[:0:-1])[::-1].tolist()
+        self._checked: Optional[float] = None
+
+    def load(self) -> bool:
+        """Открыть таблицу текущего отпечатка; без нее - запустить сборку"""
+        self._checked = time.monotonic()
+        array_path, meta_path = _paths(self.directory, self.fingerprint)
+        try:
+            with open(meta_path, encoding='utf-8') as file:
+                meta = json.load(file)
+            array = np.load(array_path, mmap_mode='r')
+        except (OSError, ValueError):
+            if self.auto_build:
+                self._start_build()
+            return False
+        if array.shape != (meta['cells'], COLUMNS):
+            logger.warning(f"Таблица {array_path} повреждена")
+            return False
+        self.layouts = [
+            (tuple(integers), [tuple(item) for item in materials], [tuple(item) for item in works])
+            for integers, materials, works in meta['layouts']
+        ]
+        self.array = array
+        logger.info(f"Таблица стандартных размеров загружена: {meta['cells']} ячеек")
+        return True
+
+    def _start_build(self) -> None:
+        """Сборка в отдельном процессе; файл блокировки не дает запустить ее дважды"""
+        os.makedirs(self.directory, exist_ok=True)
+        lock = os.path.join(self.directory, f'sizes-{self.fingerprint}.lock')
+        try:
+            if time.time() - os.path.getmtime(lock) > BUILD_TIMEOUT:
+                os.remove(lock)
+        except OSError:
+            pass
+        try:
+            descriptor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        os.close(descriptor)
+        logger.info("Таблица стандартных размеров устарела или отсутствует, запущена сборка")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        subprocess.Popen([sys.executable, '-m', 'src.utils.sizetable', 'build', '--dir', self.directory,
+                          '--lock', lock], cwd=root, start_new_session=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def index(self, data: Dict) -> Optional[int]:
+        """Индекс ячейки для параметров запроса или None вне сетки"""
+        try:
+            values = [float(data[name]) for name, _ in AXES[:4]]
+            values.append(int(data['steps_count']))
+            values.append('liner' if data['pool_type'] == 'liner' else str(data.get('finish_type', 'ceramic')))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return None
+        index = 0
+        for value, positions, stride in zip(values, self._positions, self._strides):
+            position = positions.get(value)
+            if position is None:
+                return None
+            index += position * stride
+        return index
+
+    def lookup(self, data: Dict) -> Optional[Dict]:
+        """Результат /calculate из таблицы или None, если его нужно считать"""
+        if self.array is None:
+            if self._checked is not None and time.monotonic() - self._checked < RELOAD_INTERVAL:
+                return None
+            if not self.load():
+                return None
+        index = self.index(data)
+        if index is None:
+            return None
+        row = self.array[index].tolist()
+        if row[0] != row[0]:  # NaN: ячейка не рассчитана
+            return None
+        integers, materials, works = self.layouts[int(row[0])]
+
+        def value(column: int, integer: bool):
+            return int(row[column]) if integer else row[column]
+
+        result: Dict = {}
+        for column, (path, integer) in enumerate(zip(FIELDS, integers), start=1):
+            section = result
+            for key in path[:-1]:
+                section = section.setdefault(key, {})
+            section[path[-1]] = value(column, integer)
+        result['materials'] = {key: value(MATERIAL_COLUMNS[key], integer) for key, integer in materials}
+        result['works'] = [{'name': name, 'unit': unit, 'quantity': value(WORK_COLUMNS[name], integer)}
+                           for name, unit, integer in works]
+        return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Таблица смет стандартных размеров бассейнов")
+    parser.add_argument('command', choices=('build', 'fingerprint'), help="Собрать таблицу или вывести отпечаток")
+    parser.add_argument('--dir', default=os.environ.get('SIZE_TABLE_DIR',
+                                                        os.path.join(tempfile.gettempdir(), 'pool_sizes')),
+                        help="Каталог таблицы")
+    parser.add_argument('--processes', type=int, default=None, help="Число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--lock', help=argparse.SUPPRESS)  # Файл блокировки фоновой сборки
+    args = parser.parse_args(argv)
+
+    if args.command == 'fingerprint':
+        print(fingerprint())
+        return
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('src').setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    if args.lock:
+        os.nice(10)  # Фоновая сборка не мешает обслуживанию запросов
+    try:
+        meta = build(args.dir, args.processes, quiet=args.lock is not None)
+    finally:
+        if args.lock:
+            try:
+                os.remove(args.lock)
+            except OSError:
+                pass
+    print(f"Готово: {meta['cells']} ячеек, {len(meta['layouts'])} раскладок, {meta['seconds']} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STEP_TREAD = 300  # Проступь ступени, мм (как в PoolCalculator)
+STEP_RISER = 150  # Подступенок, мм
+
+
+@dataclass(frozen=True)
+class TileFormat:
+    """Формат плитки"""
+    width: int  # Ширина плитки (листа мозаики), мм
+    height: int  # Высота плитки, мм
+    joint: int  # Ширина шва, мм
+    per_box: int  # Штук в коробке
+
+    @property
+    def area(self) -> float:
+        """Площадь одной плитки, м²"""
+        return self.width * self.height / 1_000_000
+
+
+# Форматы по умолчанию для вариантов отделки
+TILE_FORMATS = {
+    'ceramic': TileFormat(width=600, height=300, joint=2, per_box=8),
+    'mosaic': TileFormat(width=316, height=316, joint=2, per_box=20),  # листы мозаики
+}
+
+
+@lru_cache(maxsize=4096)
+def lay_surface(length: int, start_height: int, end_height: int,
+                tile_width: int, tile_height: int, joint: int) -> Tuple[int, int]:
+    """Целые и подрезанные плитки на поверхности (мм)
+
+    Поверхность - трапеция длиной length, высота линейно меняется от
+    start_height до end_height (прямоугольник при равных высотах). Раскладка
+    от угла с полной плиткой, подрезка по дальним краям.
+    """
+    if length <= 0 or max(start_height, end_height) <= 0:
+        return 0, 0
+    columns = np.arange(0, length, tile_width + joint)
+    rows = np.arange(0, max(start_height, end_height), tile_height + joint)
+
+    # Высота поверхности на левой и правой границе каждой плитки
+    right = np.minimum(columns + tile_width, length)
+    slope = (end_height - start_height) / length
+    left_height = start_height + slope * columns
+    right_height = start_height + slope * right
+
+    top = rows[:, None]
+    whole = ((columns + tile_width <= length)[None, :] &
+             (top + tile_height <= np.minimum(left_height, right_height)[None, :]))
+    used = top < np.maximum(left_height, right_height)[None, :]
+    whole_count = int(whole.sum())
+    return whole_count, int(used.sum()) - whole_count
+
+
+def _lay_best(length: int, start_height: int, end_height: int, tile: TileFormat) -> Tuple[int, int]:
+    """Раскладка в лучшей из двух ориентаций плитки"""
+    variants = [lay_surface(length, start_height, end_height, tile.width, tile.height, tile.joint)]
+    if tile.width != tile.height:
+        variants.append(lay_surface(length, start_height, end_height, tile.height, tile.width, tile.joint))
+    return min(variants, key=sum)
+
+
+def surfaces(dimensions) -> List[Tuple[str, int, int, int, int]]:
+    """Облицовываемые поверхности чаши: (название, кол-во, длина, высота в начале, в конце), мм"""
+    length = round(dimensions.length * 1000)
+    width = round(dimensions.width * 1000)
+    shallow = round(dimensions.shallow_depth * 1000)
+    deep = round(dimensions.deep_depth * 1000)
+    result = [
+        ('Дно', 1, length, width, width),
+        ('Продольные стены', 2, length, shallow, deep),
+        ('Торцевая стена (мелкая)', 1, width, shallow, shallow),
+        ('Торцевая стена (глубокая)', 1, width, deep, deep),
+    ]
+    if dimensions.steps_count > 0:
+        result.append(('Проступи ступеней', dimensions.steps_count, width, STEP_TREAD, STEP_TREAD))
+        result.append(('Подступенки', dimensions.steps_count, width, STEP_RISER, STEP_RISER))
+    return result
+
+
+def layout_tiles(dimensions, tile: TileFormat) -> Dict:
+    """Раскладка плитки по всем поверхностям чаши и количество коробок"""
+    if min(tile.width, tile.height, tile.per_box) <= 0 or tile.joint < 0:
+        raise ValueError("Некорректный формат плитки")
+
+    result_surfaces = []
+    whole_total = 0
+    cut_total = 0
+    area_total = 0.0
+    for name, count, length, start_height, end_height in surfaces(dimensions):
+        whole, cut = _lay_best(length, start_height, end_height, tile)
+        whole_total += whole * count
+        cut_total += cut * count
+        area_total += count * length * (start_height + end_height) / 2 / 1_000_000
+        result_surfaces.append({
+            'surface': name,
+            'count': count,
+            'whole': whole,
+            'cut': cut
+        })
+
+    tiles = whole_total + cut_total
+    boxes = math.ceil(tiles / tile.per_box)
+    purchased = boxes * tile.per_box * tile.area
+    logger.debug(f"Раскладка плитки {tile}: {tiles} шт, {boxes} коробок")
+    return {
+        'surfaces': result_surfaces,
+        'whole': whole_total,
+        'cut': cut_total,
+        'tiles': tiles,
+        'boxes': boxes,
+        'surface_area': area_total,
+        'purchased_area': purchased,
+        'waste_percent': (purchased / area_total - 1) * 100 if area_total else 0
+    }
@@ -0,0 +1,105 @@
+from typing import Dict, List
+import logging
+
+from .calculator import PoolCalculator, build_calculator
+from .catalog import price_materials, price_works
+
+logger = logging.getLogger(__name__)
+
+SENSITIVITY_WINDOW_MM = 250  # Полуширина окна оценки чувствительности, мм
+SENSITIVITY_POINTS = 11  # Расчетов в окне на каждый размер
+
+
+def _evaluate(calculator: PoolCalculator, params: Dict) -> Dict:
+    """Расчет сметы; граф калькулятора пересчитывает только узлы, зависящие от изменений"""
+    build_calculator(params, calculator)
+    materials = calculator.calculate_materials(params['pool_type'], params.get('finish_type', 'ceramic'))
+    return {
+        'params': params,
+        'materials': {line['key']: line for line in price_materials(materials)},
+        'works': {line['name']: line for line in price_works(calculator.calculate_works())}
+    }
+
+
+def _total(evaluation: Dict) -> float:
+    """Итоговая стоимость сметы"""
+    return (sum(line['total'] for line in evaluation['materials'].values()) +
+            sum(line['total'] for line in evaluation['works'].values()))
+
+
+def _diff_lines(base: Dict[str, Dict], new: Dict[str, Dict]) -> List[Dict]:
+    """Только изменившиеся позиции сметы"""
+    changes = []
+    for key in list(base) + [key for key in new if key not in base]:
+        old_line = base.get(key)
+        new_line = new.get(key)
+        old_quantity = old_line['quantity'] if old_line else 0
+        new_quantity = new_line['quantity'] if new_line else 0
+        if old_line and new_line and abs(new_quantity - old_quantity) < 1e-9:
+            continue
+        line = new_line or old_line
+        changes.append({
+            'key': key,
+            'name': line['name'],
+            'unit': line['unit'],
+            'base_quantity': old_quantity,
+            'quantity': new_quantity,
+            'delta_quantity': new_quantity - old_quantity,
+            'delta_total': (new_line['total'] if new_line else 0) - (old_line['total'] if old_line else 0)
+        })
+    return changes
+
+
+def sensitivities(calculator: PoolCalculator, evaluation: Dict,
+                  window_mm: float = SENSITIVITY_WINDOW_MM,
+                  points: int = SENSITIVITY_POINTS) -> Dict[str, float]:
+    """Чувствительность стоимости к размерам, руб. на 1 мм
+
+    Смета ступенчатая (целые прутки, рулоны, коробки, упаковки), поэтому
+    приращение в несколько мм дает то ноль, то скачок на целую упаковку.
+    Берется наклон прямой наименьших квадратов по points расчетам,
+    равномерно расставленным в окне ±window_mm вокруг проекта: это
+    центральная разность, усредненная по окну.
+    """
+    params = evaluation['params']
+    sizes = {
+        'length': ('length',),
+        'width': ('width',),
+        'depth': ('shallow_depth', 'deep_depth')
+    }
+    result = {}
+    for name, keys in sizes.items():
+        # Окно не выходит за ноль у малых размеров
+        half = min(window_mm, min(float(params[key]) for key in keys) / 2)
+        offsets = [half * (2 * index / (points - 1) - 1) for index in range(points)]
+        totals = [
+            _total(_evaluate(calculator, {**params, **{key: float(params[key]) + offset for key in keys}}))
+            for offset in offsets
+        ]
+        # Смещения симметричны (сумма нулевая): наклон = Σ o·y / Σ o²
+        result[name] = (sum(offset * total for offset, total in zip(offsets, totals)) /
+                        sum(offset * offset for offset in offsets))
+    # Возвращаем калькулятор к исходному проекту
+    build_calculator(params, calculator)
+    return result
+
+
+def what_if(base_params: Dict, changes: Dict, with_sensitivities: bool = True) -> Dict:
+    """Разница между базовым проектом и проектом с изменениями"""
+    calculator = PoolCalculator()
+    base = _evaluate(calculator, base_params)
+    modified = _evaluate(calculator, {**base_params, **changes})
+
+    base_total = _total(base)
+    total = _total(modified)
+    result = {
+        'materials': _diff_lines(base['materials'], modified['materials']),
+        'works': _diff_lines(base['works'], modified['works']),
+        'base_total': base_total,
+        'total': total,
+        'delta': total - base_total
+    }
+    if with_sensitivities:
+        result['sensitivities'] = sensitivities(calculator, modified)
+    logger.debug(f"Что-если: изменения {changes}, разница {result['delta']:.2f}")
+    return result
@@ -1,5 +1,6 @@
 from flask import Flask, request, jsonify, render_template, send_file
 from utils.calculator import PoolCalculator
+from utils.catalog import materials_rates
 import logging
 import json
 import pandas as pd
@@ -16,40 +17,6 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.DEBUG)
 logger = app.logger
 
-# Коэффициенты и цены на материалы
-materials_rates = {
-    # Основные материалы
-    'sand': {'name': 'Песок', 'unit': 'м³', 'price': 800},
-    'gravel': {'name': 'Щебень', 'unit': 'м³', 'price': 1200},
-    'concrete_200': {'name': 'Бетон М200', 'unit': 'м³', 'price': 4500},
-    'concrete_300': {'name': 'Бетон М300', 'unit': 'м³', 'price': 5000},
-    'rebar_12': {'name': 'Арматура 12мм', 'unit': 'м.п.', 'price': 80},
-    'wire': {'name': 'Проволока вязальная', 'unit': 'кг', 'price': 100},
-    'plywood_18': {'name': 'Фанера 18мм', 'unit': 'м²', 'price': 1200},
-    'timber_50x50': {'name': 'Брус 50х50', 'unit': 'м.п.', 'price': 80},
-    
-    # Гидроизоляция
-    'geotextile': {'name': 'Геотекстиль', 'unit': 'м²', 'price': 50},
-    'waterproofing': {'name': 'Гидроизоляция', 'unit': 'м²', 'price': 300},
-    'coverflex': {'name': 'CoverFlex', 'unit': 'кг', 'price': 400},
-    'fiberglass_mesh': {'name': 'Стеклосетка', 'unit': 'м²', 'price': 60},
-    'litoband': {'name': 'Лента Литобанд', 'unit': 'м.п.', 'price': 200},
-    
-    # Отделочные материалы
-    'liner': {'name': 'ПВХ лайнер', 'unit': 'м²', 'price': 800},
-    'ceramic_tile': {'name': 'Керамогранит', 'unit': 'м²', 'price': 1500},
-    'mosaic': {'name': 'Мозаика', 'unit': 'м²', 'price': 2500},
-    'tile_adhesive': {'name': 'Клей для керамогранита', 'unit': 'кг', 'price': 50},
-    'mosaic_adhesive': {'name': 'Клей для мозаики', 'unit': 'кг', 'price': 80},
-    'epoxy_grout': {'name': 'Затирка эпоксидная', 'unit': 'кг', 'price': 1200},
-    
-    # Бортовые материалы
-    'coping_stone': {'name': 'Копинговый камень', 'unit': 'м.п.', 'price': 1800},
-    'adhesive_80': {'name': 'Клей для копинга', 'unit': 'кг', 'price': 80},
-    'grout': {'name': 'Затирка для копинга', 'unit': 'кг', 'price': 150},
-    'sealant': {'name': 'Герметик', 'unit': 'шт', 'price': 400},
-}
-
 @app.route('/')
 def index():
     return render_template('index.html')
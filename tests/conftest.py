@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+# Приложение без фоновой сборки таблицы стандартных размеров и без общего каталога кэшей
+os.environ.setdefault('SIZE_TABLE_BUILD', '0')
+os.environ.setdefault('SIZE_TABLE_DIR', tempfile.mkdtemp(prefix='pool_sizes_'))
+os.environ.setdefault('EXPORT_CACHE_DIR', tempfile.mkdtemp(prefix='pool_exports_'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+DESIGN = {'length': 7000, 'width': 3000, 'shallow_depth': 1200, 'deep_depth': 1800,
+          'steps_count': 3, 'pool_type': 'ceramic', 'finish_type': 'ceramic'}
+
+
+@pytest.fixture
+def design():
+    return dict(DESIGN)
+
+
+@pytest.fixture
+def client():
+    from src.main import app
+    return app.test_client()
+
+
+@pytest.fixture
+def evicted_once(monkeypatch):
+    """Первый отданный кэшем выгрузок путь удаляется, как будто его вытеснил другой процесс"""
+    from src import main
+    renders = []
+    get_or_render = main.export_cache.get_or_render
+
+    def racing(*args):
+        artifact = get_or_render(*args)
+        if not renders:
+            os.remove(artifact['path'])
+        renders.append(artifact['hit'])
+        return artifact
+
+    monkeypatch.setattr(main.export_cache, 'get_or_render', racing)
+    return renders
@@ -0,0 +1,50 @@
+import os
+
+from src import main
+from src.utils import artifacts
+from src.utils.artifacts import ArtifactCache
+
+
+def test_evicts_oldest_over_limit(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=2500)
+    for number in range(5):
+        cache.put(f'{number:064x}', 'pdf', b'x' * 1000)
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert remaining == [f'{3:064x}.pdf', f'{4:064x}.pdf']
+
+
+def test_directory_not_scanned_on_every_put(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda **kwargs: scans.append(1) or evict(**kwargs))
+    for number in range(20):
+        cache.put(f'{number:064x}', 'pdf', b'x' * 100)
+    assert len(scans) == 1
+    monkeypatch.setattr(artifacts, 'EVICT_INTERVAL', 0.0)
+    cache.put('f' * 64, 'pdf', b'x')
+    assert len(scans) == 2
+
+
+def test_export_key_includes_catalog_version(client, design, monkeypatch):
+    result = client.post('/calculate', json=design).get_json()['data']
+    first = main.cached_export('excel', result)
+    assert main.cached_export('excel', result)['key'] == first['key']
+    monkeypatch.setattr(main, 'CATALOG_VERSION', 'changed')
+    assert main.cached_export('excel', result)['key'] != first['key']
+
+
+def test_oversized_artifact_survives_its_own_put(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=500)
+    first = cache.put('a' * 64, 'pdf', b'x' * 1000)
+    assert os.path.exists(first)
+    second = cache.put('b' * 64, 'pdf', b'x' * 1000)
+    assert os.path.exists(second) and not os.path.exists(first)
+
+
+def test_wsgi_rerenders_evicted_file(client, evicted_once):
+    response = client.get('/drawing/plan.svg?length=7123&width=3500&shallow_depth=1200&deep_depth=1800')
+    assert response.status_code == 200
+    assert response.data.startswith(b'<')
+    assert evicted_once == [False, False]
+
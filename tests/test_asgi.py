@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from src import asgi, main
+
+
+def request(method, path, query='', body=b'', headers=()):
+    """Запрос к ASGI-приложению: статус, заголовки и тело ответа"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('latin-1'),
+             'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent
+
+
+@pytest.mark.parametrize('header, matches', [
+    ('"abc"', True), ('W/"abc"', True), ('"x", "abc"', True), ('*', True),
+    ('"abcd"', False), ('"ab"', False), ('', False)
+])
+def test_etag_matches(header, matches):
+    assert asgi.etag_matches(header, '"abc"') is matches
+
+
+def test_export_error_status_matches_wsgi(client):
+    wsgi = client.post('/export/bundle', json={})
+    sent = request('POST', '/export/bundle', body=b'{}')
+    assert sent[0]['status'] == wsgi.status_code == 400
+    assert json.loads(sent[1]['body'])['success'] is False
+
+
+def test_drawing_error_status_matches_wsgi(client):
+    query = 'length=1&width=10000000&shallow_depth=1200&deep_depth=1800'
+    assert request('GET', '/drawing/plan.svg', query)[0]['status'] == 400
+    assert client.get(f'/drawing/plan.svg?{query}').status_code == 400
+
+
+def test_drawing_key_normalized(design):
+    args = {key: str(value) for key, value in design.items()}
+    assert main.drawing_key(args, 'plan') == main.drawing_key(dict(args, px='800'), 'plan')
+    assert main.drawing_key(args, 'plan') == main.drawing_key(dict(args, length='7000.0'), 'plan')
+
+
+def test_no_second_response_after_start(monkeypatch):
+    async def broken(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        raise RuntimeError("Соединение прервано")
+
+    monkeypatch.setattr(asgi, 'send_events', broken)
+    sent = request('GET', '/live/events')
+    assert [message['type'] for message in sent] == ['http.response.start']
+
+
+def test_calculate_etag_same_as_wsgi(client, design):
+    query = main.canonical_query({key: str(value) for key, value in design.items()}, ())
+    etag = client.get(f'/calculate?{query}').headers['ETag']
+    sent = request('GET', '/calculate', query, headers=[('if-none-match', f'W/{etag}')])
+    assert sent[0]['status'] == 304
+    assert (b'etag', etag.encode('latin-1')) in sent[0]['headers']
+
+
+def test_evicted_file_rendered_again(monkeypatch, evicted_once):
+    async def offload(function, *args):
+        return function(*args)
+
+    monkeypatch.setattr(asgi, 'offload', offload)
+    sent = request('GET', '/drawing/plan.svg', 'length=7123&width=3500&shallow_depth=1200&deep_depth=1800&px=640')
+    assert sent[0]['status'] == 200
+    assert sent[1]['body'].startswith(b'<')
+    assert evicted_once == [False, False]
+
+
+def test_calculate_shares_result_cache_with_wsgi(client, design, monkeypatch):
+    """POST /calculate: результат WSGI-воркера берется из общего кэша, свой расчет туда же записывается"""
+    calls = []
+
+    async def offload(function, *args):
+        calls.append(function)
+        return function(*args)
+
+    monkeypatch.setattr(asgi, 'offload', offload)
+    first = dict(design, length=7321)
+    expected = client.post('/calculate', json=first).get_json()
+    sent = request('POST', '/calculate', body=json.dumps(first).encode('utf-8'))
+    assert json.loads(sent[1]['body']) == expected
+    assert calls == []
+
+    second = dict(design, length=7333)
+    request('POST', '/calculate', body=json.dumps(second).encode('utf-8'))
+    assert len(calls) == 1
+    assert main.result_cache.get(main.calculate_key(second)) is not None
@@ -0,0 +1,59 @@
+import csv
+import io
+
+import pytest
+
+from src.utils.bulk import estimate_rows, read_rows
+
+CSV = ('﻿Название;Длина;Ширина;Мелкая часть;Глубокая часть;Ступени\r\n'
+       'Дача;7000;3000;1200;1800;3\r\n'
+       'Ошибка;7000;3000;1900;1800;0\r\n').encode('utf-8')
+
+
+class Upload:
+    """Поток загрузки как SpooledTemporaryFile в Python 3.9: без readable и seekable"""
+
+    def __init__(self, data: bytes):
+        self._file = io.BytesIO(data)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+def test_read_rows_from_upload_stream():
+    rows = list(read_rows(Upload(CSV), 'csv'))
+    assert [number for number, _ in rows] == [2, 3]
+    assert rows[0][1]['name'] == 'Дача'
+    assert rows[0][1]['length'] == '7000'
+
+
+def test_estimate_rows_keeps_errors():
+    results = list(estimate_rows(read_rows(io.BytesIO(CSV), 'csv')))
+    assert results[0][-1] is None and results[0][-2] > 0
+    assert results[1][-1] == "Мелкая часть глубже глубокой"
+
+
+def test_import_route_csv(client):
+    response = client.post('/import', data={'file': (io.BytesIO(CSV), 'pools.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.data.decode('utf-8-sig'))))
+    assert len(rows) == 3
+    assert rows[1][1] == 'Дача'
+
+
+@pytest.mark.parametrize('field, value', [('length', '0.4'), ('length', 'inf'), ('width', 'nan'),
+                                          ('steps_count', 'inf'), ('deep_depth', '1e400')])
+def test_bad_sizes_become_error_rows(field, value):
+    """Неконечные и нулевые после округления размеры не прерывают поток"""
+    good = {'name': 'Дача', 'length': '7000', 'width': '3000', 'shallow_depth': '1200', 'deep_depth': '1800'}
+    rows = [(2, dict(good, **{field: value})), (3, good)]
+    results = list(estimate_rows(rows))
+    assert results[0][-1]
+    assert results[1][-1] is None and results[1][-2] > 0
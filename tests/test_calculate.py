@@ -0,0 +1,66 @@
+from src.main import calculate_result, result_cache
+from src.utils.calculator import PoolCalculator
+
+
+def test_side_routes_do_not_leak_into_calculate(client, design):
+    """Формат плитки из /tiles и грунт из /logistics не влияют на следующий /calculate"""
+    expected = calculate_result(design, PoolCalculator())
+    client.post('/tiles', json=dict(design, tile={'width': 600, 'height': 600, 'joint': 3, 'per_box': 4}))
+    client.post('/logistics', json={'sites': [dict(design, soil_type='sand')]})
+    # Очистить общий кэш: результат должен посчитаться заново
+    result_cache.memory[:] = bytes(len(result_cache.memory))
+    response = client.post('/calculate', json=design).get_json()
+    assert response['success']
+    assert response['data']['materials'] == expected['materials']
+    assert response['data']['works'] == expected['works']
+
+
+def test_calculate_result_ignores_tile_input(design):
+    calculator = PoolCalculator()
+    tiled = dict(design, tile={'width': 600, 'height': 600, 'joint': 3, 'per_box': 4})
+    assert calculate_result(tiled, calculator) == calculate_result(design, PoolCalculator())
+
+
+def canonical_url(design):
+    from src.main import canonical_query
+    return '/calculate?' + canonical_query({key: str(value) for key, value in design.items()}, ())
+
+
+def test_get_redirects_to_canonical_query(client, design):
+    response = client.get('/calculate?' + '&'.join(f'{key}={value}.0' if key == 'length' else f'{key}={value}'
+                                                   for key, value in reversed(list(design.items()))))
+    assert response.status_code == 301
+    assert response.headers['Location'].endswith(canonical_url(design))
+
+
+def test_conditional_get_skips_calculation(client, design, monkeypatch):
+    from src import main
+    url = canonical_url(design)
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    def calculation(data):
+        raise AssertionError("Расчет не нужен при совпадении ETag")
+
+    monkeypatch.setattr(main, 'cached_calculation', calculation)
+    repeat = client.get(url, headers={'If-None-Match': f'"other", W/{etag}'})
+    assert repeat.status_code == 304
+    assert repeat.headers['ETag'] == etag
+    assert repeat.data == b''
+
+
+def test_etag_depends_on_representation_and_catalog(client, design, monkeypatch):
+    from src import main
+    url = canonical_url(design)
+    plain = client.get(url).headers['ETag']
+    assert client.get(url, headers={'Accept': 'application/msgpack'}).headers['ETag'] != plain
+    assert client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['ETag'] != plain
+    monkeypatch.setattr(main, 'CATALOG_VERSION', 'changed')
+    assert client.get(url).headers['ETag'] != plain
+
+
+def test_get_error_not_cached(client):
+    response = client.get('/calculate?length=x')
+    assert response.get_json()['success'] is False
+    assert response.headers['Cache-Control'] == 'no-store'
@@ -0,0 +1,51 @@
+import io
+
+import pytest
+
+from src.utils.columnar import LineChunk, export_lines
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def read(designs, **kwargs):
+    output = io.BytesIO()
+    result = export_lines(designs, output, 'parquet', **kwargs)
+    return result, pq.read_table(io.BytesIO(output.getvalue())).to_pandas()
+
+
+def test_project_id_carried_through(design):
+    result, table = read([dict(design, id='P-17', name="Дача"), dict(design, id=42)])
+    assert result == {'projects': 2, 'rows': len(table), 'errors': 0}
+    assert set(table['project'].astype(str)) == {'P-17', '42'}
+    assert set(table.loc[table['project'] == 'P-17', 'row']) == {1}
+    assert table['error'].isna().all()
+    assert (table['total'] == table['quantity'] * table['price']).all()
+
+
+def test_failed_projects_written_as_error_rows(design):
+    designs = [dict(design, id='ok'), dict(design, id='bad', shallow_depth=2000), dict(design, id='ok2')]
+    result, table = read(designs, chunk_size=2)
+    assert result['errors'] == 1
+    failed = table[table['error'].notna()]
+    assert list(failed['project'].astype(str)) == ['bad']
+    assert list(failed['row']) == [2]
+    assert failed['line'].isna().all() and failed['quantity'].isna().all()
+    assert set(table['project'].astype(str)) == {'ok', 'bad', 'ok2'}
+
+
+def test_chunk_without_id(design):
+    lines = LineChunk()
+    lines.add(5, design, None)
+    assert lines.ids == [None]
+    assert lines.arrays()['errors'] == 0
+
+
+def test_arrow_reads_into_pandas(design):
+    """Словарные колонки без повторов: Arrow IPC читается в pandas без перекодирования"""
+    output = io.BytesIO()
+    export_lines([dict(design, name="Дача"), dict(design, name="Дача"), dict(design, deep_depth=0)],
+                 output, 'arrow', chunk_size=1)
+    table = pa.ipc.open_file(io.BytesIO(output.getvalue())).read_all().to_pandas()
+    assert set(table['kind'].dropna()) == {'material', 'work'}
+    assert table['error'].notna().sum() == 1
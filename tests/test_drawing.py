@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from src.utils.drawing import drawing_params, render_drawing
+
+
+def test_extreme_proportions_rejected_before_rendering(client):
+    """Узкий длинный бассейн не должен выделять гигабайты под изображение"""
+    started = time.monotonic()
+    response = client.get('/drawing/plan.png?length=1&width=10000000&shallow_depth=1200&deep_depth=1800&px=4000')
+    assert response.get_json()['success'] is False
+    assert time.monotonic() - started < 1.0
+
+
+def test_pixel_count_capped(design):
+    params = drawing_params(dict(design, length=1000, width=25000))
+    with pytest.raises(ValueError, match="Слишком большое изображение"):
+        render_drawing(params, 'plan', 'png', 4000)
+
+
+@pytest.mark.parametrize('name, value', [('length', 50001), ('width', 999), ('deep_depth', 6000), ('steps_count', 7)])
+def test_dimensions_bounded(design, name, value):
+    with pytest.raises(ValueError):
+        drawing_params(dict(design, **{name: value}))
+
+
+def test_normal_drawing_renders(client, design):
+    query = '&'.join(f'{key}={value}' for key, value in design.items())
+    response = client.get(f'/drawing/plan.png?{query}&px=800')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
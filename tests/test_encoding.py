@@ -0,0 +1,61 @@
+import gzip
+import json
+
+import pytest
+from flask import jsonify
+
+from src.main import app, calculate_result
+from src.utils.calculator import PoolCalculator
+from src.utils.encoding import encode_result, encoder, negotiate, parse_fields
+
+VALUES = {'text': 'Бетон "М300"', 'none': None, 'yes': True, 'no': False, 'float': 0.1,
+          'ints': [0, 127, 128, -1, -32, -33, 255, 256, 65535, 65536, -129, -32769, 2 ** 31, 2 ** 40, -2 ** 40],
+          'long': 'x' * 40, 'nested': {'b': [1, 2.5], 'a': {}}, 'many': {str(key): key for key in range(20)}}
+
+
+@pytest.fixture
+def result(design):
+    return calculate_result(design, PoolCalculator())
+
+
+def test_json_matches_jsonify(result):
+    with app.app_context():
+        expected = jsonify({'success': True, 'data': result}).get_data()
+    assert encoder((), 'json')(result) == expected
+
+
+def test_msgpack_matches_reference():
+    """Байт в байт как msgpack.packb с отсортированными ключами"""
+    msgpack = pytest.importorskip('msgpack')
+    packed = encoder((), 'msgpack')(VALUES)
+    expected = json.loads(json.dumps({'success': True, 'data': VALUES}, sort_keys=True))
+    assert packed == msgpack.packb(expected)
+    assert msgpack.unpackb(packed) == {'success': True, 'data': VALUES}
+
+
+def test_field_selection(result):
+    fields = parse_fields('volumes.pit,areas')
+    data = json.loads(encoder(fields, 'json')(result))['data']
+    assert data == {'areas': result['areas'], 'volumes': {'pit': result['volumes']['pit']}}
+
+
+@pytest.mark.parametrize('value', ['unknown', 'areas.total.x', 'areas.'])
+def test_unknown_fields_rejected(value):
+    with pytest.raises(ValueError):
+        parse_fields(value)
+
+
+@pytest.mark.parametrize('accept, media', [
+    (None, 'json'), ('application/msgpack', 'msgpack'), ('application/x-msgpack;q=0.9, */*;q=0.1', 'msgpack'),
+    ('application/msgpack;q=0.5, application/json;q=0.5', 'json'), ('text/html', 'json')
+])
+def test_negotiate(accept, media):
+    assert negotiate(accept) == media
+
+
+def test_gzip_only_for_large_bodies(result):
+    body, headers = encode_result(result, (), None, 'gzip, deflate')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body))['data'] == result
+    body, headers = encode_result(result, parse_fields('volumes.pit'), None, 'gzip')
+    assert 'Content-Encoding' not in headers
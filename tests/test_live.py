@@ -0,0 +1,114 @@
+import json
+import threading
+
+import pytest
+
+from src.utils import live
+from src.utils.sharedcache import SharedCache
+
+
+class Clock:
+    """Время сеанса: каждая пауза генератора сдвигает его на POLL_INTERVAL"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.revision = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now = round(self.now + seconds, 6)
+
+    def time_ns(self):
+        self.revision += 1
+        return self.revision
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(live, 'time', clock)
+    return clock
+
+
+def run(events, clock, edits_at, until):
+    """Прогон сеанса: правки {время: функция}, результат - события и вызовы расчета"""
+    messages, calls = [], []
+    step = next(events)
+    while clock.now < until:
+        if step is None:
+            clock.now = round(clock.now + live.POLL_INTERVAL, 6)
+            for moment in [moment for moment in edits_at if moment <= clock.now]:
+                edits_at.pop(moment)()
+            step = next(events)
+        elif callable(step):
+            calls.append(step.args[0])
+            step = events.send(step())
+        else:
+            messages.append(step)
+            step = next(events)
+    return messages, calls
+
+
+def deltas(messages):
+    return [json.loads(message.split('data: ', 1)[1]) for message in messages if message.startswith('event: delta')]
+
+
+def compute(params, calculator):
+    return {'areas': {'total': params['length'] * 2}}
+
+
+def test_edits_during_pause_are_merged(clock):
+    edits = SharedCache(1, slot_bytes=1024)
+    session = live.new_session()
+    events = live.session_events(session, edits, compute)
+    edits_at = {moment: (lambda length=length: live.post_edit(edits, session, {'length': length}))
+                for moment, length in ((0.05, 1), (0.1, 2), (0.15, 3))}
+    messages, calls = run(events, clock, edits_at, until=1.0)
+    assert calls == [{'length': 3}]
+    assert deltas(messages)[0]['set'] == {'areas.total': 6}
+
+
+def test_continuous_input_computed_within_max_delay(clock):
+    edits = SharedCache(1, slot_bytes=1024)
+    session = live.new_session()
+    edits_at = {round(0.05 * step, 6): (lambda step=step: live.post_edit(edits, session, {'length': step}))
+                for step in range(1, 30)}
+    first = []
+
+    def record(params, calculator):
+        first.append(clock.now)
+        return compute(params, calculator)
+
+    events = live.session_events(session, edits, record)
+    run(events, clock, edits_at, until=1.6)
+    assert first[0] <= 0.05 + live.MAX_DELAY + live.POLL_INTERVAL
+
+
+def test_compute_error_reported(clock):
+    """Ошибка расчета приходит событием failure, поток продолжается"""
+    edits = SharedCache(1, slot_bytes=1024)
+    session = live.new_session()
+
+    def failing(params, calculator):
+        raise ValueError("Мелкая часть глубже глубокой")
+
+    live.post_edit(edits, session, {'length': 1})
+    messages = live.stream(session, edits, failing)
+    failure = next(message for message in messages if message.startswith('event: failure'))
+    assert "Мелкая часть глубже глубокой" in failure
+    live.post_edit(edits, session, {'length': 2})
+    assert next(message for message in messages if message.startswith('event: failure'))
+
+
+def test_wsgi_sessions_capped(client, monkeypatch):
+    from src import main
+    monkeypatch.setattr(main, 'live_slots', threading.BoundedSemaphore(1))
+    first = client.get('/live/events')
+    assert first.status_code == 200
+    assert client.get('/live/events').status_code == 503
+    first.close()
+    second = client.get('/live/events')
+    assert second.status_code == 200
+    second.close()
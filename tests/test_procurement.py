@@ -0,0 +1,39 @@
+from itertools import product
+
+import pytest
+
+from src.utils.calculator import build_calculator
+from src.utils.procurement import pack_order, round_materials
+
+
+def brute_force(quantity, sizes):
+    """Наименьший заказ, затем наименьшее число упаковок - полным перебором"""
+    best = None
+    for counts in product(*(range(int(quantity // size) + 2) for size in sizes)):
+        ordered = sum(count * size for count, size in zip(counts, sizes))
+        if ordered + 1e-9 >= quantity:
+            key = (round(ordered, 6), sum(counts))
+            best = key if best is None or key < best else best
+    return best
+
+
+@pytest.mark.parametrize('sizes', [(5, 2), (25, 5), (10, 5, 1), (32, 8), (3, 6)])
+@pytest.mark.parametrize('quantity', [0.4, 3, 7, 11.5, 23, 61, 97.3])
+def test_pack_order_matches_brute_force(quantity, sizes):
+    packs, ordered = pack_order(quantity, sizes)
+    assert ordered == pytest.approx(sum(size * count for size, count in packs.items()))
+    assert (round(ordered, 6), sum(packs.values())) == brute_force(quantity, sizes)
+
+
+def test_large_order_uses_largest_packs():
+    packs, ordered = pack_order(10_003, (25, 5))
+    assert ordered == 10_005
+    assert packs == {25: 400, 5: 1}
+
+
+def test_coping_adhesive_counted_in_bags(design):
+    """Клей для копинга считается в мешках: заказ не округляется до 25 мешков"""
+    materials = build_calculator(design).calculate_materials('ceramic', 'ceramic')
+    line = next(line for line in round_materials(materials) if line['key'] == 'adhesive_80')
+    assert line['ordered'] == materials['adhesive_80']
+    assert line['leftover'] == 0
@@ -0,0 +1,52 @@
+from collections import Counter
+import time
+
+import pytest
+
+from src.utils import reinforcement
+from src.utils.calculator import build_calculator
+from src.utils.reinforcement import best_fit_decreasing, plan_reinforcement, split_bar
+
+
+@pytest.fixture
+def dimensions(design):
+    return build_calculator(design).dimensions
+
+
+def test_split_bar_with_lap():
+    pieces = split_bar(20000, 11700, 480)
+    assert pieces == [11700, 8780]
+    assert sum(pieces) - 480 * (len(pieces) - 1) == 20000
+
+
+def test_best_fit_decreasing_places_every_piece():
+    pieces = [7000, 5000, 4600, 3000, 3000, 2500, 1200, 700, 700]
+    bins = best_fit_decreasing(pieces, 11700, 5)
+    assert Counter(piece for cuts in bins for piece in cuts) == Counter(pieces)
+    assert all(sum(cuts) + 5 * (len(cuts) - 1) <= 11700 for cuts in bins)
+
+
+def test_exact_not_worse_than_heuristic(dimensions):
+    pytest.importorskip('scipy')
+    heuristic = plan_reinforcement(dimensions, (6.0, 11.7))
+    exact = plan_reinforcement(dimensions, (6.0, 11.7), exact=True)
+    assert exact['method'] in ('exact', 'exact_unproven')
+    assert exact['ordered_length'] <= heuristic['ordered_length'] + 1e-9
+
+
+def test_exact_mode_bounded_in_time(design):
+    """Крупная чаша: точный режим укладывается в общий предел или уходит в эвристику"""
+    pytest.importorskip('scipy')
+    dimensions = build_calculator(dict(design, length=12000, width=6000, deep_depth=2500)).dimensions
+    plan_reinforcement(dimensions, exact=True)  # Импорт scipy не входит в замер
+    started = time.monotonic()
+    plan_reinforcement(dimensions, (6.0, 11.7), exact=True)
+    assert time.monotonic() - started < reinforcement.EXACT_TIME_LIMIT + 1.0
+
+
+def test_expired_deadline_falls_back_to_heuristic(dimensions, monkeypatch):
+    pytest.importorskip('scipy')
+    monkeypatch.setattr(reinforcement, 'EXACT_TIME_LIMIT', 0.0)
+    plan = plan_reinforcement(dimensions, exact=True)
+    assert plan['method'] == 'heuristic'
+    assert plan['ordered_length'] == plan_reinforcement(dimensions)['ordered_length']
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from src.utils import report
+
+
+def test_too_many_designs_rejected_before_estimates(design, monkeypatch):
+    def estimate_row(*args):
+        raise AssertionError("Сметы не должны считаться")
+
+    monkeypatch.setattr(report, 'estimate_row', estimate_row)
+    designs = (design for _ in range(10 ** 6))
+    with pytest.raises(ValueError, match="не больше"):
+        report.render_bundle(designs, io.BytesIO())
+
+
+def test_bundle_renders_every_design(design):
+    output = io.BytesIO()
+    result = report.render_bundle([design, dict(design, name="Большой", length=10000)], output)
+    assert result == {'designs': 2, 'pages': result['pages'], 'errors': 0}
+    assert result['pages'] >= 3
+    assert output.getvalue().startswith(b'%PDF')
+
+
+def test_bundle_builds_each_estimate_after_previous_laid_out(design, monkeypatch):
+    """Страницы сметы строятся, когда предыдущая смета уже сверстана"""
+    events = []
+    estimate_flowables = report.estimate_flowables
+    handle_pageBegin = report.BundleDocTemplate.handle_pageBegin
+
+    def record_flowables(number, *args):
+        events.append(number)
+        return estimate_flowables(number, *args)
+
+    def record_page(doc):
+        events.append('page')
+        handle_pageBegin(doc)
+
+    monkeypatch.setattr(report, 'estimate_flowables', record_flowables)
+    monkeypatch.setattr(report.BundleDocTemplate, 'handle_pageBegin', record_page)
+    report.render_bundle([design] * 3, io.BytesIO())
+    assert events.index(2) - events.index(1) > 1
+    assert events.index(3) - events.index(2) > 1
@@ -0,0 +1,35 @@
+import pytest
+
+from src.utils.calculator import build_calculator
+from src.utils.rolls import plan_rolls, strip_lengths
+
+
+def test_rectangle_strips_cover_surface():
+    """Стена 5 x 1.2 м рулоном 1.65 м: одна полоса вдоль или четыре поперек"""
+    assert strip_lengths(5000, 1200, 1200, 'along', 1650, 50) == [5100]
+    assert strip_lengths(5000, 1200, 1200, 'across', 1650, 50) == [1300] * 4
+
+
+def test_sloped_wall_strips_follow_height():
+    strips = strip_lengths(6000, 1000, 2000, 'across', 1650, 50)
+    assert strips == sorted(strips)
+    assert strips[-1] == 2000 + 100
+
+
+@pytest.mark.parametrize('material', ['liner', 'geotextile', 'fiberglass_mesh'])
+def test_plan_covers_area_with_cut_list(design, material):
+    plan = plan_rolls(build_calculator(design).dimensions, material)
+    assert plan['purchased_area'] >= plan['surface_area']
+    assert sum(item['count'] for item in plan['cut_list']) == plan['rolls']
+    for item in plan['cut_list']:
+        assert sum(item['cuts']) <= plan['roll_length'] + 1e-9
+        assert item['remainder'] >= -1e-9
+    # Полосы целиком разложены по рулонам (длинные - кусками с нахлестом)
+    strips = sum(strip['length'] * strip['count'] for strip in plan['strips'])
+    cuts = sum(sum(item['cuts']) * item['count'] for item in plan['cut_list'])
+    assert cuts >= strips - 1e-6
+
+
+def test_unknown_material():
+    with pytest.raises(ValueError):
+        plan_rolls(None, 'plywood_18')
@@ -0,0 +1,56 @@
+import multiprocessing
+
+import pytest
+
+from src.utils.sharedcache import SharedCache
+
+fork = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="нужен fork")
+
+
+def test_put_get_and_oversized():
+    cache = SharedCache(1, slot_bytes=1024)
+    assert cache.get('a') is None
+    assert cache.put('a', b'value')
+    assert cache.get('a') == b'value'
+    assert not cache.put('b', b'x' * 1024)
+    assert cache.get('b') is None
+
+
+@fork
+def test_value_written_in_child_visible_in_parent():
+    cache = SharedCache(1, slot_bytes=1024)
+    child = multiprocessing.get_context('fork').Process(target=cache.put, args=('key', b'from child'))
+    child.start()
+    child.join()
+    assert cache.get('key') == b'from child'
+
+
+def _write(cache: SharedCache, marker: int) -> None:
+    # Большие значения: копирование длится дольше кванта планировщика
+    for size in range(1, 200):
+        cache.put('shared', bytes([marker]) * (size * 20_000))
+
+
+def _read(cache: SharedCache, torn) -> None:
+    for _ in range(300):
+        value = cache.get('shared')
+        if value and value.count(value[:1]) != len(value):
+            with torn.get_lock():
+                torn.value += 1
+
+
+@fork
+def test_concurrent_writers_never_tear_values():
+    """Ключ и значение пишутся под блокировкой группы: читатель не видит смесь двух записей"""
+    context = multiprocessing.get_context('fork')
+    cache = SharedCache(4, slot_bytes=4 * 1024 * 1024)
+    torn = context.Value('i', 0)
+    processes = [context.Process(target=_write, args=(cache, marker)) for marker in (1, 2, 3)]
+    processes += [context.Process(target=_read, args=(cache, torn)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert torn.value == 0
+    value = cache.get('shared')
+    assert value.count(value[:1]) == len(value)
@@ -0,0 +1,30 @@
+import importlib
+import inspect
+import os
+import subprocess
+import sys
+
+from src.main import calculate_result
+from src.utils import sizetable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fingerprint_covers_calculation_sources():
+    """Изменение расчета /calculate или модулей, которые он вызывает, меняет отпечаток таблицы"""
+    sources = sizetable.source_files()
+    assert os.path.abspath(inspect.getsourcefile(calculate_result)) in sources
+    for name in ('calculator', 'catalog', 'procurement', 'dispatch', 'encoding', 'sizetable'):
+        module = importlib.import_module(f'src.utils.{name}')
+        assert os.path.abspath(inspect.getsourcefile(module)) in sources
+
+
+def test_sources_match_modules_loaded_by_main():
+    """Обход импортов находит все модули src, которые загружаются вместе с src.main"""
+    script = ("import sys, src.main; "
+              "print('\\n'.join(m.__file__ for n, m in list(sys.modules.items()) "
+              "if n.split('.')[0] == 'src' and getattr(m, '__file__', None)))")
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT)).stdout
+    loaded = {os.path.abspath(path) for path in output.split()} - {os.path.join(ROOT, 'src', 'utils', '__init__.py')}
+    assert loaded <= set(sizetable.source_files())
@@ -0,0 +1,18 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.tiling import TILE_FORMATS, lay_surface, layout_tiles
+
+
+@pytest.mark.parametrize('length, start_height, end_height', [(0, 1000, 1000), (1000, 0, 0), (-5, 100, 200)])
+def test_empty_surface_has_no_tiles(length, start_height, end_height):
+    assert lay_surface(length, start_height, end_height, 600, 300, 2) == (0, 0)
+
+
+def test_sub_millimetre_length_does_not_divide_by_zero():
+    """Длина 0.4 мм округляется до нуля: поверхность пустая, а не ZeroDivisionError"""
+    dimensions = SimpleNamespace(length=0.0004, width=3.0, shallow_depth=1.2, deep_depth=1.8, steps_count=0)
+    layout = layout_tiles(dimensions, TILE_FORMATS['ceramic'])
+    assert layout['surfaces'][0] == {'surface': 'Дно', 'count': 1, 'whole': 0, 'cut': 0}
+    assert layout['tiles'] > 0
@@ -0,0 +1,19 @@
+import pytest
+
+from src.utils.whatif import what_if
+
+
+def test_sensitivity_stable_for_close_sizes(design):
+    """Соседние размеры дают близкую чувствительность, а не 0 или скачок на упаковку"""
+    base = dict(design, length=7000, width=3500, shallow_depth=1200, deep_depth=1800)
+    values = [what_if(base, {'length': length})['sensitivities'] for length in (7000, 7003, 7010)]
+    for name in ('length', 'width', 'depth'):
+        first = values[0][name]
+        assert first > 0
+        for other in values[1:]:
+            assert other[name] == pytest.approx(first, rel=0.1)
+
+
+def test_small_pool_window_stays_positive(design):
+    result = what_if(dict(design, length=400, width=300, shallow_depth=200, deep_depth=300), {})
+    assert set(result['sensitivities']) == {'length', 'width', 'depth'}